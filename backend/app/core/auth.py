@@ -1,28 +1,136 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import BaseModel
 from supabase import create_client, Client
-from typing import Annotated
+from typing import Annotated, Any, Dict, Optional
+import asyncio
+import hashlib
+import logging
+
+import jwt
+
+from .cache import TTLCache
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 
+# Algorithms accepted for Supabase access tokens
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+_supabase_client: Optional[Client] = None
+_jwks_client: Optional[jwt.PyJWKClient] = None
+
+# Users of validated tokens by token SHA-256, kept until the token expires
+_claims_cache = TTLCache(ttl=0, max_size=settings.AUTH_CACHE_SIZE)
+
+
+class AuthUser(BaseModel):
+    """User of a locally verified Supabase access token."""
+    id: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    role: Optional[str] = None
+    aud: Optional[str] = None
+    app_metadata: Dict[str, Any] = {}
+    user_metadata: Dict[str, Any] = {}
+    session_id: Optional[str] = None
+
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> "AuthUser":
+        return cls(
+            id=claims["sub"],
+            email=claims.get("email"),
+            phone=claims.get("phone"),
+            role=claims.get("role"),
+            aud=claims.get("aud") if isinstance(claims.get("aud"), str) else None,
+            app_metadata=claims.get("app_metadata") or {},
+            user_metadata=claims.get("user_metadata") or {},
+            session_id=claims.get("session_id"),
+        )
+
+
 def get_supabase_client() -> Client:
     """Return a Supabase client using the service key for admin-level access."""
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    global _supabase_client
+    if _supabase_client is None:
+        _supabase_client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    return _supabase_client
 
 def get_supabase_client_public() -> Client:
     """Return a Supabase client using the public key for client-level access."""
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
-async def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]
-):
+def get_jwks_client() -> jwt.PyJWKClient:
+    """Return the JWKS client of the Supabase project; keys are cached for JWKS_CACHE_TTL seconds."""
+    global _jwks_client
+    if _jwks_client is None:
+        jwks_url = settings.SUPABASE_JWKS_URL or f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json"
+        _jwks_client = jwt.PyJWKClient(jwks_url, cache_keys=True, lifespan=settings.JWKS_CACHE_TTL)
+    return _jwks_client
+
+def clear_auth_cache() -> None:
+    """Forget all validated tokens."""
+    _claims_cache.clear()
+
+async def verify_token_locally(token: str) -> Optional[AuthUser]:
     """
-    Validate the JWT token and return the user.
+    Verify a Supabase access token without calling GoTrue.
 
-    This dependency can be used in any endpoint that requires authentication.
+    HS256 tokens are checked against SUPABASE_JWT_SECRET and asymmetric
+    tokens against the project's JWKS keys. Validated users are cached until
+    the token expires.
+
+    Args:
+        token (str): Bearer token of the request
+
+    Returns:
+        Optional[AuthUser]: The user, or None if the token cannot be verified
+        locally (not a JWT, or no key configured for its algorithm)
+
+    Raises:
+        jwt.InvalidTokenError: If the token is a JWT that fails verification
+    """
+    cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = _claims_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        algorithm = jwt.get_unverified_header(token).get("alg")
+    except jwt.DecodeError:
+        return None
+
+    if algorithm == "HS256" and settings.SUPABASE_JWT_SECRET:
+        key = settings.SUPABASE_JWT_SECRET
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        # Only a key rotation or the first request fetches the JWKS document
+        signing_key = await asyncio.to_thread(get_jwks_client().get_signing_key_from_jwt, token)
+        key = signing_key.key
+    else:
+        return None
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]},
+        leeway=settings.JWT_LEEWAY,
+    )
+    user = AuthUser.from_claims(claims)
+
+    _claims_cache.set(cache_key, user, expires_at=float(claims["exp"]))
+    return user
+
+def verify_token_remotely(token: str):
+    """
+    Validate a token with GoTrue, which also catches revoked sessions.
+
+    Raises:
+        HTTPException: If the token is invalid
     """
-    token = credentials.credentials
     supabase = get_supabase_client()
     try:
         response = supabase.auth.get_user(token)
@@ -38,3 +146,40 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid authentication credentials: {str(e)}",
         )
+
+async def get_current_user(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]
+):
+    """
+    Validate the JWT token and return the user.
+
+    This dependency can be used in any endpoint that requires authentication.
+    Supabase JWTs are verified locally; other tokens, or JWTs signed with an
+    algorithm no key is configured for, are checked with GoTrue.
+    """
+    token = credentials.credentials
+    try:
+        user = await verify_token_locally(token)
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Invalid authentication credentials: {str(e)}",
+        )
+    except Exception as e:
+        # E.g. the JWKS endpoint is unreachable: let GoTrue decide
+        logger.warning(f"Local token verification failed, checking with GoTrue: {e}")
+        user = None
+    if user is not None:
+        return user
+    return await asyncio.to_thread(verify_token_remotely, token)
+
+async def get_current_user_verified(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]
+):
+    """
+    Validate the token with GoTrue on every request and return the user.
+
+    Use for revocation-sensitive endpoints, where a signed but revoked
+    session (signed out, deleted user) must be rejected before it expires.
+    """
+    return await asyncio.to_thread(verify_token_remotely, credentials.credentials)
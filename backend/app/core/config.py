@@ -22,6 +22,44 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str  # Public client key (anon key)
     SUPABASE_SERVICE_KEY: str  # Service role key for admin operations
+    # Pooled HTTP connections of the async PostgREST client of each process,
+    # and its request timeout in seconds
+    DB_MAX_CONNECTIONS: int = 20
+    DB_TIMEOUT: float = 30.0
+    # Backend of the hot queries: "postgrest", or "postgres" to query
+    # DATABASE_URL directly over a pool of DB_POOL_MIN_SIZE to
+    # DB_POOL_MAX_SIZE asyncpg connections
+    DB_BACKEND: str = "postgrest"
+    DATABASE_URL: Optional[str] = None
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+
+    # Local verification of Supabase access tokens. HS256 tokens need the
+    # project's JWT secret; RS256/ES256 tokens are checked against the JWKS
+    # keys (default: SUPABASE_URL/auth/v1/.well-known/jwks.json)
+    SUPABASE_JWT_SECRET: Optional[str] = None
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    SUPABASE_JWKS_URL: Optional[str] = None
+    JWKS_CACHE_TTL: int = 600
+    JWT_LEEWAY: int = 10
+    # Validated tokens cached until they expire
+    AUTH_CACHE_SIZE: int = 10000
+
+    # Seconds a project stays cached for authorizing requests (per process,
+    # so other processes see updates after at most this long) and seconds
+    # a run's project id stays cached
+    OWNERSHIP_CACHE_TTL: int = 30
+    RUN_PROJECT_CACHE_TTL: int = 3600
+    OWNERSHIP_CACHE_SIZE: int = 10000
+
+    # Page size of the results and runs listings, and the largest page a
+    # client may request
+    DEFAULT_PAGE_SIZE: int = 100
+    MAX_PAGE_SIZE: int = 1000
+
+    # Results read per page while exporting a run (at most MAX_PAGE_SIZE);
+    # also the row group size of Parquet exports
+    EXPORT_PAGE_SIZE: int = 1000
 
     # Sentry settings
     SENTRY_DSN: Optional[str] = None
@@ -33,11 +71,116 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_URL: str = "redis://redis:6379/0"
+    # Connections in the Redis pool of each process
+    REDIS_MAX_CONNECTIONS: int = 20
+    # Run events kept per run for SSE replay, and seconds the log outlives
+    # the run's last event
+    RUN_EVENT_STREAM_MAXLEN: int = 10000
+    RUN_EVENT_STREAM_TTL: int = 24 * 60 * 60
+    # Events buffered per SSE client before a slow client starts missing them
+    SSE_CLIENT_QUEUE_SIZE: int = 1000
 
     # Celery settings
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
 
+    # Runs with at least this many URLs go to the bulk queue (0 disables)
+    BULK_RUN_THRESHOLD: int = 1000
+    # Runs processed at once per project and per user (0: no limit); runs
+    # beyond are re-queued after FAIR_SHARE_RETRY_DELAY seconds, in no
+    # particular order. Workers refresh the slots of the runs they scrape;
+    # slots of runs whose worker died are freed after RUN_SLOT_TTL seconds
+    MAX_ACTIVE_RUNS_PER_PROJECT: int = 0
+    MAX_ACTIVE_RUNS_PER_USER: int = 0
+    FAIR_SHARE_RETRY_DELAY: int = 30
+    RUN_SLOT_TTL: int = 60 * 60
+
+    # Browser pool settings (per Celery worker process)
+    BROWSER_POOL_SIZE: int = 1
+    BROWSER_MAX_PAGES: int = 200
+    BROWSER_MAX_RSS_MB: int = 1024
+
+    # Upper bound for the per-run `concurrency` option
+    MAX_RUN_CONCURRENCY: int = 16
+
+    # Runs with at least this many URLs are fanned out in chunks (0 disables)
+    DISTRIBUTED_RUN_THRESHOLD: int = 1000
+    RUN_CHUNK_SIZE: int = 100
+
+    # Default fetch mode of runs: "browser", "http" or "auto"
+    DEFAULT_FETCH_MODE: str = "browser"
+
+    # Page readiness: load state awaited by page.goto and the budget in
+    # seconds for navigation plus any selector wait
+    PAGE_WAIT_UNTIL: str = "networkidle"
+    PAGE_READY_TIMEOUT: float = 30.0
+
+    # Requests aborted by browser contexts unless a run sets block_resources
+    BLOCK_RESOURCES: bool = True
+    BLOCKED_RESOURCE_TYPES: List[str] = ["image", "media", "font"]
+    BLOCKED_DOMAINS: List[str] = [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "facebook.net",
+        "hotjar.com",
+        "segment.io",
+        "clarity.ms",
+    ]
+
+    # Pooled HTTP client used by the "http" and "auto" fetch modes
+    HTTP_FETCH_TIMEOUT: float = 30.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_USER_AGENT: str = "Mozilla/5.0 (compatible; ScrapingWizard/0.1)"
+
+    # Change detection against the previous run of a schedule: "off",
+    # "fields" (fingerprint of the extracted fields) or "dom" (also the page HTML)
+    CHANGE_DETECTION: str = "fields"
+
+    # Send scheduled runs' requests with the ETag/Last-Modified validators of
+    # the previous run, kept in Redis this many seconds after a page was fetched
+    CONDITIONAL_REQUESTS: bool = True
+    VALIDATOR_CACHE_TTL: int = 7 * 24 * 60 * 60
+
+    # Fleet-wide politeness per domain, off unless enabled here or by a run's
+    # politeness option (needs Redis): pages per second and pages in flight
+    # across all workers (0 for no limit), seconds a lease is held at most,
+    # and seconds between lease attempts
+    POLITENESS_ENABLED: bool = False
+    DOMAIN_QPS: float = 2.0
+    DOMAIN_MAX_CONCURRENCY: int = 4
+    DOMAIN_LEASE_TTL: float = 120.0
+    DOMAIN_POLL_INTERVAL: float = 0.25
+    # Backoff of domains answering 429/503: doubles from the base up to the
+    # max, halves with every successful load; throttled URLs are tried this
+    # many times before they fail
+    DOMAIN_BACKOFF_BASE: float = 2.0
+    DOMAIN_BACKOFF_MAX: float = 300.0
+    THROTTLED_URL_ATTEMPTS: int = 5
+
+    # Worker result buffering: flush after this many results or seconds
+    RESULT_BATCH_SIZE: int = 50
+    RESULT_FLUSH_INTERVAL: float = 2.0
+    # Results per binary COPY batch when workers write with DB_BACKEND=postgres
+    RESULT_COPY_BATCH_SIZE: int = 1000
+
+    # Retention of results, enforced nightly by the archive_results task over
+    # DATABASE_URL: days of results kept for projects without retention_days
+    # (None keeps them), where expired results are archived (file:// or
+    # s3:// URI, S3 credentials from the AWS_* variables) and as what
+    # ("parquet" or "ndjson"), and monthly partitions created in advance
+    RESULT_RETENTION_DAYS: Optional[int] = None
+    RESULT_ARCHIVE_URI: Optional[str] = None
+    RESULT_ARCHIVE_FORMAT: str = "parquet"
+    RESULT_PARTITIONS_AHEAD: int = 2
+
+    # Worker event publishing: record events are sent in pipelined batches of
+    # EVENT_BATCH_SIZE or after EVENT_FLUSH_INTERVAL seconds, and running
+    # status updates at most once per STATUS_EVENT_INTERVAL seconds
+    EVENT_BATCH_SIZE: int = 20
+    EVENT_FLUSH_INTERVAL: float = 0.5
+    STATUS_EVENT_INTERVAL: float = 1.0
+
     # CORS allowed origins
     CORS_ORIGINS: List[str] = ["*"]
 
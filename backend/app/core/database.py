@@ -0,0 +1,84 @@
+"""
+Process-wide async PostgREST client.
+
+The services query Supabase's PostgREST API through one `AsyncPostgrestClient`
+per process, so a slow query only suspends the request waiting for it instead
+of blocking the event loop. Its HTTP connections are kept alive in a pool of
+at most DB_MAX_CONNECTIONS.
+"""
+from typing import Dict, Optional, Union
+import logging
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_db: Optional[AsyncPostgrestClient] = None
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """`AsyncPostgrestClient` on a bounded keep-alive connection pool."""
+
+    def __init__(self, base_url: str, *, headers: Dict[str, str], timeout: float,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport
+        super().__init__(base_url, headers=headers, timeout=timeout)
+
+    def create_session(self, base_url: str, headers: Dict[str, str],
+                       timeout: Union[int, float, httpx.Timeout], verify: bool = True) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=settings.DB_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DB_MAX_CONNECTIONS,
+            ),
+            transport=self._transport,
+        )
+
+
+def create_db_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> PooledPostgrestClient:
+    """
+    Create a PostgREST client authenticated with SUPABASE_KEY.
+
+    Args:
+        transport (httpx.AsyncBaseTransport): Transport to send the requests
+            with instead of the network, e.g. in tests
+    """
+    return PooledPostgrestClient(
+        f"{settings.SUPABASE_URL.rstrip('/')}/rest/v1",
+        headers={
+            "apikey": settings.SUPABASE_KEY,
+            "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        },
+        timeout=settings.DB_TIMEOUT,
+        transport=transport,
+    )
+
+
+def get_db() -> AsyncPostgrestClient:
+    """
+    Return the PostgREST client of the current process, creating it on first use.
+
+    Like the Redis client, it must only be used from one event loop.
+    """
+    global _db
+    if _db is None:
+        _db = create_db_client()
+    return _db
+
+
+async def close_db() -> None:
+    """Close the PostgREST client of the current process and its connections."""
+    global _db
+    if _db is not None:
+        await _db.aclose()
+        _db = None
@@ -0,0 +1,183 @@
+"""
+Process-wide Redis client and run event fan-out.
+
+Every process shares one connection pool. API processes also run a single
+RunEventBroker that holds one pub/sub connection for all SSE clients and fans
+`run:{id}` messages out to per-client asyncio queues.
+"""
+from typing import Dict, Optional, Set
+import asyncio
+import logging
+
+import aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    """
+    Return the Redis client of the current process, creating it on first use.
+
+    The client is backed by a pool of at most REDIS_MAX_CONNECTIONS
+    connections and must only be used from one event loop.
+    """
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(settings.REDIS_URL, max_connections=settings.REDIS_MAX_CONNECTIONS)
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close the Redis client of the current process and its pool."""
+    global _redis
+    if _redis is not None:
+        await _redis.close()
+        await _redis.connection_pool.disconnect()
+        _redis = None
+
+
+def run_channel(run_id: int) -> str:
+    """Pub/sub channel the events of a run are published on."""
+    return f"run:{run_id}"
+
+
+class RunEventBroker:
+    """
+    Multiplexes the run event channels of all SSE clients over one pub/sub
+    connection.
+
+    A channel is subscribed when its first client arrives and unsubscribed when
+    its last client leaves. A reader task blocks on the connection and pushes
+    each message to the queues of that channel's clients, so messages are
+    delivered as soon as Redis sends them. A client whose queue is full misses
+    messages instead of holding up the others.
+    """
+
+    # Always subscribed so the reader keeps listening while no run is watched
+    IDLE_CHANNEL = "run:broker-idle"
+
+    def __init__(self, queue_size: int = 1000, reconnect_delay: float = 1.0):
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self._clients: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, run_id: int) -> asyncio.Queue:
+        """
+        Register a client for the events of a run.
+
+        Args:
+            run_id (int): ID of the run
+
+        Returns:
+            asyncio.Queue: Queue the raw event payloads of the run are put on
+        """
+        channel = run_channel(run_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            await self._ensure_started()
+            clients = self._clients.setdefault(channel, set())
+            if not clients:
+                await self._pubsub.subscribe(channel)
+            clients.add(queue)
+        return queue
+
+    async def unsubscribe(self, run_id: int, queue: asyncio.Queue) -> None:
+        """
+        Remove a client registered with `subscribe`.
+
+        Args:
+            run_id (int): ID of the run
+            queue (asyncio.Queue): Queue returned by `subscribe`
+        """
+        channel = run_channel(run_id)
+        async with self._lock:
+            clients = self._clients.get(channel)
+            if clients is None:
+                return
+            clients.discard(queue)
+            if not clients:
+                del self._clients[channel]
+                if self._pubsub is not None:
+                    try:
+                        await self._pubsub.unsubscribe(channel)
+                    except Exception as e:
+                        logger.warning(f"Failed to unsubscribe from {channel}: {e}")
+
+    async def close(self) -> None:
+        """Stop the reader task and close the pub/sub connection."""
+        async with self._lock:
+            if self._reader is not None:
+                self._reader.cancel()
+                try:
+                    await self._reader
+                except (asyncio.CancelledError, Exception):
+                    pass
+                self._reader = None
+            await self._close_pubsub()
+            self._clients.clear()
+
+    @property
+    def channel_count(self) -> int:
+        """Number of run channels with at least one client."""
+        return len(self._clients)
+
+    async def _ensure_started(self) -> None:
+        if self._pubsub is None:
+            await self._connect()
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _connect(self) -> None:
+        self._pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.IDLE_CHANNEL, *self._clients)
+
+    async def _close_pubsub(self) -> None:
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning(f"Error closing pub/sub connection: {e}")
+            self._pubsub = None
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") == "message":
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Run event subscriber lost its connection: {e}")
+
+            # Reconnect and resubscribe the channels clients are watching
+            await asyncio.sleep(self.reconnect_delay)
+            async with self._lock:
+                await self._close_pubsub()
+                try:
+                    await self._connect()
+                except Exception as e:
+                    logger.error(f"Failed to reconnect run event subscriber: {e}")
+                    self._pubsub = None
+                    self._reader = None
+                    return
+
+    def _dispatch(self, message: dict) -> None:
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+        for queue in self._clients.get(channel, ()):
+            try:
+                queue.put_nowait(message["data"])
+            except asyncio.QueueFull:
+                logger.warning(f"Dropping event on {channel} for a client that is not keeping up")
+
+
+run_event_broker = RunEventBroker(queue_size=settings.SSE_CLIENT_QUEUE_SIZE)
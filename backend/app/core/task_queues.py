@@ -0,0 +1,99 @@
+"""
+Celery queues and priorities of the scraping tasks.
+
+Tasks are routed to one queue per class of work so each worker pool can be
+scaled on its own, and carry a priority so that within a queue shared by
+several classes the interactive ones go first:
+
+- interactive: runs started from the API ("run now")
+- retry: retries of failed URLs
+- scheduled: runs started by a schedule, and the nightly results maintenance
+- bulk: runs of at least BULK_RUN_THRESHOLD URLs and the chunks of
+  distributed runs
+"""
+from typing import Any, Dict, Optional
+import asyncio
+
+from kombu import Queue
+
+from app.core.config import settings
+
+INTERACTIVE = "interactive"
+RETRY = "retry"
+SCHEDULED = "scheduled"
+BULK = "bulk"
+
+QUEUE_NAMES = (INTERACTIVE, RETRY, SCHEDULED, BULK)
+
+TASK_QUEUES = tuple(Queue(name, routing_key=name) for name in QUEUE_NAMES)
+
+# With the Redis broker 0 is the highest priority
+PRIORITY_STEPS = list(range(10))
+PRIORITIES = {INTERACTIVE: 0, RETRY: 3, SCHEDULED: 6, BULK: 9}
+
+# Default queues of tasks that are not routed explicitly when sent
+TASK_ROUTES = {
+    "process_scraping_run": {"queue": INTERACTIVE},
+    "process_single_url": {"queue": RETRY},
+    "run_scheduled_scrape": {"queue": SCHEDULED},
+    "scrape_url_chunk": {"queue": BULK},
+    "finalize_distributed_run": {"queue": INTERACTIVE},
+    "archive_results": {"queue": SCHEDULED},
+}
+
+# Separator of the per-priority Redis lists of a queue ("bulk", "bulk:3", ...)
+PRIORITY_SEPARATOR = ":"
+
+BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": PRIORITY_STEPS,
+    "sep": PRIORITY_SEPARATOR,
+    "queue_order_strategy": "priority",
+}
+
+
+def task_options(queue: str) -> Dict[str, Any]:
+    """`apply_async`/`send_task` options routing a task to a queue with its priority."""
+    return {"queue": queue, "priority": PRIORITIES[queue]}
+
+
+def run_queue(url_count: int, scheduled: bool = False) -> str:
+    """
+    Queue of a scraping run.
+
+    Args:
+        url_count (int): Number of URLs of the run
+        scheduled (bool): Whether a schedule started the run
+
+    Returns:
+        str: BULK for runs of at least BULK_RUN_THRESHOLD URLs, else
+        SCHEDULED or INTERACTIVE
+    """
+    if settings.BULK_RUN_THRESHOLD and url_count >= settings.BULK_RUN_THRESHOLD:
+        return BULK
+    return SCHEDULED if scheduled else INTERACTIVE
+
+
+def _queue_depths(celery) -> Dict[str, int]:
+    with celery.connection_or_acquire() as connection:
+        client = connection.default_channel.client
+        pipe = client.pipeline()
+        for name in QUEUE_NAMES:
+            for step in PRIORITY_STEPS:
+                pipe.llen(name if step == 0 else f"{name}{PRIORITY_SEPARATOR}{step}")
+        lengths = pipe.execute()
+    steps = len(PRIORITY_STEPS)
+    return {name: sum(lengths[i * steps:(i + 1) * steps]) for i, name in enumerate(QUEUE_NAMES)}
+
+
+async def get_queue_depths(celery: Optional[Any] = None) -> Dict[str, int]:
+    """
+    Number of tasks waiting in each queue of the broker.
+
+    Tasks reserved by workers are not counted.
+
+    Returns:
+        Dict[str, int]: Waiting tasks per queue name
+    """
+    if celery is None:
+        from app.worker import celery
+    return await asyncio.to_thread(_queue_depths, celery)
@@ -49,7 +49,7 @@ if SENTRY_AVAILABLE and settings.SENTRY_DSN:
         SENTRY_AVAILABLE = False
 
 # Import routers
-from app.routers import projects, runs, schedules, templates, results, stream
+from app.routers import projects, runs, schedules, templates, results, stream, queues
 
 app = FastAPI(
     title="Scraping Wizard API",
@@ -99,6 +99,7 @@ app.include_router(schedules.router, prefix=settings.API_V1_STR)
 app.include_router(templates.router, prefix=settings.API_V1_STR)
 app.include_router(results.router, prefix=settings.API_V1_STR)
 app.include_router(stream.router, prefix=settings.API_V1_STR, tags=["stream"])
+app.include_router(queues.router, prefix=settings.API_V1_STR)
 
 @app.get("/api/v1", tags=["root"])
 async def api_v1_root():
@@ -178,6 +179,20 @@ async def startup_event():
     # except Exception as e:
     #     print(f"Error creating templates table: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Actions to run on application shutdown.
+    """
+    from app.core.database import close_db
+    from app.core.redis import close_redis, run_event_broker
+    from app.repositories import close_repository
+
+    await run_event_broker.close()
+    await close_redis()
+    await close_repository()
+    await close_db()
+
 # Add Sentry middleware only if Sentry is available (must be after all routes and event handlers)
 if SENTRY_AVAILABLE and settings.SENTRY_DSN:
     try:
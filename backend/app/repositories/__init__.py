@@ -0,0 +1,51 @@
+"""
+Data access of the hot queries behind the service modules.
+
+DB_BACKEND selects the backend: "postgrest" (default) queries Supabase's
+PostgREST API, "postgres" talks to Postgres directly over an asyncpg pool
+(DATABASE_URL). Queries not covered here always go through PostgREST.
+"""
+from typing import Optional
+
+from app.core.config import settings
+from app.repositories.base import Repository
+
+DB_BACKENDS = ("postgrest", "postgres")
+
+_repository: Optional[Repository] = None
+
+
+def create_repository(backend: str) -> Repository:
+    """
+    Create a repository of the given backend.
+
+    Raises:
+        ValueError: If the backend is unknown or "postgres" has no DATABASE_URL
+    """
+    if backend == "postgrest":
+        from app.repositories.postgrest import PostgrestRepository
+
+        return PostgrestRepository()
+    if backend == "postgres":
+        if not settings.DATABASE_URL:
+            raise ValueError("DB_BACKEND=postgres needs DATABASE_URL")
+        from app.repositories.postgres import PostgresRepository
+
+        return PostgresRepository(settings.DATABASE_URL)
+    raise ValueError(f"Unknown DB_BACKEND {backend!r}, expected one of {', '.join(DB_BACKENDS)}")
+
+
+def get_repository() -> Repository:
+    """Return the repository of the current process, creating it on first use."""
+    global _repository
+    if _repository is None:
+        _repository = create_repository(settings.DB_BACKEND)
+    return _repository
+
+
+async def close_repository() -> None:
+    """Close the repository of the current process and its connections."""
+    global _repository
+    if _repository is not None:
+        await _repository.close()
+        _repository = None
@@ -0,0 +1,48 @@
+"""
+Interface of the repository backends.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+class Repository(ABC):
+    """
+    Hot queries of the services.
+
+    Rows are plain dictionaries with the columns of their table. Backends
+    raise an exception when a query fails; the services turn it into an
+    HTTP error. Backends implement every abstract method.
+
+    Results are keyed by (run_id, url, attempt). Inserting a result whose
+    key is already stored does nothing, so retried writes are idempotent.
+    """
+
+    # Results per batch written by the buffered writers of the workers
+    @property
+    def batch_size(self) -> int:
+        return settings.RESULT_BATCH_SIZE
+
+    @abstractmethod
+    async def get_project(self, project_id: int, user_id: str) -> Optional[Dict[str, Any]]:
+        """Project with the given ID if it belongs to the user, else None."""
+
+    @abstractmethod
+    async def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        """Run with the given ID, None if there is none."""
+
+    @abstractmethod
+    async def get_failed_results(self, run_id: int) -> List[Dict[str, Any]]:
+        """Results of a run with status "failed"."""
+
+    @abstractmethod
+    async def insert_result(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert a result and return the stored row, None if its key exists."""
+
+    @abstractmethod
+    async def insert_results(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert several results at once and return the rows that were new."""
+
+    async def close(self) -> None:
+        """Release the connections of the backend."""
@@ -0,0 +1,173 @@
+"""
+Repository backend talking to Postgres directly with asyncpg.
+
+Queries run on a pool of DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections.
+asyncpg prepares every statement on its first use per connection and reuses
+the server-side prepared statement afterwards, so the hot queries below are
+parsed and planned once per connection. DATABASE_URL must therefore be a
+direct (or session-pooled) connection, not a transaction-mode pgbouncer.
+
+Batches of results are written with binary COPY FROM STDIN into a temporary
+staging table and moved into the partitioned `results` table with one
+INSERT ... SELECT, skipping keys that are already stored and returning the
+new rows. Workers buffer
+RESULT_COPY_BATCH_SIZE results per batch with this backend.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+
+import asyncpg
+
+from app.core.config import settings
+from app.repositories.base import Repository
+
+logger = logging.getLogger(__name__)
+
+# Columns written when inserting results
+RESULT_COLUMNS = ("run_id", "url", "status", "data", "error_message", "attempt", "created_at", "updated_at")
+
+GET_PROJECT_SQL = "SELECT * FROM projects WHERE id = $1 AND user_id = $2::uuid"
+
+GET_RUN_SQL = "SELECT * FROM runs WHERE id = $1"
+
+GET_FAILED_RESULTS_SQL = "SELECT * FROM results WHERE run_id = $1 AND status = 'failed' ORDER BY id"
+
+# Results are keyed by (run_id, url, attempt), which Postgres cannot enforce
+# on the partitioned table: inserts lock their runs for the transaction and
+# skip keys that are stored already
+LOCK_RUN_SQL = "SELECT pg_advisory_xact_lock($1)"
+
+INSERT_RESULT_SQL = (
+    "INSERT INTO results (run_id, url, status, data, error_message, attempt, created_at, updated_at) "
+    "SELECT $1::bigint, $2::text, $3::text, $4::text::jsonb, $5::text, $6::int, $7::timestamptz, $8::timestamptz "
+    "WHERE NOT EXISTS (SELECT 1 FROM results WHERE run_id = $1 AND url = $2 AND attempt = $6) "
+    "RETURNING *"
+)
+
+CREATE_STAGING_SQL = (
+    "CREATE TEMP TABLE IF NOT EXISTS results_staging ("
+    "run_id BIGINT, url TEXT, status TEXT, data TEXT, error_message TEXT, attempt INTEGER, "
+    "created_at TIMESTAMPTZ, updated_at TIMESTAMPTZ"
+    ") ON COMMIT DELETE ROWS"
+)
+
+LOCK_STAGED_RUNS_SQL = (
+    "SELECT pg_advisory_xact_lock(run_id) FROM (SELECT DISTINCT run_id FROM results_staging ORDER BY run_id) AS staged"
+)
+
+INSERT_STAGED_RESULTS_SQL = (
+    "INSERT INTO results (run_id, url, status, data, error_message, attempt, created_at, updated_at) "
+    "SELECT DISTINCT ON (s.run_id, s.url, s.attempt) "
+    "s.run_id, s.url, s.status, s.data::jsonb, s.error_message, s.attempt, s.created_at, s.updated_at "
+    "FROM results_staging AS s "
+    "WHERE NOT EXISTS ("
+    "SELECT 1 FROM results AS r WHERE r.run_id = s.run_id AND r.url = s.url AND r.attempt = s.attempt"
+    ") "
+    "ORDER BY s.run_id, s.url, s.attempt "
+    "RETURNING *"
+)
+
+
+async def init_connection(connection: asyncpg.Connection) -> None:
+    """Decode json and jsonb columns into Python objects."""
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    # The services pass naive UTC ISO strings
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def result_record(row: Dict[str, Any]) -> tuple:
+    """Values of a result row in RESULT_COLUMNS order, its data encoded as JSON text."""
+    return (
+        row["run_id"],
+        row["url"],
+        row.get("status") or "success",
+        json.dumps(row.get("data") or {}, default=str),
+        row.get("error_message"),
+        row.get("attempt") or 0,
+        _timestamp(row.get("created_at")),
+        _timestamp(row.get("updated_at")),
+    )
+
+
+class PostgresRepository(Repository):
+    """
+    Queries over an asyncpg connection pool, created on first use.
+
+    Args:
+        dsn (str): Postgres connection URL
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._pool: Optional[asyncpg.Pool] = None
+        self._lock = asyncio.Lock()
+
+    async def pool(self) -> asyncpg.Pool:
+        """The connection pool, created on first use."""
+        if self._pool is None:
+            async with self._lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=settings.DB_POOL_MIN_SIZE,
+                        max_size=settings.DB_POOL_MAX_SIZE,
+                        command_timeout=settings.DB_TIMEOUT,
+                        init=init_connection,
+                    )
+        return self._pool
+
+    async def get_project(self, project_id: int, user_id: str) -> Optional[Dict[str, Any]]:
+        row = await (await self.pool()).fetchrow(GET_PROJECT_SQL, project_id, str(user_id))
+        return dict(row) if row else None
+
+    async def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        row = await (await self.pool()).fetchrow(GET_RUN_SQL, run_id)
+        return dict(row) if row else None
+
+    async def get_failed_results(self, run_id: int) -> List[Dict[str, Any]]:
+        rows = await (await self.pool()).fetch(GET_FAILED_RESULTS_SQL, run_id)
+        return [dict(row) for row in rows]
+
+    @property
+    def batch_size(self) -> int:
+        return settings.RESULT_COPY_BATCH_SIZE
+
+    async def insert_result(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async with (await self.pool()).acquire() as connection:
+            async with connection.transaction():
+                await connection.execute(LOCK_RUN_SQL, row["run_id"])
+                stored = await connection.fetchrow(INSERT_RESULT_SQL, *result_record(row))
+        return dict(stored) if stored else None
+
+    async def insert_results(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        async with (await self.pool()).acquire() as connection:
+            async with connection.transaction():
+                await connection.execute(CREATE_STAGING_SQL)
+                await connection.copy_records_to_table(
+                    "results_staging",
+                    records=[result_record(row) for row in rows],
+                    columns=RESULT_COLUMNS,
+                )
+                await connection.execute(LOCK_STAGED_RUNS_SQL)
+                stored = await connection.fetch(INSERT_STAGED_RESULTS_SQL)
+        return [dict(row) for row in stored]
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
@@ -0,0 +1,44 @@
+"""
+Repository backend on Supabase's PostgREST API.
+"""
+from typing import Any, Dict, List, Optional
+
+from app.core.database import get_db
+from app.repositories.base import Repository
+
+# Inserts results skipping stored keys, see the 20240101000010 migration
+INSERT_RESULTS_FUNCTION = "insert_results"
+
+
+def _rows(response, action: str) -> List[Dict[str, Any]]:
+    if hasattr(response, 'error') and response.error is not None:
+        raise Exception(f"Failed to {action}: {response.error}")
+    return response.data
+
+
+class PostgrestRepository(Repository):
+    """Queries over the process-wide async PostgREST client."""
+
+    async def get_project(self, project_id: int, user_id: str) -> Optional[Dict[str, Any]]:
+        response = await get_db().table("projects").select("*").eq("id", project_id).eq("user_id", user_id).execute()
+        rows = _rows(response, f"fetch project {project_id}")
+        return rows[0] if rows else None
+
+    async def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        response = await get_db().table("runs").select("*").eq("id", run_id).execute()
+        rows = _rows(response, f"fetch run {run_id}")
+        return rows[0] if rows else None
+
+    async def get_failed_results(self, run_id: int) -> List[Dict[str, Any]]:
+        response = await get_db().table("results").select("*").eq("run_id", run_id).eq("status", "failed").execute()
+        return _rows(response, f"fetch failed results of run {run_id}")
+
+    async def insert_result(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        stored = await self.insert_results([row])
+        return stored[0] if stored else None
+
+    async def insert_results(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # The partitioned table has no unique key for an upsert to skip
+        # existing keys, so a database function does the insert
+        response = await get_db().rpc(INSERT_RESULTS_FUNCTION, {"p_rows": rows}).execute()
+        return _rows(response, "create results")
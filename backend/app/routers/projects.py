@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List, Annotated
 from app.schemas.project import Project, ProjectCreate, ProjectUpdate
 from app.services import project_service
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_verified
 
 # Create router with prefix and tags
 router = APIRouter(prefix="/projects", tags=["projects"])
@@ -73,7 +73,7 @@ async def update_existing_project(
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_existing_project(id: int, current_user: Annotated[dict, Depends(get_current_user)]):
+async def delete_existing_project(id: int, current_user: Annotated[dict, Depends(get_current_user_verified)]):
     """
     Delete a project if it belongs to the authenticated user.
 
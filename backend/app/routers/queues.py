@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from typing import Annotated
+from app.schemas.queue import QueueDepthsResponse
+from app.core.auth import get_current_user
+from app.core import task_queues
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router with prefix and tags
+router = APIRouter(prefix="/queues", tags=["queues"])
+
+
+@router.get("/", response_model=QueueDepthsResponse)
+async def get_queue_depths(current_user: Annotated[dict, Depends(get_current_user)]):
+    """
+    Number of tasks waiting in each queue of the broker.
+
+    Returns:
+        QueueDepthsResponse: Waiting tasks per queue
+    """
+    try:
+        return await task_queues.get_queue_depths()
+    except Exception as e:
+        logger.error(f"Error reading queue depths: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Queue depths are unavailable"
+        )
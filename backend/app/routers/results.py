@@ -1,33 +1,39 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List, Dict, Any, Annotated
-from app.schemas.result import Result, ResultCreate
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from typing import List, Dict, Any, Annotated, Optional
+from app.schemas.result import Result, ResultCreate, ResultsResponse
 from app.services import result_service, run_service, project_service
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_verified
 
 # Create router with prefix and tags
 router = APIRouter(prefix="/results", tags=["results"])
 
 
-@router.get("/", response_model=List[Result])
+@router.get("/", response_model=ResultsResponse, response_model_exclude_unset=True)
 async def get_all_results(
     current_user: Annotated[dict, Depends(get_current_user)],
-    run_id: int = None
+    run_id: int = None,
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, description="Results per page (default DEFAULT_PAGE_SIZE, at most MAX_PAGE_SIZE)"),
+    include_data: bool = Query(False, description="Include the extracted data of each result")
 ):
     """
-    Retrieve all results, optionally filtered by run ID.
+    Retrieve a page of results ordered by ID, optionally filtered by run ID.
 
     Args:
         run_id (Optional[int]): Filter results by run ID
+        cursor (Optional[int]): Cursor returned as next_cursor by the previous page
+        limit (Optional[int]): Maximum number of results to return
+        include_data (bool): Whether to include the extracted data
 
     Returns:
-        List[Result]: List of results
+        ResultsResponse: Page of results and the cursor of the next page
     """
     # If run_id is provided, verify user has access to it
     if run_id is not None:
-        run = await run_service.get_run(run_id)
-        await project_service.get_project(run.project_id, current_user.id)
+        project_id = await run_service.get_run_project_id(run_id)
+        await project_service.get_project(project_id, current_user.id)
 
-    return await result_service.get_results(run_id)
+    return await result_service.get_results_page(run_id, cursor, limit, include_data)
 
 
 @router.get("/{id}", response_model=Result)
@@ -45,8 +51,9 @@ async def get_result_by_id(id: int, current_user: Annotated[dict, Depends(get_cu
         HTTPException: If result not found or user doesn't have access
     """
     result = await result_service.get_result(id)
-    run = await run_service.get_run(result.run_id)
-    await project_service.get_project(run.project_id, current_user.id)
+    # Both lookups are cached, so a warm request only queries the result
+    project_id = await run_service.get_run_project_id(result.run_id)
+    await project_service.get_project(project_id, current_user.id)
     return result
 
 
@@ -72,7 +79,7 @@ async def get_result_data(id: int, current_user: Annotated[dict, Depends(get_cur
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_result(id: int, current_user: Annotated[dict, Depends(get_current_user)]):
+async def delete_result(id: int, current_user: Annotated[dict, Depends(get_current_user_verified)]):
     """
     Delete a result if the user has access to the associated run.
 
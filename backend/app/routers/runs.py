@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Path, Query, Body
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any, Annotated
-from app.schemas.run import Run, RunCreate, RunUpdate
-from app.services import run_service, project_service, result_service
+from app.schemas.run import Run, RunCreate, RunUpdate, RunsResponse
+from app.services import run_service, project_service, result_service, result_export
 from app.worker import celery as celery_app
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_verified
+from app.core.task_queues import RETRY, task_options
 import logging
 
 # Create router with prefix and tags
@@ -11,45 +13,53 @@ router = APIRouter(tags=["runs"])
 logger = logging.getLogger(__name__)
 
 
-@router.get("/", response_model=List[Run])
+@router.get("/", response_model=RunsResponse)
 async def get_all_runs(
     current_user: Annotated[dict, Depends(get_current_user)],
-    project_id: Optional[int] = None
+    project_id: Optional[int] = None,
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, description="Runs per page (default DEFAULT_PAGE_SIZE, at most MAX_PAGE_SIZE)")
 ):
     """
-    Retrieve all runs, optionally filtered by project ID.
+    Retrieve a page of runs, newest first, optionally filtered by project ID.
 
     Args:
         project_id (Optional[int]): Filter runs by project ID
+        cursor (Optional[int]): Cursor returned as next_cursor by the previous page
+        limit (Optional[int]): Maximum number of runs to return
 
     Returns:
-        List[Run]: List of runs
+        RunsResponse: Page of runs and the cursor of the next page
     """
     # If a project ID is provided, verify that the project belongs to the current user
     if project_id is not None:
         await project_service.get_project(project_id, current_user.id)
 
-    return await run_service.get_runs(project_id)
+    return await run_service.get_runs_page(project_id, cursor, limit)
 
 
-@router.get("/projects/{project_id}/runs", response_model=List[Run])
+@router.get("/projects/{project_id}/runs", response_model=RunsResponse)
 async def get_runs_by_project(
     project_id: int = Path(..., description="The ID of the project"),
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, description="Runs per page (default DEFAULT_PAGE_SIZE, at most MAX_PAGE_SIZE)"),
     current_user = Depends(get_current_user),
 ):
     """
-    Retrieve all runs for a specific project.
+    Retrieve a page of runs for a specific project, newest first.
 
     Args:
         project_id (int): The ID of the project
+        cursor (Optional[int]): Cursor returned as next_cursor by the previous page
+        limit (Optional[int]): Maximum number of runs to return
 
     Returns:
-        List[Run]: List of runs for the project
+        RunsResponse: Page of runs for the project and the cursor of the next page
     """
     # Verify project exists and belongs to the user
     await project_service.get_project(project_id, current_user.id)
     
-    return await run_service.get_runs(project_id)
+    return await run_service.get_runs_page(project_id, cursor, limit)
 
 
 @router.get("/runs/{run_id}", response_model=Run)
@@ -77,6 +87,50 @@ async def get_run_by_id(
     return run
 
 
+@router.get("/runs/{run_id}/results/export")
+async def export_run_results(
+    run_id: int = Path(..., description="The ID of the run"),
+    format: str = Query("ndjson", description="Export format: ndjson, csv or parquet"),
+    current_user = Depends(get_current_user),
+):
+    """
+    Download all results of a run.
+
+    The export is streamed page by page, so runs of any size can be exported.
+    CSV and Parquet exports have one column per field of the run's selector
+    schema.
+
+    Args:
+        run_id (int): The ID of the run
+        format (str): Export format
+
+    Returns:
+        StreamingResponse: The results of the run as an attachment
+
+    Raises:
+        HTTPException: If the format is unknown, or the run is not found or
+        doesn't belong to user's projects
+    """
+    if format not in result_export.EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown export format '{format}', expected one of {', '.join(result_export.EXPORT_FORMATS)}"
+        )
+
+    run = await run_service.get_run(run_id)
+    await project_service.get_project(run.project_id, current_user.id)
+
+    field_names = None
+    if format != "ndjson":
+        field_names = await result_export.get_export_fields(run)
+
+    return StreamingResponse(
+        result_export.export_results(run_id, format, field_names),
+        media_type=result_export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="run-{run_id}-results.{format}"'}
+    )
+
+
 @router.post("/projects/{project_id}/runs", response_model=Run, status_code=status.HTTP_201_CREATED)
 async def enqueue_new_run(
     project_id: int = Path(..., description="The ID of the project"),
@@ -145,7 +199,7 @@ async def update_existing_run(
 @router.delete("/runs/{run_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_existing_run(
     run_id: int = Path(..., description="The ID of the run"),
-    current_user = Depends(get_current_user),
+    current_user = Depends(get_current_user_verified),
 ):
     """
     Delete a run.
@@ -216,14 +270,18 @@ async def retry_failed_urls(
             detail="No selector schema found for this run or project"
         )
 
-    # Get all failed results for this run
-    failed_results = await result_service.get_failed_results(run_id)
+    # Get all failed results for this run, keeping the last attempt of each URL
+    failed_results = {}
+    for result in await result_service.get_failed_results(run_id):
+        if result.url not in failed_results or result.attempt > failed_results[result.url].attempt:
+            failed_results[result.url] = result
 
-    # Dispatch a Celery task for each failed URL
-    for result in failed_results:
+    # Dispatch a Celery task for each failed URL as its next attempt
+    for result in failed_results.values():
         celery_app.send_task(
             "process_single_url",
-            args=[run_id, result.url, selector_schema]
+            args=[run_id, result.url, selector_schema, run.config or {}, result.attempt + 1],
+            **task_options(RETRY)
         )
 
     return {"retried": len(failed_results)}
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List, Annotated
 from app.schemas.schedule import Schedule, ScheduleCreate, ScheduleUpdate, ScheduleStatus
 from app.services import schedule_service, project_service
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_verified
 from datetime import datetime
 
 router = APIRouter(
@@ -82,7 +82,7 @@ async def update_existing_schedule(
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_existing_schedule(id: int, current_user: Annotated[dict, Depends(get_current_user)]):
+async def delete_existing_schedule(id: int, current_user: Annotated[dict, Depends(get_current_user_verified)]):
     """
     Delete a schedule if it belongs to the authenticated user.
 
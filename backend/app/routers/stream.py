@@ -1,85 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Header, HTTPException, Query, Request
 from sse_starlette.sse import EventSourceResponse # Using sse-starlette
-import aioredis
+from datetime import datetime
+from typing import Optional
+import asyncio
 import json
-import asyncio # Required for asyncio.sleep
+import logging
+
+from app.core.redis import run_event_broker
+from app.services.run_events import parse_event_id, read_events
 
-# Assuming settings are accessible, e.g., from app.core.config import settings
-# For this example, let's define a placeholder if direct import isn't set up in this context
-# In a real app, ensure settings.REDIS_URL is correctly imported and configured.
-class SettingsPlaceholder:
-    REDIS_URL = "redis://localhost"
+logger = logging.getLogger(__name__)
 
-settings = SettingsPlaceholder() # Replace with actual settings import
+# Seconds without events after which a ping event is sent to the client
+PING_INTERVAL = 5.0
 
 router = APIRouter()
 
 @router.get("/runs/{run_id}/stream")
-async def stream_run_events(run_id: int, request: Request): # Added Request to check client connection
-    """Streams events for a given scrape run_id using Server-Sent Events."""
+async def stream_run_events(
+    run_id: int,
+    request: Request, # Added Request to check client connection
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id (for clients that cannot set headers)"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Streams events for a given scrape run_id using Server-Sent Events.
+
+    Events are first replayed from the run's event log, starting after the
+    `Last-Event-ID` header (or `last_event_id` query parameter) or from the
+    beginning of the log for new clients, and then tailed live. Every event
+    carries its log id, so browsers resume where they left off when they
+    reconnect.
+
+    Live events come from the process-wide run event broker, which holds a
+    single Redis pub/sub connection and pushes each event to the client's
+    queue as soon as it arrives.
+    """
+    resume_after = last_event_id_header or last_event_id
+    if resume_after:
+        try:
+            parse_event_id(resume_after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid Last-Event-ID: {resume_after}")
 
-    # Initialize Redis connection within the endpoint handler
-    # This ensures a fresh connection for each client, or use a shared pool
     try:
-        redis = await aioredis.from_url(settings.REDIS_URL)
-        pubsub = redis.pubsub()
-        await pubsub.subscribe(f"run:{run_id}")
+        # Subscribe before replaying so no event falls between the two
+        queue = await run_event_broker.subscribe(run_id)
     except Exception as e:
-        # Log this error appropriately
+        logger.error(f"Could not subscribe to events of run {run_id}: {e}")
         raise HTTPException(status_code=503, detail=f"Could not connect to Redis: {e}")
 
     async def event_generator():
+        last_sent = resume_after
         try:
+            # Replay the logged events the client has not seen
             while True:
-                # Check if client is still connected
-                if await request.is_disconnected():
-                    print(f"Client for run {run_id} disconnected.")
+                events = await read_events(run_id, last_sent)
+                for event in events:
+                    yield {"id": event["id"], "event": event["type"], "data": json.dumps(event["data"])}
+                    last_sent = event["id"]
+                if not events:
                     break
 
-                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=5.0) # 5 second timeout
-                if message and message.get("type") == "message":
-                    try:
-                        # The message['data'] is expected to be a JSON string from the worker
-                        payload_str = message["data"].decode("utf-8") if isinstance(message["data"], bytes) else message["data"]
-                        # No need to json.loads here if worker sends already formatted JSON string for SSE data field
-                        # The EventSourceResponse will handle correct formatting if we yield dicts.
-                        # However, the original request asked for f"data: {json.dumps(payload)}\n\n"
-                        # Let's assume the worker sends a JSON string that IS the payload for SSE's `data` field.
-                        # If worker sends a JSON string representing the *event object* {"type": ..., "data": ...}, then parse and reformat.
-
-                        # Based on worker: {"type": event_type, "data": data_dict}
-                        # We should send this entire structure as the event data for the client to parse.
-                        event_data_to_send = json.loads(payload_str) # Parse the JSON string from Redis
-
-                        yield {"event": event_data_to_send.get("type", "message"), "data": json.dumps(event_data_to_send.get("data"))}
-                        # Example: yield {"event": "record", "data": json.dumps(record_data)}
-                        # Example: yield {"event": "status", "data": json.dumps(status_data)}
-
-                    except json.JSONDecodeError:
-                        print(f"Could not decode JSON from Redis message: {message['data']}")
-                        yield {"event": "error", "data": json.dumps({"detail": "Malformed event data from worker."})}
-                    except Exception as e:
-                        print(f"Error processing message for run {run_id}: {e}")
-                        yield {"event": "error", "data": json.dumps({"detail": "Error processing event."})}
-                else:
-                    # Send a comment to keep the connection alive if no message
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Check if client is still connected
+                    if await request.is_disconnected():
+                        logger.info(f"Client for run {run_id} disconnected.")
+                        break
+                    # Keep the connection alive if no message
                     yield {"event": "ping", "data": json.dumps({"timestamp": datetime.utcnow().isoformat()})}
+                    continue
 
-                await asyncio.sleep(0.1) # Small delay to prevent tight loop if Redis connection is problematic
+                try:
+                    # The worker publishes {"id": stream_id, "type": event_type, "data": data_dict}
+                    payload_str = data.decode("utf-8") if isinstance(data, bytes) else data
+                    event_data_to_send = json.loads(payload_str)
+                    event_id = event_data_to_send.get("id")
+                    if event_id and last_sent and parse_event_id(event_id) <= parse_event_id(last_sent):
+                        # Already sent while replaying
+                        continue
+                    event = {"event": event_data_to_send.get("type", "message"), "data": json.dumps(event_data_to_send.get("data"))}
+                    if event_id:
+                        event["id"] = event_id
+                        last_sent = event_id
+                    yield event
+                except json.JSONDecodeError:
+                    logger.warning(f"Could not decode JSON from Redis message: {data}")
+                    yield {"event": "error", "data": json.dumps({"detail": "Malformed event data from worker."})}
+                except Exception as e:
+                    logger.error(f"Error processing message for run {run_id}: {e}")
+                    yield {"event": "error", "data": json.dumps({"detail": "Error processing event."})}
 
         except asyncio.CancelledError:
-            print(f"Event generator for run {run_id} cancelled (client disconnected).")
-        except Exception as e:
-            print(f"Error in event generator for run {run_id}: {e}")
-            # Consider how to signal this to the client if possible before closing
+            logger.info(f"Event generator for run {run_id} cancelled (client disconnected).")
         finally:
-            print(f"Unsubscribing and closing Redis for run {run_id}")
-            await pubsub.unsubscribe(f"run:{run_id}")
-            await redis.close() # Close the specific Redis connection
-            # If using a connection pool, pubsub.close() and release connection instead.
+            await run_event_broker.unsubscribe(run_id, queue)
 
     # Use EventSourceResponse from sse-starlette
     return EventSourceResponse(event_generator(), media_type="text/event-stream")
-
-# Need to import datetime for the ping event
-from datetime import datetime
@@ -2,4 +2,4 @@
 Pydantic schemas for requests and responses.
 """
 
-from app.schemas import project, run, schedule, template, result
+from app.schemas import project, run, schedule, template, result, queue
@@ -8,6 +8,9 @@ class ProjectBase(BaseModel):
     """Base model for project data."""
     name: str = Field(..., description="Name of the project")
     description: Optional[str] = Field(None, description="Optional description of the project")
+    retention_days: Optional[int] = Field(
+        None, gt=0, description="Days results are kept before they are archived, the default retention if unset"
+    )
 
 
 class ProjectCreate(ProjectBase):
@@ -21,6 +24,7 @@ class ProjectUpdate(BaseModel):
     """Model for updating an existing project."""
     name: Optional[str] = Field(None, description="Name of the project")
     description: Optional[str] = Field(None, description="Description of the project")
+    retention_days: Optional[int] = Field(None, gt=0, description="Days results are kept before they are archived")
     updated_at: Optional[datetime] = Field(None, description="Last update timestamp")
 
 
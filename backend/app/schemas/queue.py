@@ -0,0 +1,12 @@
+"""
+Schema for task queue statistics.
+"""
+from pydantic import BaseModel, Field
+
+
+class QueueDepthsResponse(BaseModel):
+    """Tasks waiting in each Celery queue."""
+    interactive: int = Field(..., description="Runs started from the API")
+    retry: int = Field(..., description="Retries of failed URLs")
+    scheduled: int = Field(..., description="Runs started by schedules")
+    bulk: int = Field(..., description="Large runs and chunks of distributed runs")
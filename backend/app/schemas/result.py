@@ -2,7 +2,7 @@
 Schema for scraping results data.
 """
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional, Literal
+from typing import Dict, Any, List, Optional, Literal
 from datetime import datetime
 
 
@@ -11,8 +11,9 @@ class ResultBase(BaseModel):
     run_id: int = Field(..., description="ID of the run this result belongs to")
     data: Dict[str, Any] = Field(..., description="JSON data extracted from the scraping operation")
     url: str = Field(..., description="URL that was scraped")
-    status: Literal["success", "failed"] = Field("success", description="Status of the scraping operation")
+    status: Literal["success", "failed", "unchanged"] = Field("success", description="Status of the scraping operation; \"unchanged\" results reference the result holding their data in data.unchanged_from")
     error_message: Optional[str] = Field(None, description="Error message if scraping failed")
+    attempt: int = Field(0, ge=0, description="Attempt at the URL within the run, 0 for the run itself and increased by each retry of the failed URL")
 
 
 class ResultCreate(ResultBase):
@@ -24,6 +25,7 @@ class Result(ResultBase):
     """Model for result responses."""
     id: int = Field(..., description="Unique result identifier")
     run_id: int = Field(..., description="ID of the run this result belongs to")
+    data: Optional[Dict[str, Any]] = Field(None, description="JSON data extracted from the scraping operation (omitted from listings unless requested)")
     created_at: datetime = Field(..., description="Creation timestamp")
     updated_at: datetime = Field(..., description="Last update timestamp")
 
@@ -33,8 +35,7 @@ class Result(ResultBase):
 
 
 class ResultsResponse(BaseModel):
-    """Response model for paginated results."""
-    results: list[Result]
-    total: int
-    page: int
-    page_size: int 
+    """Response model for a page of results, ordered by ID."""
+    results: List[Result]
+    page_size: int = Field(..., description="Maximum number of results per page")
+    next_cursor: Optional[int] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
@@ -50,3 +50,10 @@ class Run(RunBase):
     model_config = {
         "from_attributes": True
     }
+
+
+class RunsResponse(BaseModel):
+    """Response model for a page of runs, newest first."""
+    runs: List[Run]
+    page_size: int = Field(..., description="Maximum number of runs per page")
+    next_cursor: Optional[int] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
@@ -9,6 +9,7 @@ class TemplateBase(BaseModel):
     description: str = Field(..., description="Description of the template")
     thumbnail_url: str = Field(..., description="URL to template thumbnail image")
     selector_schema: Dict[str, Any] = Field(..., description="JSON schema defining the selectors for this template")
+    config: Optional[Dict[str, Any]] = Field(None, description="Default run options of runs using this template, e.g. fetch_mode")
 
 
 class TemplateCreate(TemplateBase):
@@ -22,6 +23,7 @@ class TemplateUpdate(BaseModel):
     description: Optional[str] = Field(None, description="Description of the template")
     thumbnail_url: Optional[str] = Field(None, description="URL to template thumbnail image")
     selector_schema: Optional[Dict[str, Any]] = Field(None, description="JSON schema defining the selectors for this template")
+    config: Optional[Dict[str, Any]] = Field(None, description="Default run options of runs using this template, e.g. fetch_mode")
     updated_at: Optional[datetime] = Field(None, description="Last update timestamp")
 
 
@@ -0,0 +1,193 @@
+"""
+Per-process pool of long-lived Chromium browsers for the Celery worker.
+
+Browsers are launched once when the worker process boots and handed out to
+tasks as isolated browser contexts, so a task only pays for a new context
+instead of a full Chromium cold start.
+"""
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+
+from app.core.config import settings
+
+# psutil is optional; without it the RSS based recycling is disabled
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledBrowser:
+    """Bookkeeping for a single browser instance owned by the pool."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active_leases = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """
+    Pool of long-lived Chromium browsers shared by all tasks of a worker process.
+
+    Tasks lease an isolated browser context with `acquire()` / `release()` (or
+    the `lease()` async context manager). Browsers are health checked on every
+    lease and recycled once they have served `max_pages` pages or the browser
+    processes of this worker exceed `max_rss_mb` of resident memory.
+    """
+
+    def __init__(self, size: int = 1, max_pages: int = 200, max_rss_mb: int = 1024,
+                 launch_options: Optional[Dict[str, Any]] = None):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.launch_options = launch_options or {"headless": True}
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._leases: Dict[Any, _PooledBrowser] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self) -> None:
+        """Start Playwright and launch the pooled browsers."""
+        async with self._lock:
+            if self.started:
+                return
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+            for _ in range(self.size):
+                self._browsers.append(await self._launch())
+            logger.info(f"Browser pool started with {self.size} browser(s)")
+
+    async def close(self) -> None:
+        """Close every browser and stop Playwright."""
+        async with self._lock:
+            for context in list(self._leases):
+                try:
+                    await context.close()
+                except Exception as e:
+                    logger.warning(f"Error closing leased browser context: {e}")
+            self._leases.clear()
+
+            for pooled in self._browsers:
+                await self._close_browser(pooled)
+            self._browsers = []
+
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+            logger.info("Browser pool closed")
+
+    async def acquire(self, **context_options):
+        """
+        Lease a fresh, isolated browser context.
+
+        Args:
+            **context_options: Options passed to `browser.new_context()`
+
+        Returns:
+            BrowserContext: The leased context; hand it back with `release()`
+        """
+        if not self.started:
+            await self.start()
+
+        async with self._lock:
+            pooled = await self._select_browser()
+            context = await pooled.browser.new_context(**context_options)
+            pooled.active_leases += 1
+            self._leases[context] = pooled
+
+        def count_page(page):
+            pooled.pages_served += 1
+
+        context.on("page", count_page)
+        return context
+
+    async def release(self, context) -> None:
+        """Close a leased context and return its browser to the pool."""
+        pooled = self._leases.pop(context, None)
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser context: {e}")
+
+        if pooled is None:
+            return
+        pooled.active_leases -= 1
+        if pooled.retired and pooled.active_leases == 0:
+            await self._close_browser(pooled)
+
+    @asynccontextmanager
+    async def lease(self, **context_options):
+        """Async context manager around `acquire()` / `release()`."""
+        context = await self.acquire(**context_options)
+        try:
+            yield context
+        finally:
+            await self.release(context)
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(**self.launch_options)
+        return _PooledBrowser(browser)
+
+    async def _close_browser(self, pooled: _PooledBrowser) -> None:
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled browser: {e}")
+
+    async def _select_browser(self) -> _PooledBrowser:
+        """Pick the least busy browser, replacing unhealthy or worn out ones first."""
+        over_memory = self._browser_rss_mb() > self.max_rss_mb
+        if over_memory and any(b.pages_served for b in self._browsers):
+            # Memory is measured for the whole worker, so recycle the most used browser
+            worn_out = max(self._browsers, key=lambda b: b.pages_served)
+        else:
+            worn_out = None
+
+        for index, pooled in enumerate(self._browsers):
+            healthy = pooled.browser.is_connected()
+            if healthy and pooled.pages_served < self.max_pages and pooled is not worn_out:
+                continue
+
+            if not healthy:
+                logger.warning("Pooled browser disconnected, relaunching")
+            else:
+                logger.info(f"Recycling pooled browser after {pooled.pages_served} pages")
+
+            pooled.retired = True
+            if pooled.active_leases == 0:
+                await self._close_browser(pooled)
+            self._browsers[index] = await self._launch()
+
+        return min(self._browsers, key=lambda b: b.active_leases)
+
+    def _browser_rss_mb(self) -> float:
+        """Resident memory of the browser processes spawned by this worker, in MB."""
+        if not PSUTIL_AVAILABLE or not self.max_rss_mb:
+            return 0.0
+        try:
+            children = psutil.Process(os.getpid()).children(recursive=True)
+            return sum(child.memory_info().rss for child in children) / (1024 * 1024)
+        except Exception as e:
+            logger.debug(f"Could not measure browser memory: {e}")
+            return 0.0
+
+
+# Pool for the current worker process, started by the worker_process_init hook
+browser_pool = BrowserPool(
+    size=settings.BROWSER_POOL_SIZE,
+    max_pages=settings.BROWSER_MAX_PAGES,
+    max_rss_mb=settings.BROWSER_MAX_RSS_MB,
+)
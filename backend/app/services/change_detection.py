@@ -0,0 +1,225 @@
+"""
+Change detection between consecutive runs of a schedule.
+
+Every scraped page gets a fingerprint of its normalized extracted fields (and
+optionally of its HTML). Pages whose fingerprint matches the previous run of
+the same schedule are stored as lightweight "unchanged" results that point at
+the result holding their data, instead of storing the same payload again.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import re
+
+from app.core.config import settings
+from app.core.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# "off", fields only, or fields plus a hash of the page HTML
+CHANGE_DETECTION_MODES = ("off", "fields", "dom")
+
+# URLs looked up per query when loading the fingerprints of the previous run
+LOOKUP_BATCH_SIZE = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def get_change_detection(options: Optional[Dict[str, Any]]) -> str:
+    """
+    Change detection mode of a run.
+
+    Args:
+        options (dict): Run options, may contain `change_detection` (a mode,
+            or a boolean for "fields"/"off")
+
+    Returns:
+        str: The mode, settings.CHANGE_DETECTION if unset or invalid
+    """
+    mode = (options or {}).get('change_detection')
+    if mode is None:
+        mode = settings.CHANGE_DETECTION
+    if isinstance(mode, bool):
+        mode = "fields" if mode else "off"
+    if mode not in CHANGE_DETECTION_MODES:
+        logger.warning(f"Unknown change_detection {mode!r}, using {settings.CHANGE_DETECTION}")
+        mode = settings.CHANGE_DETECTION
+    return mode
+
+
+def html_hash(html: str) -> str:
+    """SHA-256 of a page's HTML, stored as `dom_hash` in "dom" mode."""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def normalize_value(value: Any) -> Any:
+    """Collapse whitespace in the strings of an extracted value, recursively."""
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, list):
+        return [normalize_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize_value(item) for key, item in value.items()}
+    return value
+
+
+def fingerprint(payload: Dict[str, Any], include_dom: bool = False) -> str:
+    """
+    Fingerprint of a result payload.
+
+    Args:
+        payload (dict): Result payload of a scraped page
+        include_dom (bool): Also cover the payload's `dom_hash`
+
+    Returns:
+        str: Hex SHA-256 of the normalized fields (and DOM hash)
+    """
+    material = {"fields": normalize_value(payload.get("fields") or {})}
+    if include_dom and payload.get("dom_hash"):
+        material["dom"] = payload["dom_hash"]
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+async def find_previous_run(schedule_id: Optional[int], run_id: int) -> Optional[int]:
+    """
+    Most recent completed run of a schedule before a run.
+
+    Args:
+        schedule_id (int): ID of the schedule, None for unscheduled runs
+        run_id (int): ID of the current run
+
+    Returns:
+        Optional[int]: ID of the previous run, None if there is none
+    """
+    if schedule_id is None:
+        return None
+    response = await (
+        get_db().table("runs").select("id")
+        .eq("schedule_id", schedule_id)
+        .eq("status", "completed")
+        .lt("id", run_id)
+        .order("id", desc=True)
+        .limit(1)
+        .execute()
+    )
+    if hasattr(response, 'error') and response.error is not None:
+        raise Exception(f"Failed to look up the previous run of schedule {schedule_id}: {response.error}")
+    return response.data[0]["id"] if response.data else None
+
+
+class ChangeDetector:
+    """
+    Classifies the pages of a run as new, changed or unchanged against the
+    previous run of its schedule.
+
+    `load` fetches the fingerprints the previous run stored for the run's URLs
+    (only the fingerprint, not the payloads) over the async database client,
+    so the worker loop keeps serving other slots meanwhile, after which
+    `classify` is a dictionary lookup per page.
+    """
+
+    def __init__(self, previous_run_id: Optional[int], mode: str = "fields"):
+        self.previous_run_id = previous_run_id
+        self.mode = mode
+        # Pages the server reported as not modified are also counted as unchanged
+        self.counts = {"new": 0, "changed": 0, "unchanged": 0, "not_modified": 0}
+        # URL -> (fingerprint, ID of the result holding the data)
+        self._previous: Dict[str, Tuple[Optional[str], int]] = {}
+
+    async def load(self, urls: List[str]) -> None:
+        """Fetch the fingerprints of the previous run for the given URLs."""
+        if self.previous_run_id is None:
+            return
+        for start in range(0, len(urls), LOOKUP_BATCH_SIZE):
+            batch = urls[start:start + LOOKUP_BATCH_SIZE]
+            response = await (
+                get_db().table("results")
+                .select("id, url, fingerprint:data->>fingerprint, unchanged_from:data->>unchanged_from")
+                .eq("run_id", self.previous_run_id)
+                .in_("url", batch)
+                .neq("status", "failed")
+                .execute()
+            )
+            if hasattr(response, 'error') and response.error is not None:
+                raise Exception(f"Failed to load fingerprints of run {self.previous_run_id}: {response.error}")
+            for row in response.data:
+                # Unchanged results point at the result that holds the data
+                source_id = int(row["unchanged_from"]) if row.get("unchanged_from") else row["id"]
+                self._previous[row["url"]] = (row.get("fingerprint"), source_id)
+        logger.info(f"Loaded {len(self._previous)} fingerprints of run {self.previous_run_id}")
+
+    def previous(self, url: str) -> Optional[Tuple[Optional[str], int]]:
+        """Fingerprint and data result ID of a URL in the previous run, None if it had none."""
+        return self._previous.get(url)
+
+    def not_modified(self, url: str) -> Tuple[Optional[str], int]:
+        """
+        Count a page the server answered with 304 Not Modified as unchanged.
+
+        Only valid for URLs `previous` knows.
+
+        Returns:
+            Tuple[str, int]: Fingerprint and data result ID of the page in the
+            previous run
+        """
+        self.counts["unchanged"] += 1
+        self.counts["not_modified"] += 1
+        return self._previous[url]
+
+    def classify(self, url: str, payload: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+        """
+        Fingerprint a payload and compare it with the previous run.
+
+        The fingerprint is stored in the payload as `fingerprint`.
+
+        Args:
+            url (str): URL of the page
+            payload (dict): Result payload of the page
+
+        Returns:
+            Tuple[str, Optional[int]]: "new", "changed" or "unchanged", and for
+            unchanged pages the ID of the result holding their data
+        """
+        payload["fingerprint"] = fingerprint(payload, include_dom=self.mode == "dom")
+        previous = self._previous.get(url)
+        if previous is None:
+            change, source_id = "new", None
+        elif previous[0] == payload["fingerprint"]:
+            change, source_id = "unchanged", previous[1]
+        else:
+            change, source_id = "changed", None
+        self.counts[change] += 1
+        return change, source_id
+
+
+def get_change_detector(options: Optional[Dict[str, Any]]) -> Optional[ChangeDetector]:
+    """
+    Change detector of a run, None if change detection is off.
+
+    Runs are compared with the run given by the `previous_run_id` option,
+    which the worker sets for scheduled runs.
+    """
+    mode = get_change_detection(options)
+    if mode == "off":
+        return None
+    return ChangeDetector((options or {}).get('previous_run_id'), mode)
+
+
+def merge_change_counts(counts_list: Iterable[Optional[Dict[str, int]]]) -> Optional[Dict[str, int]]:
+    """
+    Sum the change counts of several recorders, e.g. the chunks of a run.
+
+    Returns:
+        Optional[dict]: The summed counts, None if change detection was off
+    """
+    merged = None
+    for counts in counts_list:
+        if not counts:
+            continue
+        if merged is None:
+            merged = {"new": 0, "changed": 0, "unchanged": 0, "not_modified": 0}
+        for key in merged:
+            merged[key] += counts.get(key, 0)
+    return merged
@@ -0,0 +1,118 @@
+"""
+Batched, throttled publishing of run events from the worker.
+"""
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.services import run_events
+
+logger = logging.getLogger(__name__)
+
+
+class EventBatcher:
+    """
+    Buffers the events of a run and publishes them in pipelined batches.
+
+    Events such as `record` and `url_error` are buffered and published in
+    order once `batch_size` of them are waiting or `flush_interval` seconds
+    after the first one was buffered. Status updates are coalesced: callers
+    only mark the status as changed, and `status_factory` is awaited at flush
+    time to build a single `status` event, at most once every
+    `status_interval` seconds. Flushes run in a background task, so adding an
+    event never waits for Redis. `close()` publishes everything left,
+    including the latest status.
+
+    Publishing is best effort: a failed flush is logged and its events are
+    dropped, as they are still recoverable from the results table.
+    """
+
+    def __init__(self, run_id: int, status_factory: Optional[Callable[[], Awaitable[dict]]] = None,
+                 batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 status_interval: Optional[float] = None):
+        self.run_id = run_id
+        self.status_factory = status_factory
+        self.batch_size = max(1, batch_size or settings.EVENT_BATCH_SIZE)
+        self.flush_interval = flush_interval if flush_interval is not None else settings.EVENT_FLUSH_INTERVAL
+        self.status_interval = status_interval if status_interval is not None else settings.STATUS_EVENT_INTERVAL
+        self._events: List[Tuple[str, Any]] = []
+        self._status_changed = False
+        self._status_sent_at: Optional[float] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._deadline: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def add(self, event_type: str, data: Any) -> None:
+        """Buffer an event, scheduling a flush if needed."""
+        self._events.append((event_type, data))
+        if len(self._events) >= self.batch_size:
+            self._schedule(0)
+        else:
+            self._schedule(self.flush_interval)
+
+    def status_changed(self) -> None:
+        """Mark the run status as changed, so the next allowed flush publishes it."""
+        self._status_changed = True
+        self._schedule(self._status_delay())
+
+    async def flush(self, force: bool = False) -> None:
+        """
+        Publish the buffered events and, if it is due, the status.
+
+        Args:
+            force (bool): Publish a changed status even if the status interval
+                has not elapsed yet
+        """
+        async with self._lock:
+            events, self._events = self._events, []
+            send_status = self._status_changed and self.status_factory is not None and (
+                force or self._status_delay() == 0
+            )
+            try:
+                if send_status:
+                    self._status_changed = False
+                    events.append(("status", await self.status_factory()))
+                if events:
+                    await run_events.append_events(self.run_id, events)
+                    logger.debug(f"Published {len(events)} events of run {self.run_id}")
+                if send_status:
+                    self._status_sent_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error publishing {len(events)} events of run {self.run_id}: {e}")
+
+        if self._status_changed and self.status_factory is not None:
+            self._schedule(self._status_delay())
+
+    async def close(self) -> None:
+        """Cancel the flush timer and publish everything left, including the status."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._deadline = None
+        await self.flush(force=True)
+
+    def _status_delay(self) -> float:
+        if self._status_sent_at is None:
+            return 0
+        return max(0.0, self._status_sent_at + self.status_interval - time.monotonic())
+
+    def _schedule(self, delay: float) -> None:
+        deadline = time.monotonic() + delay
+        if self._timer is not None and self._deadline is not None and self._deadline <= deadline:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._deadline = deadline
+        self._timer = asyncio.ensure_future(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        # Detach before flushing so a reschedule cannot cancel a flush in progress
+        self._timer = None
+        self._deadline = None
+        await self.flush()
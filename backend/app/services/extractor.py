@@ -0,0 +1,136 @@
+"""
+Single-pass extraction of a selector schema from a Playwright page.
+
+The whole schema is compiled into one `page.evaluate` call that returns every
+field and the page title together, instead of one protocol round trip per
+field.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Evaluated in the page with the compiled field specs as its argument. Fields
+# whose selector is not valid CSS (Playwright-only syntax such as `text=` or
+# `xpath=`) are flagged with `fallback` so they can go through a locator.
+EXTRACTION_SCRIPT = """
+(fields) => {
+    const values = {};
+    const errors = {};
+    const fallback = [];
+    for (const field of fields) {
+        let element;
+        try {
+            element = document.querySelector(field.selector);
+        } catch (e) {
+            fallback.push(field.name);
+            continue;
+        }
+        if (!element) {
+            values[field.name] = null;
+            errors[field.name] = `No element matches selector ${field.selector}`;
+            continue;
+        }
+        try {
+            if (field.type === 'html') {
+                values[field.name] = element.innerHTML;
+            } else if (field.type === 'link' && field.attribute) {
+                values[field.name] = element.getAttribute(field.attribute);
+            } else {
+                values[field.name] = element.innerText;
+            }
+        } catch (e) {
+            values[field.name] = null;
+            errors[field.name] = String(e);
+        }
+    }
+    return {title: document.title, values, errors, fallback};
+}
+"""
+
+
+def compile_schema(selector_schema: Dict[str, Any]) -> List[Dict[str, Optional[str]]]:
+    """
+    Compile a selector schema into the field specs passed to EXTRACTION_SCRIPT.
+
+    Args:
+        selector_schema (dict): Selector schema defining what to extract
+
+    Returns:
+        List[dict]: One spec per field with name, selector, type and attribute
+    """
+    return [
+        {
+            "name": field_name,
+            "selector": field_config.get('selector'),
+            "type": field_config.get('type', 'text'),
+            "attribute": field_config.get('attribute'),
+        }
+        for field_name, field_config in selector_schema.items()
+    ]
+
+
+async def extract_page(page, selector_schema: Dict[str, Any], url: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Extract all fields of a selector schema and the page title in one call.
+
+    Args:
+        page (Page): Playwright page the URL has been loaded into
+        selector_schema (dict): Selector schema defining what to extract
+        url (str): URL of the page, used for logging
+
+    Returns:
+        Tuple[dict, str]: Extracted value per field (None for fields that
+        failed) and the page title
+    """
+    fields = compile_schema(selector_schema)
+    extraction = await page.evaluate(EXTRACTION_SCRIPT, fields)
+
+    extracted_data = {}
+    for field in fields:
+        name = field["name"]
+        if name in extraction["errors"]:
+            logger.warning(f"Failed to extract {name} with selector {field['selector']} for {url}: {extraction['errors'][name]}")
+        extracted_data[name] = extraction["values"].get(name)
+
+    if extraction["fallback"]:
+        fallback_schema = {name: selector_schema[name] for name in extraction["fallback"]}
+        extracted_data.update(await extract_fields_with_locators(page, fallback_schema, url))
+
+    return extracted_data, extraction["title"]
+
+
+async def extract_fields_with_locators(page, selector_schema: Dict[str, Any], url: str) -> Dict[str, Any]:
+    """
+    Extract fields one Playwright locator call at a time.
+
+    Used for selectors that only Playwright understands, and as the baseline
+    of scripts/benchmark_extraction.py.
+
+    Args:
+        page (Page): Playwright page the URL has been loaded into
+        selector_schema (dict): Selector schema defining what to extract
+        url (str): URL of the page, used for logging
+
+    Returns:
+        dict: Extracted value per field, None for fields that failed
+    """
+    extracted_data = {}
+    for field_name, field_config in selector_schema.items():
+        selector = field_config.get('selector')
+        field_type = field_config.get('type', 'text')
+        attribute = field_config.get('attribute')
+        try:
+            if field_type == 'text':
+                value = await page.locator(selector).first.inner_text()
+            elif field_type == 'html':
+                value = await page.locator(selector).first.inner_html()
+            elif field_type == 'link' and attribute:
+                value = await page.locator(selector).first.get_attribute(attribute)
+            else:
+                value = await page.locator(selector).first.inner_text()
+            extracted_data[field_name] = value
+        except Exception as field_error:
+            logger.warning(f"Failed to extract {field_name} with selector {selector} for {url}: {field_error}")
+            extracted_data[field_name] = None
+    return extracted_data
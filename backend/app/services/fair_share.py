@@ -0,0 +1,177 @@
+"""
+Fair share of the worker fleet between tenants.
+
+A run holds a slot of its project and of the project's owner while it is
+processed. Runs beyond MAX_ACTIVE_RUNS_PER_PROJECT or MAX_ACTIVE_RUNS_PER_USER
+are deferred and re-queued, so one tenant's runs cannot occupy every worker.
+Slots are kept in Redis sorted sets scored by their expiry, so slots of
+crashed workers free themselves after RUN_SLOT_TTL seconds. Workers scraping
+a run, including each chunk of a distributed run, refresh its slots while
+they make progress, so long runs keep them.
+
+Deferred runs are not ordered: each is re-queued on its own after
+FAIR_SHARE_RETRY_DELAY seconds, and whichever asks first once a slot is free
+takes it. A run may therefore be deferred several times while later runs of
+the same tenant go ahead of it.
+"""
+from typing import Optional
+import logging
+import time
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Share of RUN_SLOT_TTL after which workers refresh the slots of their run
+RUN_SLOT_REFRESH_FRACTION = 0.25
+
+# KEYS: project slots, user slots, run owner hash
+# ARGV: run id, project limit (0: none), user limit (0: none), slot ttl ms
+# Returns 1 if the run holds its slots, 0 if a limit is reached
+ACQUIRE_SLOT_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local expires = now + tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    local project_limit = tonumber(ARGV[2])
+    local user_limit = tonumber(ARGV[3])
+    if project_limit > 0 and redis.call('ZCARD', KEYS[1]) >= project_limit then
+        return 0
+    end
+    if user_limit > 0 and redis.call('ZCARD', KEYS[2]) >= user_limit then
+        return 0
+    end
+end
+
+redis.call('ZADD', KEYS[1], expires, ARGV[1])
+redis.call('ZADD', KEYS[2], expires, ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[2], ARGV[4])
+redis.call('HSET', KEYS[3], 'project', KEYS[1], 'user', KEYS[2])
+redis.call('PEXPIRE', KEYS[3], ARGV[4])
+return 1
+"""
+
+_acquire_script = None
+
+
+def run_slot_keys(run_id: int, project_id: int, user_id: Optional[str]):
+    """Keys of the project slots, the user slots and the owner of a run."""
+    return [
+        f"fairshare:project:{project_id}",
+        f"fairshare:user:{user_id or 'unknown'}",
+        f"fairshare:run:{run_id}",
+    ]
+
+
+def get_project_owner(project_id: int) -> Optional[str]:
+    """ID of the user owning a project, None if it cannot be looked up."""
+    from app.core.supabase import supabase
+
+    try:
+        response = supabase.table("projects").select("user_id").eq("id", project_id).execute()
+        return str(response.data[0]["user_id"]) if response.data else None
+    except Exception as e:
+        logger.error(f"Failed to look up the owner of project {project_id}: {e}")
+        return None
+
+
+async def acquire_run_slot(run_id: int, project_id: int, user_id: Optional[str]) -> bool:
+    """
+    Take the slots of a run, unless its project or user is at its limit.
+
+    Acquiring again for a run that holds its slots (a retried task) succeeds
+    and refreshes them. Without limits, or if Redis is unavailable, the run
+    is let through.
+
+    Args:
+        run_id (int): ID of the run
+        project_id (int): ID of the run's project
+        user_id (str): ID of the project owner, None if unknown
+
+    Returns:
+        bool: Whether the run may be processed now
+    """
+    global _acquire_script
+    user_limit = settings.MAX_ACTIVE_RUNS_PER_USER if user_id else 0
+    if not settings.MAX_ACTIVE_RUNS_PER_PROJECT and not user_limit:
+        return True
+    try:
+        redis = get_redis()
+        if _acquire_script is None:
+            _acquire_script = redis.register_script(ACQUIRE_SLOT_SCRIPT)
+        acquired = await _acquire_script(
+            keys=run_slot_keys(run_id, project_id, user_id),
+            args=[run_id, settings.MAX_ACTIVE_RUNS_PER_PROJECT, user_limit, int(settings.RUN_SLOT_TTL * 1000)],
+            client=redis,
+        )
+    except Exception as e:
+        logger.error(f"Fair share check of run {run_id} failed, letting it through: {e}")
+        return True
+    return bool(int(acquired))
+
+
+async def refresh_run_slot(run_id: int) -> None:
+    """
+    Extend the slots a run holds by RUN_SLOT_TTL from now.
+
+    Slots that expired or were released are not taken again.
+    """
+    try:
+        redis = get_redis()
+        owner_key = f"fairshare:run:{run_id}"
+        owner = await redis.hgetall(owner_key)
+        if not owner:
+            return
+        # Slot expiries are on the Redis clock, see ACQUIRE_SLOT_SCRIPT
+        seconds, microseconds = await redis.time()
+        ttl = int(settings.RUN_SLOT_TTL * 1000)
+        expires = int(seconds) * 1000 + int(microseconds) // 1000 + ttl
+        pipe = redis.pipeline(transaction=False)
+        for key in owner.values():
+            key = key.decode("utf-8") if isinstance(key, bytes) else key
+            pipe.zadd(key, {run_id: expires}, xx=True)
+            pipe.pexpire(key, ttl)
+        pipe.pexpire(owner_key, ttl)
+        await pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to refresh the fair share slots of run {run_id}: {e}")
+
+
+class SlotHeartbeat:
+    """
+    Refreshes the slots of a run at most once every RUN_SLOT_REFRESH_FRACTION
+    of RUN_SLOT_TTL, however often it is beaten.
+    """
+
+    def __init__(self, run_id: int):
+        self.run_id = run_id
+        self.interval = settings.RUN_SLOT_TTL * RUN_SLOT_REFRESH_FRACTION
+        self._refreshed_at: Optional[float] = None
+
+    async def beat(self) -> None:
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.interval:
+            return
+        self._refreshed_at = now
+        await refresh_run_slot(self.run_id)
+
+
+async def release_run_slot(run_id: int) -> None:
+    """Free the slots of a run once it finished."""
+    try:
+        redis = get_redis()
+        owner_key = f"fairshare:run:{run_id}"
+        owner = await redis.hgetall(owner_key)
+        pipe = redis.pipeline(transaction=False)
+        for key in owner.values():
+            pipe.zrem(key.decode("utf-8") if isinstance(key, bytes) else key, run_id)
+        pipe.delete(owner_key)
+        await pipe.execute()
+    except Exception as e:
+        # The slots expire after RUN_SLOT_TTL anyway
+        logger.error(f"Failed to release the fair share slots of run {run_id}: {e}")
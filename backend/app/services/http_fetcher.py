@@ -0,0 +1,148 @@
+"""
+Browserless fetching for server-rendered pages.
+
+Pages are downloaded with a pooled async HTTP client and the selector schema is
+evaluated with selectolax, a fast CSS-selector HTML parser, so static sites do
+not need a Chromium page per URL.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import logging
+import re
+
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+
+from app.core.config import settings
+from app.services.politeness import THROTTLE_STATUSES, ThrottledError, parse_retry_after
+from app.services.validator_cache import not_modified_payload, response_validators
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# HTTP client of the current worker process, bound to the worker event loop
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=settings.HTTP_FETCH_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+            ),
+            headers={"User-Agent": settings.HTTP_USER_AGENT},
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the process-wide HTTP client."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def extract_from_html(html: str, selector_schema: Dict[str, Any], url: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Evaluate a selector schema against an HTML document.
+
+    Text values are the element's text with whitespace collapsed, which is
+    close to what `innerText` returns in the browser for static markup.
+
+    Args:
+        html (str): HTML document
+        selector_schema (dict): Selector schema defining what to extract
+        url (str): URL of the page, used for logging
+
+    Returns:
+        Tuple[dict, str]: Extracted value per field (None for fields that
+        failed) and the page title
+    """
+    tree = LexborHTMLParser(html)
+    extracted_data = {}
+    for field_name, field_config in selector_schema.items():
+        selector = field_config.get('selector')
+        field_type = field_config.get('type', 'text')
+        attribute = field_config.get('attribute')
+        try:
+            node = tree.css_first(selector)
+            if node is None:
+                raise ValueError(f"No element matches selector {selector}")
+            if field_type == 'html':
+                value = "".join(child.html or "" for child in node.iter(include_text=True))
+            elif field_type == 'link' and attribute:
+                value = node.attributes.get(attribute)
+            else:
+                value = _WHITESPACE.sub(" ", node.text()).strip()
+            extracted_data[field_name] = value
+        except Exception as field_error:
+            logger.warning(f"Failed to extract {field_name} with selector {selector} for {url}: {field_error}")
+            extracted_data[field_name] = None
+
+    title_node = tree.css_first("title")
+    title = title_node.text().strip() if title_node is not None else ""
+    return extracted_data, title
+
+
+def missing_required_fields(extracted_data: Dict[str, Any], selector_schema: Dict[str, Any]) -> List[str]:
+    """
+    Fields that came back empty although the schema requires them.
+
+    Every field is required unless its config sets `required: false`.
+    """
+    return [
+        field_name for field_name, field_config in selector_schema.items()
+        if field_config.get('required', True) and extracted_data.get(field_name) in (None, "")
+    ]
+
+
+async def fetch_page(url: str, selector_schema: Dict[str, Any], dom_hash: bool = False,
+                     headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Download a URL over plain HTTP and extract its fields.
+
+    Args:
+        url (str): URL to scrape
+        selector_schema (dict): Selector schema defining what to extract
+        dom_hash (bool): Add the `dom_hash` of the page to the payload
+        headers (dict): Extra request headers, e.g. conditional request headers
+
+    Returns:
+        dict: Result payload with url, title, extraction time, fields and the
+        response's `validators`, or a `not_modified` payload if the server
+        answered a conditional request with 304
+
+    Raises:
+        httpx.HTTPError: If the request fails or returns an error status
+        ThrottledError: If the host answers 429 or 503
+    """
+    response = await get_http_client().get(url, headers=headers)
+    if response.status_code == 304:
+        return not_modified_payload(url)
+    if response.status_code in THROTTLE_STATUSES:
+        raise ThrottledError(url, response.status_code, parse_retry_after(response.headers.get("retry-after")))
+    response.raise_for_status()
+    extracted_data, title = extract_from_html(response.text, selector_schema, url)
+
+    payload = {
+        "url": url,
+        "title": title,
+        "extracted_at": datetime.utcnow().isoformat(),
+        "fields": extracted_data,
+        "fetch_mode": "http"
+    }
+    validators = response_validators(response.headers)
+    if validators:
+        payload["validators"] = validators
+    if dom_hash:
+        from app.services.change_detection import html_hash
+
+        payload["dom_hash"] = html_hash(response.text)
+    return payload
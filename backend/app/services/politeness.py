@@ -0,0 +1,323 @@
+"""
+Fleet-wide per-domain politeness.
+
+Every page load first leases a slot of its domain from Redis. A Lua script
+grants the lease atomically when the domain's token bucket has a token (its
+requests per second), fewer than its maximum number of pages are in flight
+across all workers, and the domain is not backing off. Hosts answering 429 or
+503 put their domain into exponential backoff, honouring Retry-After, which
+successful loads gradually lift again.
+
+While a domain is throttled, `DomainQueue` hands out URLs of other domains.
+"""
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import logging
+import uuid
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Statuses telling that a host wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+# KEYS: bucket hash, lease sorted set, backoff hash
+# ARGV: requests per second (0: unlimited), burst, max concurrency (0:
+# unlimited), lease id, lease ttl ms, poll delay ms
+# Returns 0 if the lease was granted, else the milliseconds to wait
+ACQUIRE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_concurrency = tonumber(ARGV[3])
+local lease_ttl = tonumber(ARGV[5])
+
+local blocked_until = tonumber(redis.call('HGET', KEYS[3], 'until') or '0')
+if blocked_until > now then
+    return blocked_until - now
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if max_concurrency > 0 and redis.call('ZCARD', KEYS[2]) >= max_concurrency then
+    return tonumber(ARGV[6])
+end
+
+if rate > 0 then
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+    if tokens < 1 then
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+        return math.ceil((1 - tokens) * 1000 / rate)
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+end
+
+redis.call('ZADD', KEYS[2], now + lease_ttl, ARGV[4])
+redis.call('PEXPIRE', KEYS[2], lease_ttl)
+return 0
+"""
+
+# KEYS: lease sorted set, backoff hash
+# ARGV: lease id, base delay ms
+# Releases a lease after a successful load and halves the domain's backoff
+RELEASE_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+local delay = tonumber(redis.call('HGET', KEYS[2], 'delay') or '0')
+if delay > 0 then
+    if delay / 2 < tonumber(ARGV[2]) then
+        redis.call('DEL', KEYS[2])
+    else
+        redis.call('HSET', KEYS[2], 'delay', delay / 2)
+    end
+end
+return 0
+"""
+
+# KEYS: lease sorted set, backoff hash
+# ARGV: lease id, base delay ms, max delay ms, Retry-After ms (0: none)
+# Releases a lease of a throttled load and doubles the domain's backoff
+THROTTLE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZREM', KEYS[1], ARGV[1])
+local delay = tonumber(redis.call('HGET', KEYS[2], 'delay') or '0')
+delay = math.min(tonumber(ARGV[3]), math.max(tonumber(ARGV[2]), delay * 2))
+delay = math.max(delay, tonumber(ARGV[4]))
+redis.call('HSET', KEYS[2], 'delay', delay, 'until', now + delay)
+redis.call('PEXPIRE', KEYS[2], delay * 4)
+return delay
+"""
+
+_scripts: Dict[str, Any] = {}
+
+
+class ThrottledError(Exception):
+    """A host answered with 429 Too Many Requests or 503 Service Unavailable."""
+
+    def __init__(self, url: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"{url} answered {status}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds of a Retry-After header; HTTP dates are not supported."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def domain_of(url: str) -> str:
+    """Host name of a URL without a leading "www.", the unit rate limits apply to."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _script(redis, name: str, source: str):
+    if name not in _scripts:
+        _scripts[name] = redis.register_script(source)
+    return _scripts[name]
+
+
+class PolitenessScheduler:
+    """
+    Leases page loads of domains from the fleet-wide limits in Redis.
+
+    Args:
+        qps (float): Requests per second per domain, 0 for no limit
+        max_concurrency (int): Pages of a domain in flight across all
+            workers, 0 for no limit
+        domains (dict): Per-domain overrides of `qps` and `max_concurrency`,
+            keyed by domain
+    """
+
+    def __init__(self, qps: float, max_concurrency: int, domains: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.qps = qps
+        self.max_concurrency = max_concurrency
+        self.domains = {domain.lower(): limits for domain, limits in (domains or {}).items()}
+
+    def limits(self, domain: str) -> Tuple[float, int]:
+        """Requests per second and maximum concurrency of a domain."""
+        overrides = self.domains.get(domain, {})
+        return (float(overrides.get('qps', self.qps)),
+                int(overrides.get('max_concurrency', self.max_concurrency)))
+
+    @staticmethod
+    def keys(domain: str) -> List[str]:
+        return [f"politeness:{domain}:bucket", f"politeness:{domain}:leases", f"politeness:{domain}:backoff"]
+
+    async def acquire(self, domain: str) -> Tuple[Optional[str], float]:
+        """
+        Try to lease a page load of a domain.
+
+        Returns:
+            Tuple[Optional[str], float]: The lease id and 0, or None and the
+            seconds to wait before trying the domain again
+        """
+        qps, max_concurrency = self.limits(domain)
+        lease = uuid.uuid4().hex
+        redis = get_redis()
+        wait_ms = await _script(redis, "acquire", ACQUIRE_SCRIPT)(
+            keys=self.keys(domain),
+            args=[qps, max(1.0, qps), max_concurrency, lease,
+                  int(settings.DOMAIN_LEASE_TTL * 1000), int(settings.DOMAIN_POLL_INTERVAL * 1000)],
+            client=redis,
+        )
+        if int(wait_ms) == 0:
+            return lease, 0.0
+        return None, int(wait_ms) / 1000
+
+    async def release(self, domain: str, lease: str) -> None:
+        """Release the lease of a page load that was not throttled."""
+        redis = get_redis()
+        await _script(redis, "release", RELEASE_SCRIPT)(
+            keys=self.keys(domain)[1:],
+            args=[lease, int(settings.DOMAIN_BACKOFF_BASE * 1000)],
+            client=redis,
+        )
+
+    async def throttled(self, domain: str, lease: str, retry_after: Optional[float] = None) -> float:
+        """
+        Release the lease of a throttled page load and back the domain off.
+
+        Returns:
+            float: Seconds the domain is backed off for
+        """
+        redis = get_redis()
+        delay_ms = await _script(redis, "throttle", THROTTLE_SCRIPT)(
+            keys=self.keys(domain)[1:],
+            args=[lease, int(settings.DOMAIN_BACKOFF_BASE * 1000), int(settings.DOMAIN_BACKOFF_MAX * 1000),
+                  int((retry_after or 0) * 1000)],
+            client=redis,
+        )
+        logger.warning(f"{domain} is throttling requests, backing off for {int(delay_ms) / 1000:.1f}s")
+        return int(delay_ms) / 1000
+
+
+def get_politeness_scheduler(options: Optional[Dict[str, Any]]) -> Optional[PolitenessScheduler]:
+    """
+    Politeness scheduler of a run, None if politeness is disabled.
+
+    Args:
+        options (dict): Run options, may contain `politeness`: false, or an
+            object with `qps`, `max_concurrency` and per-domain `domains`
+    """
+    politeness = (options or {}).get('politeness')
+    if politeness is None:
+        politeness = settings.POLITENESS_ENABLED
+    if politeness is False:
+        return None
+    politeness = politeness if isinstance(politeness, dict) else {}
+    return PolitenessScheduler(
+        qps=float(politeness.get('qps', settings.DOMAIN_QPS)),
+        max_concurrency=int(politeness.get('max_concurrency', settings.DOMAIN_MAX_CONCURRENCY)),
+        domains=politeness.get('domains'),
+    )
+
+
+class DomainQueue:
+    """
+    URLs of a run grouped by domain, handed out round-robin over the domains.
+
+    With a scheduler, `get` only returns a URL once its domain granted a
+    lease; domains that must wait are skipped, so URLs of other domains go
+    first. Throttled URLs are put back up to `max_attempts` times.
+    """
+
+    def __init__(self, urls: List[str], scheduler: Optional[PolitenessScheduler] = None,
+                 max_attempts: Optional[int] = None):
+        self.scheduler = scheduler
+        self.max_attempts = max_attempts or settings.THROTTLED_URL_ATTEMPTS
+        self._queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._not_before: Dict[str, float] = {}
+        self._attempts: Dict[str, int] = {}
+        for url in urls:
+            self._queues.setdefault(domain_of(url), deque()).append(url)
+
+    async def get(self) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Next URL that may be loaded now.
+
+        Returns:
+            Optional[Tuple[str, Optional[str]]]: URL and its lease (None
+            without a scheduler), None once the queue is empty
+        """
+        loop = asyncio.get_running_loop()
+        while self._queues:
+            now = loop.time()
+            wait = settings.DOMAIN_POLL_INTERVAL
+            for domain in list(self._queues):
+                not_before = self._not_before.get(domain, 0.0)
+                if not_before > now:
+                    wait = min(wait, not_before - now)
+                    continue
+                lease, delay = None, 0.0
+                if self.scheduler is not None:
+                    try:
+                        lease, delay = await self.scheduler.acquire(domain)
+                    except Exception as e:
+                        # Keep scraping without fleet-wide limits while Redis is unavailable
+                        logger.error(f"Failed to lease a page load of {domain}: {e}")
+                        lease, delay = None, 0.0
+                    else:
+                        if lease is None:
+                            self._not_before[domain] = loop.time() + delay
+                            wait = min(wait, delay)
+                            continue
+                queue = self._queues.get(domain)
+                if not queue:
+                    # Another slot took the last URL while we waited for the lease
+                    if lease is not None:
+                        await self.scheduler.release(domain, lease)
+                    continue
+                url = queue.popleft()
+                if queue:
+                    self._queues.move_to_end(domain)
+                else:
+                    del self._queues[domain]
+                return url, lease
+            await asyncio.sleep(max(wait, 0.01))
+        return None
+
+    async def done(self, url: str, lease: Optional[str]) -> None:
+        """Release the lease of a URL that was loaded (successfully or not)."""
+        if lease is not None:
+            try:
+                await self.scheduler.release(domain_of(url), lease)
+            except Exception as e:
+                # The lease expires after DOMAIN_LEASE_TTL anyway
+                logger.error(f"Failed to release the lease of {url}: {e}")
+
+    async def throttled(self, url: str, lease: Optional[str], error: ThrottledError) -> bool:
+        """
+        Back a URL's domain off and put the URL back in the queue.
+
+        Returns:
+            bool: False if the URL used up its attempts and was not put back
+        """
+        domain = domain_of(url)
+        delay = settings.DOMAIN_BACKOFF_BASE
+        if lease is not None:
+            try:
+                delay = await self.scheduler.throttled(domain, lease, error.retry_after)
+            except Exception as e:
+                logger.error(f"Failed to back off {domain}: {e}")
+        if error.retry_after:
+            delay = max(delay, error.retry_after)
+        self._not_before[domain] = asyncio.get_running_loop().time() + delay
+
+        self._attempts[url] = self._attempts.get(url, 1) + 1
+        if self._attempts[url] > self.max_attempts:
+            return False
+        self._queues.setdefault(domain, deque()).append(url)
+        return True
@@ -3,7 +3,10 @@ from datetime import datetime
 from uuid import UUID
 from fastapi import HTTPException
 from app.schemas.project import Project, ProjectCreate, ProjectUpdate
-from app.core.supabase import supabase
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_db
+from app.repositories import get_repository
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +14,15 @@ logger = logging.getLogger(__name__)
 # Table name in Supabase
 PROJECTS_TABLE = "projects"
 
+# Projects by (user_id, project_id), so authorizing a request against a
+# project it recently accessed needs no query
+_project_cache = TTLCache(ttl=settings.OWNERSHIP_CACHE_TTL, max_size=settings.OWNERSHIP_CACHE_SIZE)
+
+
+def invalidate_project(id: int) -> None:
+    """Drop a project from the cache of this process, for every user."""
+    _project_cache.delete_where(lambda key: key[1] == id)
+
 
 async def get_projects(user_id: UUID) -> List[Project]:
     """
@@ -23,7 +35,7 @@ async def get_projects(user_id: UUID) -> List[Project]:
         List[Project]: List of all projects owned by the user
     """
     try:
-        response = supabase.table(PROJECTS_TABLE).select("*").eq("user_id", str(user_id)).execute()
+        response = await get_db().table(PROJECTS_TABLE).select("*").eq("user_id", str(user_id)).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching projects: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to fetch projects")
@@ -38,6 +50,10 @@ async def get_project(id: int, user_id: UUID) -> Project:
     """
     Retrieve a single project by ID that belongs to the user.
 
+    Found projects are cached for OWNERSHIP_CACHE_TTL seconds, since most
+    routes call this only to authorize access to the project's runs and
+    results.
+
     Args:
         id (int): Project ID
         user_id (UUID): The ID of the authenticated user
@@ -48,16 +64,19 @@ async def get_project(id: int, user_id: UUID) -> Project:
     Raises:
         HTTPException: If project not found or doesn't belong to the user
     """
-    try:
-        response = supabase.table(PROJECTS_TABLE).select("*").eq("id", id).eq("user_id", str(user_id)).execute()
-        if hasattr(response, 'error') and response.error is not None:
-            logger.error(f"Error fetching project {id}: {response.error}")
-            raise HTTPException(status_code=500, detail="Failed to fetch project")
+    cache_key = (str(user_id), id)
+    cached = _project_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-        if not response.data:
+    try:
+        row = await get_repository().get_project(id, str(user_id))
+        if row is None:
             raise HTTPException(status_code=404, detail=f"Project with ID {id} not found")
 
-        return Project(**response.data[0])
+        project = Project(**row)
+        _project_cache.set(cache_key, project)
+        return project
     except HTTPException:
         raise
     except Exception as e:
@@ -89,7 +108,7 @@ async def create_project(data: ProjectCreate, user_id: UUID) -> Project:
         # Set user_id
         project_data["user_id"] = str(user_id)
 
-        response = supabase.table(PROJECTS_TABLE).insert(project_data).execute()
+        response = await get_db().table(PROJECTS_TABLE).insert(project_data).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error creating project: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to create project")
@@ -124,7 +143,8 @@ async def update_project(id: int, data: ProjectUpdate, user_id: UUID) -> Project
         if "updated_at" not in update_data:
             update_data["updated_at"] = datetime.utcnow().isoformat()
 
-        response = supabase.table(PROJECTS_TABLE).update(update_data).eq("id", id).eq("user_id", str(user_id)).execute()
+        response = await get_db().table(PROJECTS_TABLE).update(update_data).eq("id", id).eq("user_id", str(user_id)).execute()
+        invalidate_project(id)
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error updating project {id}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to update project")
@@ -156,7 +176,8 @@ async def delete_project(id: int, user_id: UUID) -> None:
         await get_project(id, user_id)
 
         # Delete the projec
-        response = supabase.table(PROJECTS_TABLE).delete().eq("id", id).eq("user_id", str(user_id)).execute()
+        response = await get_db().table(PROJECTS_TABLE).delete().eq("id", id).eq("user_id", str(user_id)).execute()
+        invalidate_project(id)
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error deleting project {id}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to delete project")
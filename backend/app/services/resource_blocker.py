@@ -0,0 +1,121 @@
+"""
+Request interception for browser contexts.
+
+Selector schemas only read DOM text and attributes, so images, fonts, media
+and third-party trackers are aborted before they are downloaded.
+"""
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceBlocker:
+    """
+    Aborts requests by resource type or domain and counts what it saw.
+
+    One blocker is shared by all contexts of a run, so its counters are the
+    totals of the run. Blocked requests are never sent, so their size cannot be
+    known; the counters report how many requests were blocked and how many
+    bytes the allowed responses declared.
+    """
+
+    def __init__(self, resource_types: Iterable[str] = (), domains: Iterable[str] = ()):
+        self.resource_types = {resource_type.lower() for resource_type in resource_types}
+        self.domains = {domain.lower().lstrip(".") for domain in domains}
+        self.requests_allowed = 0
+        self.requests_blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.bytes_downloaded = 0
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """Whether a request of this resource type to this URL is blocked."""
+        if resource_type in self.resource_types:
+            return True
+        if not self.domains:
+            return False
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == domain or host.endswith("." + domain) for domain in self.domains)
+
+    async def install(self, context) -> None:
+        """
+        Route every request of a browser context through the blocker.
+
+        Args:
+            context (BrowserContext): Browser context leased from the browser pool
+        """
+        await context.route("**/*", self._handle_route)
+        context.on("response", self._count_response)
+
+    async def _handle_route(self, route) -> None:
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.requests_blocked += 1
+            self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            self.requests_allowed += 1
+            await route.continue_()
+
+    def _count_response(self, response) -> None:
+        try:
+            self.bytes_downloaded += int(response.headers.get("content-length") or 0)
+        except ValueError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Request counters of the run, reported in the run results."""
+        return {
+            "requests_allowed": self.requests_allowed,
+            "requests_blocked": self.requests_blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "bytes_downloaded": self.bytes_downloaded
+        }
+
+
+def get_resource_blocker(options: Optional[Dict[str, Any]]) -> Optional[ResourceBlocker]:
+    """
+    Build the resource blocker of a run from its options.
+
+    `block_resources` may be false to disable blocking, or an object with
+    `resource_types` and/or `domains` lists replacing the configured defaults.
+
+    Args:
+        options (dict): Run options, may contain `block_resources`
+
+    Returns:
+        Optional[ResourceBlocker]: The blocker, None if blocking is disabled
+    """
+    policy = (options or {}).get('block_resources', settings.BLOCK_RESOURCES)
+    if not policy:
+        return None
+    if not isinstance(policy, dict):
+        policy = {}
+    resource_types = policy.get('resource_types', settings.BLOCKED_RESOURCE_TYPES)
+    domains = policy.get('domains', settings.BLOCKED_DOMAINS)
+    if not resource_types and not domains:
+        return None
+    return ResourceBlocker(resource_types, domains)
+
+
+def merge_resource_stats(stats_list: Iterable[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Sum the request counters of several blockers, e.g. the chunks of a run.
+
+    Returns:
+        Optional[dict]: The summed counters, None if no blocker reported any
+    """
+    merged = None
+    for stats in stats_list:
+        if not stats:
+            continue
+        if merged is None:
+            merged = {"requests_allowed": 0, "requests_blocked": 0, "blocked_by_type": {}, "bytes_downloaded": 0}
+        for key in ("requests_allowed", "requests_blocked", "bytes_downloaded"):
+            merged[key] += stats.get(key, 0)
+        for resource_type, count in stats.get("blocked_by_type", {}).items():
+            merged["blocked_by_type"][resource_type] = merged["blocked_by_type"].get(resource_type, 0) + count
+    return merged
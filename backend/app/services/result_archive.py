@@ -0,0 +1,326 @@
+"""
+Retention and archival of results.
+
+`results` is range-partitioned by month of created_at (results_YYYY_MM, see
+the 20240101000010 migration). The nightly archive_results task calls
+`run_maintenance`, which over a direct connection to DATABASE_URL:
+
+1. creates the partitions of the current and next RESULT_PARTITIONS_AHEAD
+   months, so inserts never land in the default partition;
+2. archives and deletes the results of projects keeping them for less time
+   than the others, once they are older than the project's retention;
+3. detaches the partitions that ended before the longest retention of all
+   projects, archives each as one file and drops it.
+
+Change detection stores unchanged pages as a reference (`unchanged_from`)
+to the older result holding their data. Before a result is deleted or its
+partition dropped, its data is copied into the kept results referencing
+it, which then hold their data themselves.
+
+Archives are written to RESULT_ARCHIVE_URI, a local directory (file://) or
+an S3-compatible bucket (s3://bucket/prefix, with `endpoint_override` and
+`scheme` query parameters for MinIO), as zstd-compressed Parquet or gzipped
+NDJSON. Rows are only deleted once their archive is complete, and a
+partition left detached by a failed run is archived by the next one.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import re
+
+import asyncpg
+import pyarrow as pa
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# File extension of each archive format
+ARCHIVE_FORMATS = {"parquet": ".parquet", "ndjson": ".ndjson.gz"}
+
+# Rows read from the database per round trip while archiving
+ARCHIVE_PAGE_SIZE = 10_000
+
+PARTITION_NAME = re.compile(r"^results_(\d{4})_(\d{2})$")
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("run_id", pa.int64()),
+    ("url", pa.string()),
+    ("status", pa.string()),
+    ("data", pa.string()),
+    ("error_message", pa.string()),
+    ("attempt", pa.int32()),
+    ("created_at", pa.timestamp("us", tz="UTC")),
+    ("updated_at", pa.timestamp("us", tz="UTC")),
+])
+
+# Columns of ARCHIVE_SCHEMA selected from results aliased as `r`
+ARCHIVE_COLUMNS = (
+    "r.id, r.run_id, r.url, r.status, r.data::text AS data, r.error_message, r.attempt, r.created_at, r.updated_at"
+)
+
+CREATE_PARTITION_SQL = "SELECT create_results_partition($1)"
+
+# Monthly partitions of results, attached or left detached by a failed run
+LIST_PARTITIONS_SQL = (
+    "SELECT c.relname AS name, i.inhrelid IS NOT NULL AS attached "
+    "FROM pg_class AS c "
+    "JOIN pg_namespace AS n ON n.oid = c.relnamespace "
+    "LEFT JOIN pg_inherits AS i ON i.inhrelid = c.oid "
+    "WHERE n.nspname = current_schema() AND c.relkind = 'r' AND c.relname ~ '^results_[0-9]{4}_[0-9]{2}$' "
+    "ORDER BY c.relname"
+)
+
+# Retention of each project in days, NULL to keep its results
+PROJECT_RETENTION_SQL = "SELECT id, COALESCE(retention_days, $1::int) AS retention_days FROM projects"
+
+EXPIRED_RESULTS_SQL = (
+    f"SELECT {ARCHIVE_COLUMNS} FROM results AS r JOIN runs ON runs.id = r.run_id "
+    "WHERE runs.project_id = $1 AND r.created_at < $2 ORDER BY r.id"
+)
+
+DELETE_EXPIRED_RESULTS_SQL = (
+    "DELETE FROM results AS r USING runs "
+    "WHERE runs.id = r.run_id AND runs.project_id = $1 AND r.created_at < $2"
+)
+
+# Copy the data of a project's expired results into the kept results
+# referencing them (results of a schedule stay in its project)
+MATERIALIZE_EXPIRED_SOURCES_SQL = (
+    "UPDATE results AS ref SET data = (src.data || ref.data) - 'unchanged_from' "
+    "FROM results AS src JOIN runs ON runs.id = src.run_id "
+    "WHERE runs.project_id = $1 AND src.created_at < $2 "
+    "AND ref.created_at >= $2 AND ref.status = 'unchanged' AND ref.data->>'unchanged_from' = src.id::text"
+)
+
+# Same for the results of a partition, referenced by results of later months
+MATERIALIZE_PARTITION_SOURCES_SQL = (
+    "UPDATE results AS ref SET data = (src.data || ref.data) - 'unchanged_from' "
+    'FROM "{partition}" AS src '
+    "WHERE ref.created_at >= $1 AND ref.status = 'unchanged' AND ref.data->>'unchanged_from' = src.id::text"
+)
+
+
+def partition_month(name: str) -> Optional[date]:
+    """First day of the month held by a results partition, None for other tables."""
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` after the month of `day`."""
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def retention_cutoffs(retentions: List[Tuple[int, Optional[int]]],
+                      now: datetime) -> Tuple[Optional[datetime], Dict[int, datetime]]:
+    """
+    Split the retention policies into partition and per-project expiry.
+
+    Args:
+        retentions: (project ID, retention in days or None to keep) pairs
+        now (datetime): Current time
+
+    Returns:
+        Tuple[Optional[datetime], Dict[int, datetime]]: Time before which
+        results are expired for every project, None if some project keeps
+        them; and the cutoff of each project whose results expire later
+        than that
+    """
+    days = [retention for _, retention in retentions]
+    if not days:
+        return None, {}
+    horizon = None if None in days else now - timedelta(days=max(days))
+    cutoffs = {
+        project_id: now - timedelta(days=retention)
+        for project_id, retention in retentions
+        if retention is not None and (horizon is None or retention < max(days))
+    }
+    return horizon, cutoffs
+
+
+def open_archive(uri: str) -> Tuple[pafs.FileSystem, str]:
+    """File system and root path of an archive URI."""
+    filesystem, path = pafs.FileSystem.from_uri(uri)
+    return filesystem, path.rstrip("/")
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+class ArchiveWriter:
+    """
+    Compressed archive file of results, written one page of rows at a time.
+
+    Args:
+        filesystem (pafs.FileSystem): File system of the archive
+        path (str): Path of the file
+        archive_format (str): One of ARCHIVE_FORMATS
+    """
+
+    def __init__(self, filesystem: pafs.FileSystem, path: str, archive_format: str):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        # Creates the bucket on S3 if the URI sets allow_bucket_creation
+        filesystem.create_dir(path.rsplit("/", 1)[0], recursive=True)
+        self.archive_format = archive_format
+        self.rows = 0
+        self._stream = filesystem.open_output_stream(
+            path, compression="gzip" if archive_format == "ndjson" else None
+        )
+        self._parquet = (
+            pq.ParquetWriter(self._stream, ARCHIVE_SCHEMA, compression="zstd")
+            if archive_format == "parquet" else None
+        )
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if self._parquet is not None:
+            self._parquet.write_table(pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA))
+        else:
+            lines = "".join(
+                json.dumps({**row, "data": json.loads(row["data"])}, default=_json_default) + "\n"
+                for row in rows
+            )
+            self._stream.write(lines.encode("utf-8"))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+        self._stream.close()
+
+
+async def archive_rows(connection: asyncpg.Connection, query: str, args: tuple,
+                       filesystem: pafs.FileSystem, path: str, archive_format: str) -> int:
+    """
+    Write the rows of a query to an archive file, which is only created if
+    there are rows. Must run inside a transaction.
+
+    Returns:
+        int: Number of archived rows
+    """
+    cursor = await connection.cursor(query, *args)
+    writer = None
+    while True:
+        page = await cursor.fetch(ARCHIVE_PAGE_SIZE)
+        if not page:
+            break
+        if writer is None:
+            writer = ArchiveWriter(filesystem, path, archive_format)
+        writer.write([dict(record) for record in page])
+    if writer is None:
+        return 0
+    writer.close()
+    return writer.rows
+
+
+async def expire_project_results(connection: asyncpg.Connection, project_id: int, cutoff: datetime,
+                                 filesystem: pafs.FileSystem, root: str, archive_format: str) -> int:
+    """Archive and delete the results of a project created before the cutoff."""
+    path = f"{root}/projects/{project_id}/results_before_{cutoff:%Y%m%dT%H%M%S}{ARCHIVE_FORMATS[archive_format]}"
+    # Both statements see the same snapshot, so only archived rows are deleted
+    async with connection.transaction(isolation="repeatable_read"):
+        rows = await archive_rows(
+            connection, EXPIRED_RESULTS_SQL, (project_id, cutoff), filesystem, path, archive_format
+        )
+        if rows:
+            await connection.execute(MATERIALIZE_EXPIRED_SOURCES_SQL, project_id, cutoff)
+            await connection.execute(DELETE_EXPIRED_RESULTS_SQL, project_id, cutoff)
+    return rows
+
+
+async def archive_partition(connection: asyncpg.Connection, name: str,
+                            filesystem: pafs.FileSystem, root: str, archive_format: str) -> int:
+    """Archive a detached results partition and drop it."""
+    month = partition_month(name)
+    if month is None:
+        raise ValueError(f"Not a results partition: {name}")
+    end = add_months(month, 1)
+    path = f"{root}/partitions/{name}{ARCHIVE_FORMATS[archive_format]}"
+    async with connection.transaction():
+        rows = await archive_rows(
+            connection, f'SELECT {ARCHIVE_COLUMNS} FROM "{name}" AS r ORDER BY r.id', (),
+            filesystem, path, archive_format
+        )
+        await connection.execute(
+            MATERIALIZE_PARTITION_SOURCES_SQL.format(partition=name),
+            datetime(end.year, end.month, end.day, tzinfo=timezone.utc),
+        )
+        await connection.execute(f'DROP TABLE "{name}"')
+    return rows
+
+
+async def maintain(connection: asyncpg.Connection, now: datetime,
+                   archive_uri: Optional[str] = None, archive_format: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Create the upcoming partitions and archive the expired results.
+
+    Args:
+        connection (asyncpg.Connection): Connection to the database
+        now (datetime): Current time
+        archive_uri (str): Where to archive, settings.RESULT_ARCHIVE_URI if None
+        archive_format (str): settings.RESULT_ARCHIVE_FORMAT if None
+
+    Returns:
+        Dict[str, Any]: Partitions ensured, and rows archived per project and
+        per partition
+    """
+    archive_uri = archive_uri or settings.RESULT_ARCHIVE_URI
+    archive_format = archive_format or settings.RESULT_ARCHIVE_FORMAT
+    summary: Dict[str, Any] = {"partitions": [], "projects": {}, "archived_partitions": {}}
+
+    for months in range(settings.RESULT_PARTITIONS_AHEAD + 1):
+        summary["partitions"].append(
+            await connection.fetchval(CREATE_PARTITION_SQL, add_months(now.date(), months))
+        )
+
+    if not archive_uri:
+        logger.info("RESULT_ARCHIVE_URI is not set, keeping expired results")
+        return summary
+    filesystem, root = open_archive(archive_uri)
+
+    projects = await connection.fetch(PROJECT_RETENTION_SQL, settings.RESULT_RETENTION_DAYS)
+    horizon, cutoffs = retention_cutoffs([(row["id"], row["retention_days"]) for row in projects], now)
+
+    for project_id, cutoff in cutoffs.items():
+        rows = await expire_project_results(connection, project_id, cutoff, filesystem, root, archive_format)
+        if rows:
+            summary["projects"][project_id] = rows
+            logger.info(f"Archived {rows} expired results of project {project_id}")
+
+    for partition in await connection.fetch(LIST_PARTITIONS_SQL):
+        name = partition["name"]
+        if partition["attached"]:
+            end = add_months(partition_month(name), 1)
+            if horizon is None or datetime(end.year, end.month, end.day, tzinfo=timezone.utc) > horizon:
+                continue
+            await connection.execute(f'ALTER TABLE results DETACH PARTITION "{name}"')
+        summary["archived_partitions"][name] = await archive_partition(
+            connection, name, filesystem, root, archive_format
+        )
+        logger.info(f"Archived partition {name} ({summary['archived_partitions'][name]} results)")
+
+    return summary
+
+
+async def run_maintenance(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Run the results maintenance over DATABASE_URL, see `maintain`.
+
+    Returns:
+        Dict[str, Any]: Summary of `maintain`, or a skipped status without DATABASE_URL
+    """
+    if not settings.DATABASE_URL:
+        logger.warning("DATABASE_URL is not set, skipping the results maintenance")
+        return {"status": "skipped"}
+    connection = await asyncpg.connect(settings.DATABASE_URL, command_timeout=None)
+    try:
+        return await maintain(connection, now or datetime.now(timezone.utc))
+    finally:
+        await connection.close()
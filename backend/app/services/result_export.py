@@ -0,0 +1,226 @@
+"""
+Streaming bulk export of run results.
+
+Results are read from the results table one keyset page at a time and encoded
+as they arrive, so an export holds at most one page in memory however many
+results the run has.
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import csv
+import io
+import json
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+from app.schemas.result import Result
+from app.schemas.run import Run
+from app.services import result_service
+
+logger = logging.getLogger(__name__)
+
+# Media type of each export format
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Columns of CSV and Parquet exports preceding the extracted fields
+RESULT_COLUMNS = ["id", "url", "status", "error_message", "title", "extracted_at", "created_at"]
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file collecting what the Parquet writer emits until drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # The Parquet footer records absolute offsets, so keep counting after drains
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def get_export_fields(run: Run) -> Optional[List[str]]:
+    """
+    Names of the fields of a run's selector schema, in schema order.
+
+    Returns:
+        Optional[List[str]]: Field names, None if the run has no selector schema
+    """
+    from app.worker import resolve_run_options
+
+    selector_schema, _ = await asyncio.to_thread(resolve_run_options, run.project_id, run.model_dump())
+    return list(selector_schema) if selector_schema else None
+
+
+async def iter_result_pages(run_id: int, page_size: Optional[int] = None) -> AsyncIterator[List[Result]]:
+    """
+    Iterate over the results of a run, one page of results at a time.
+
+    Args:
+        run_id (int): ID of the run
+        page_size (int): Results per page, settings.EXPORT_PAGE_SIZE if None
+    """
+    cursor = None
+    while True:
+        page = await result_service.get_results_page(
+            run_id, cursor, page_size or settings.EXPORT_PAGE_SIZE, include_data=True
+        )
+        if page.results:
+            yield page.results
+        if page.next_cursor is None:
+            return
+        cursor = page.next_cursor
+
+
+def column_names(field_names: List[str]) -> List[str]:
+    """Columns of a flat export; fields clashing with a result column get a `fields.` prefix."""
+    return RESULT_COLUMNS + [
+        f"fields.{name}" if name in RESULT_COLUMNS else name for name in field_names
+    ]
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def flatten_result(result: Result, field_names: List[str]) -> List[Optional[str]]:
+    """
+    Flatten a result into the values of `column_names(field_names)`.
+
+    Extracted values that are not strings (lists of matches, numbers) are
+    JSON-encoded, so every field column holds text.
+    """
+    data = result.data or {}
+    fields = data.get("fields") or {}
+    return [
+        result.id,
+        result.url,
+        result.status,
+        result.error_message,
+        _text(data.get("title")),
+        _text(data.get("extracted_at")),
+        result.created_at.isoformat(),
+    ] + [_text(fields.get(name)) for name in field_names]
+
+
+def _fields_of(results: List[Result]) -> List[str]:
+    # Field names of a page of results, in order of appearance
+    names: Dict[str, None] = {}
+    for result in results:
+        names.update(dict.fromkeys(((result.data or {}).get("fields") or {}).keys()))
+    return list(names)
+
+
+async def export_ndjson(run_id: int) -> AsyncIterator[bytes]:
+    """Stream the results of a run as newline-delimited JSON, one result per line."""
+    async for results in iter_result_pages(run_id):
+        yield "".join(result.model_dump_json() + "\n" for result in results).encode("utf-8")
+
+
+async def export_csv(run_id: int, field_names: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+    """
+    Stream the results of a run as CSV with one column per extracted field.
+
+    Args:
+        run_id (int): ID of the run
+        field_names (List[str]): Fields to export, those of the first page of
+            results if None
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+
+    async for results in iter_result_pages(run_id):
+        if not header_written:
+            if field_names is None:
+                field_names = _fields_of(results)
+            writer.writerow(column_names(field_names))
+            header_written = True
+        writer.writerows(flatten_result(result, field_names) for result in results)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if not header_written:
+        writer.writerow(column_names(field_names or []))
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def export_parquet(run_id: int, field_names: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+    """
+    Stream the results of a run as a Parquet file with one row group per page.
+
+    Args:
+        run_id (int): ID of the run
+        field_names (List[str]): Fields to export, those of the first page of
+            results if None
+    """
+    sink = _StreamSink()
+    writer = None
+    schema = None
+
+    async for results in iter_result_pages(run_id):
+        if writer is None:
+            if field_names is None:
+                field_names = _fields_of(results)
+            schema = _parquet_schema(field_names)
+            writer = pq.ParquetWriter(sink, schema)
+        rows = [flatten_result(result, field_names) for result in results]
+        columns = [list(column) for column in zip(*rows)]
+        writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        yield sink.drain()
+
+    if writer is None:
+        writer = pq.ParquetWriter(sink, _parquet_schema(field_names or []))
+    writer.close()
+    yield sink.drain()
+
+
+def _parquet_schema(field_names: List[str]) -> pa.Schema:
+    return pa.schema(
+        [("id", pa.int64())] + [(name, pa.string()) for name in column_names(field_names)[1:]]
+    )
+
+
+def export_results(run_id: int, export_format: str,
+                   field_names: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+    """
+    Stream the results of a run in an export format.
+
+    Args:
+        run_id (int): ID of the run
+        export_format (str): One of EXPORT_FORMATS
+        field_names (List[str]): Field columns of CSV and Parquet exports
+
+    Returns:
+        AsyncIterator[bytes]: Chunks of the export
+    """
+    if export_format == "ndjson":
+        return export_ndjson(run_id)
+    if export_format == "csv":
+        return export_csv(run_id, field_names)
+    if export_format == "parquet":
+        return export_parquet(run_id, field_names)
+    raise ValueError(f"Unknown export format: {export_format}")
@@ -3,8 +3,11 @@ Service layer for handling scraping results.
 """
 from typing import List, Dict, Any, Optional
 from fastapi import HTTPException, status
-from app.schemas.result import Result, ResultCreate
-from app.core.supabase import supabase
+from app.schemas.result import Result, ResultCreate, ResultsResponse
+from app.core.config import settings
+from app.core.database import get_db
+from app.repositories import get_repository
+from app.services import run_service
 from datetime import datetime
 import logging
 import os
@@ -15,6 +18,12 @@ logger = logging.getLogger(__name__)
 # Table name in Supabase
 RESULTS_TABLE = "results"
 
+# Columns of result listings; `data` is only selected when requested
+RESULT_LIST_COLUMNS = "id, run_id, url, status, error_message, attempt, created_at, updated_at"
+
+# Referenced results fetched per query when resolving unchanged results
+SOURCE_LOOKUP_BATCH_SIZE = 200
+
 # Use in-memory database only in test mode (controlled by environment variable)
 use_in_memory_db = os.getenv("USE_INMEM_DB", "false").lower() == "true"
 
@@ -47,12 +56,12 @@ async def get_results(run_id: int = None) -> List[Result]:
         return results
         
     try:
-        query = supabase.table(RESULTS_TABLE).select("*")
+        query = get_db().table(RESULTS_TABLE).select("*")
         
         if run_id is not None:
             query = query.eq("run_id", run_id)
             
-        response = query.execute()
+        response = await query.execute()
         
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching results: {response.error}")
@@ -63,6 +72,115 @@ async def get_results(run_id: int = None) -> List[Result]:
         logger.error(f"Error in get_results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def get_results_page(run_id: Optional[int] = None, cursor: Optional[int] = None,
+                           limit: Optional[int] = None, include_data: bool = False) -> ResultsResponse:
+    """
+    Get one page of results ordered by ID, optionally filtered by run_id.
+
+    Pages are fetched with keyset pagination (`id > cursor`), so every page
+    costs the same regardless of how deep into a run it is, and the `data`
+    column is left out unless requested.
+
+    Args:
+        run_id: Optional ID of the run to filter results
+        cursor: `next_cursor` of the previous page, None for the first page
+        limit: Maximum number of results, settings.DEFAULT_PAGE_SIZE if None
+        include_data: Whether to return the extracted data of each result
+
+    Returns:
+        ResultsResponse: The results and the cursor of the next page
+    """
+    limit = min(limit or settings.DEFAULT_PAGE_SIZE, settings.MAX_PAGE_SIZE)
+
+    if use_in_memory_db:
+        rows = sorted(
+            (result for result in in_memory_results
+             if (run_id is None or result["run_id"] == run_id) and (cursor is None or result["id"] > cursor)),
+            key=lambda result: result["id"]
+        )[:limit + 1]
+        if not include_data:
+            rows = [{k: v for k, v in row.items() if k != "data"} for row in rows]
+    else:
+        try:
+            columns = RESULT_LIST_COLUMNS + (", data" if include_data else "")
+            query = get_db().table(RESULTS_TABLE).select(columns)
+
+            if run_id is not None:
+                query = query.eq("run_id", run_id)
+            if cursor is not None:
+                query = query.gt("id", cursor)
+
+            # One extra row tells whether there is a next page
+            response = await query.order("id").limit(limit + 1).execute()
+
+            if hasattr(response, 'error') and response.error is not None:
+                logger.error(f"Error fetching results: {response.error}")
+                raise HTTPException(status_code=500, detail="Failed to fetch results")
+            rows = response.data
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error in get_results_page: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    results = [Result(**row) for row in rows[:limit]]
+    if include_data:
+        results = await resolve_unchanged(results)
+    return ResultsResponse(
+        results=results,
+        page_size=limit,
+        next_cursor=results[-1].id if len(rows) > limit else None
+    )
+
+async def _get_results_data(ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    # Data of the results with the given IDs, keyed by ID
+    if use_in_memory_db:
+        wanted = set(ids)
+        return {result["id"]: result["data"] for result in in_memory_results if result["id"] in wanted}
+
+    data = {}
+    for start in range(0, len(ids), SOURCE_LOOKUP_BATCH_SIZE):
+        batch = ids[start:start + SOURCE_LOOKUP_BATCH_SIZE]
+        response = await get_db().table(RESULTS_TABLE).select("id, data").in_("id", batch).execute()
+        if hasattr(response, 'error') and response.error is not None:
+            raise Exception(f"Failed to fetch referenced results: {response.error}")
+        data.update((row["id"], row["data"]) for row in response.data)
+    return data
+
+async def resolve_unchanged(results: List[Result]) -> List[Result]:
+    """
+    Fill in the data of "unchanged" results from the results they reference.
+    
+    Change detection stores unchanged pages as {"fingerprint", "unchanged_from"}
+    only, pointing at the result that holds the data. The referenced results
+    are fetched in batches and their data is returned under the reference.
+    
+    Args:
+        results (List[Result]): Results with their data
+        
+    Returns:
+        List[Result]: The same results, unchanged ones with their data
+    """
+    source_ids = sorted({
+        int(result.data["unchanged_from"]) for result in results
+        if result.status == "unchanged" and (result.data or {}).get("unchanged_from")
+    })
+    if not source_ids:
+        return results
+
+    try:
+        sources = await _get_results_data(source_ids)
+    except Exception as e:
+        logger.error(f"Error in resolve_unchanged: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for result in results:
+        if result.status == "unchanged" and (result.data or {}).get("unchanged_from"):
+            source = sources.get(int(result.data["unchanged_from"]))
+            if source is not None:
+                result.data = {**source, **result.data}
+    return results
+
 async def get_failed_results(run_id: int) -> List[Result]:
     """
     Get failed results for a specific run.
@@ -79,16 +197,8 @@ async def get_failed_results(run_id: int) -> List[Result]:
         return results
     
     try:
-        response = supabase.table(RESULTS_TABLE).select("*")\
-            .eq("run_id", run_id)\
-            .eq("status", "failed")\
-            .execute()
-        
-        if hasattr(response, 'error') and response.error is not None:
-            logger.error(f"Error fetching failed results: {response.error}")
-            raise HTTPException(status_code=500, detail="Failed to fetch failed results")
-        
-        return [Result(**result_data) for result_data in response.data]
+        rows = await get_repository().get_failed_results(run_id)
+        return [Result(**result_data) for result_data in rows]
     except Exception as e:
         logger.error(f"Error in get_failed_results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -116,7 +226,7 @@ async def get_result(result_id: int) -> Result:
         )
     
     try:
-        response = supabase.table(RESULTS_TABLE).select("*").eq("id", result_id).execute()
+        response = await get_db().table(RESULTS_TABLE).select("*").eq("id", result_id).execute()
         
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching result {result_id}: {response.error}")
@@ -135,15 +245,22 @@ async def get_result(result_id: int) -> Result:
         logger.error(f"Error in get_result: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def create_result(data: ResultCreate) -> Result:
+def _in_memory_key_exists(result_data: Dict[str, Any]) -> bool:
+    key = (result_data["run_id"], result_data["url"], result_data.get("attempt", 0))
+    return any((result["run_id"], result["url"], result.get("attempt", 0)) == key for result in in_memory_results)
+
+async def create_result(data: ResultCreate) -> Optional[Result]:
     """
     Create a new result.
     
+    Results are keyed by (run_id, url, attempt); a result whose key is already
+    stored is skipped, so a redelivered task does not store it twice.
+    
     Args:
         data (ResultCreate): Result data to be created
         
     Returns:
-        Result: The created result
+        Optional[Result]: The created result, None if its key was stored already
     """
     global result_id_counter
     
@@ -151,6 +268,8 @@ async def create_result(data: ResultCreate) -> Result:
         logger.debug("Using in-memory database for create_result")
         now = datetime.utcnow()
         result_data = data.model_dump()
+        if _in_memory_key_exists(result_data):
+            return None
         result_data["id"] = result_id_counter
         result_data["created_at"] = now
         result_data["updated_at"] = now
@@ -158,6 +277,7 @@ async def create_result(data: ResultCreate) -> Result:
         in_memory_results.append(result_data)
         result_id_counter += 1
         
+        await _increment_records_extracted([result_data])
         return Result(**result_data)
     
     try:
@@ -168,23 +288,90 @@ async def create_result(data: ResultCreate) -> Result:
         result_data["created_at"] = now
         result_data["updated_at"] = now
         
-        response = supabase.table(RESULTS_TABLE).insert(result_data).execute()
+        row = await get_repository().insert_result(result_data)
+        if row is None:
+            logger.info(f"Result of {data.url} (run {data.run_id}, attempt {data.attempt}) was stored already")
+            return None
         
-        if hasattr(response, 'error') and response.error is not None:
-            logger.error(f"Error creating result: {response.error}")
-            raise HTTPException(status_code=500, detail="Failed to create result")
+        await _increment_records_extracted([row])
+        return Result(**row)
+    except Exception as e:
+        logger.error(f"Error in create_result: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _increment_records_extracted(rows: List[Dict[str, Any]]) -> None:
+    """
+    Add new results to their runs' records_extracted count, one delta per run.
+    
+    Only successful scrapes are records; runs are stored in the database in
+    in-memory mode too.
+    
+    Args:
+        rows (List[Dict[str, Any]]): The newly stored results
+    """
+    deltas: Dict[int, int] = {}
+    for row in rows:
+        if row["status"] in ("success", "unchanged"):
+            deltas[row["run_id"]] = deltas.get(row["run_id"], 0) + 1
+    for run_id, delta in deltas.items():
+        await run_service.increment_records_extracted(run_id, delta)
+
+async def create_results(data: List[ResultCreate]) -> List[Result]:
+    """
+    Create several results with a single bulk insert.
+    
+    The records_extracted count of each affected run is updated once with the
+    number of successful results instead of once per result. Results whose
+    (run_id, url, attempt) key is already stored are skipped and not counted.
+    
+    Args:
+        data (List[ResultCreate]): Results to be created
         
-        # Update the run's records_extracted count - only increment for successful scrapes
-        if data.status == "success":
-            run_id = data.run_id
-            update_response = supabase.table("runs").select("records_extracted").eq("id", run_id).execute()
-            if update_response.data:
-                current_count = update_response.data[0].get("records_extracted", 0) or 0
-                supabase.table("runs").update({"records_extracted": current_count + 1}).eq("id", run_id).execute()
+    Returns:
+        List[Result]: The created results, without the skipped ones
+    """
+    global result_id_counter
+    
+    if not data:
+        return []
+    
+    if use_in_memory_db:
+        logger.debug(f"Using in-memory database for create_results with {len(data)} results")
+        now = datetime.utcnow()
+        created = []
+        for item in data:
+            result_data = item.model_dump()
+            if _in_memory_key_exists(result_data):
+                continue
+            result_data["id"] = result_id_counter
+            result_data["created_at"] = now
+            result_data["updated_at"] = now
+            
+            in_memory_results.append(result_data)
+            result_id_counter += 1
+            created.append(Result(**result_data))
         
-        return Result(**response.data[0])
+        await _increment_records_extracted([result.model_dump() for result in created])
+        return created
+    
+    try:
+        now = datetime.utcnow().isoformat()
+        rows = []
+        for item in data:
+            result_data = item.model_dump()
+            result_data["created_at"] = now
+            result_data["updated_at"] = now
+            rows.append(result_data)
+        
+        stored = await get_repository().insert_results(rows)
+        
+        if len(stored) < len(rows):
+            logger.info(f"Skipped {len(rows) - len(stored)} results that were stored already")
+        
+        await _increment_records_extracted(stored)
+        return [Result(**result_data) for result_data in stored]
     except Exception as e:
-        logger.error(f"Error in create_result: {e}")
+        logger.error(f"Error in create_results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 async def update_result(result_id: int, result_data: ResultUpdate) -> Result:
@@ -218,7 +405,7 @@ async def update_result(result_id: int, result_data: ResultUpdate) -> Result:
                 return Result(**in_memory_results[i])
     else:
         try:
-            response = supabase.table(RESULTS_TABLE).update(update_data).eq("id", result_id).execute()
+            response = await get_db().table(RESULTS_TABLE).update(update_data).eq("id", result_id).execute()
             
             if hasattr(response, 'error') and response.error is not None:
                 logger.error(f"Error updating result {result_id}: {response.error}")
@@ -251,7 +438,7 @@ async def delete_result(result_id: int) -> None:
         return
     
     try:
-        response = supabase.table(RESULTS_TABLE).delete().eq("id", result_id).execute()
+        response = await get_db().table(RESULTS_TABLE).delete().eq("id", result_id).execute()
         
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error deleting result {result_id}: {response.error}")
@@ -276,7 +463,7 @@ async def get_results_by_run(run_id: int) -> List[Result]:
         return results
     
     try:
-        response = supabase.table(RESULTS_TABLE).select("*").eq("run_id", run_id).execute()
+        response = await get_db().table(RESULTS_TABLE).select("*").eq("run_id", run_id).execute()
         
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching results for run {run_id}: {response.error}")
@@ -304,16 +491,8 @@ async def get_failed_results(run_id: int) -> List[Result]:
         return results
     
     try:
-        response = supabase.table(RESULTS_TABLE).select("*")\
-            .eq("run_id", run_id)\
-            .eq("status", "failed")\
-            .execute()
-        
-        if hasattr(response, 'error') and response.error is not None:
-            logger.error(f"Error fetching failed results for run {run_id}: {response.error}")
-            raise HTTPException(status_code=500, detail="Failed to fetch results")
-        
-        return [Result(**result_data) for result_data in response.data]
+        rows = await get_repository().get_failed_results(run_id)
+        return [Result(**result_data) for result_data in rows]
     except Exception as e:
         logger.error(f"Error in get_failed_results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -335,11 +514,11 @@ async def get_result(id: int) -> Result:
         logger.debug(f"Using in-memory database for get_result with id {id}")
         for result in in_memory_results:
             if result["id"] == id:
-                return Result(**result)
+                return (await resolve_unchanged([Result(**result)]))[0]
         raise HTTPException(status_code=404, detail=f"Result with ID {id} not found")
     
     try:
-        response = supabase.table(RESULTS_TABLE).select("*").eq("id", id).execute()
+        response = await get_db().table(RESULTS_TABLE).select("*").eq("id", id).execute()
         
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching result {id}: {response.error}")
@@ -348,9 +527,11 @@ async def get_result(id: int) -> Result:
         if not response.data:
             raise HTTPException(status_code=404, detail=f"Result with ID {id} not found")
         
-        return Result(**response.data[0])
+        result = Result(**response.data[0])
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error in get_result: {e}")
-        raise HTTPException(status_code=500, detail=str(e)) 
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return (await resolve_unchanged([result]))[0]
@@ -0,0 +1,104 @@
+"""
+Buffered writer persisting scraping results in batches.
+"""
+from typing import List, Optional
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.repositories import get_repository
+from app.schemas.result import ResultCreate
+from app.services import result_service
+
+logger = logging.getLogger(__name__)
+
+
+class ResultWriter:
+    """
+    Accumulates results and persists them with `result_service.create_results`.
+
+    The buffer is flushed as one bulk insert once it holds `batch_size` results
+    or `flush_interval` seconds after the oldest buffered result was added,
+    whichever comes first. `close()` flushes whatever is left. The default
+    batch size is the repository's: RESULT_BATCH_SIZE over PostgREST,
+    RESULT_COPY_BATCH_SIZE with COPY.
+
+    Flushes triggered by `add` or by the timer never raise: a failed batch is
+    logged and kept in the buffer, and retried `flush_interval` seconds later
+    or at the next flush after that. `close()` is the one place a failure is
+    raised, so a write that still fails at the end of a run fails the run.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.batch_size = max(1, batch_size or get_repository().batch_size)
+        self.flush_interval = flush_interval if flush_interval is not None else settings.RESULT_FLUSH_INTERVAL
+        self._buffer: List[ResultCreate] = []
+        self._buffered_since: Optional[float] = None
+        self._timer: Optional[asyncio.Task] = None
+        # When the last flush failed, None if it succeeded
+        self._failed_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def add(self, result: ResultCreate) -> None:
+        """Buffer a result, flushing the buffer if it is full or too old."""
+        if not self._buffer:
+            self._buffered_since = time.monotonic()
+        self._buffer.append(result)
+
+        if (len(self._buffer) >= self.batch_size or self._expired()) and not self._backing_off():
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing {len(self._buffer)} buffered results, retrying later: {e}")
+        if self._buffer and self._timer is None and self.flush_interval > 0:
+            self._timer = asyncio.ensure_future(self._flush_later())
+
+    async def flush(self) -> None:
+        """Persist all buffered results with a single bulk insert."""
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            self._buffered_since = None
+            try:
+                await result_service.create_results(batch)
+                logger.debug(f"Flushed {len(batch)} results")
+            except Exception:
+                # Keep the results for the next flush instead of dropping them
+                self._buffer = batch + self._buffer
+                self._buffered_since = time.monotonic()
+                self._failed_at = time.monotonic()
+                raise
+            self._failed_at = None
+
+    async def close(self) -> None:
+        """Cancel the flush timer and persist the remaining results, raising if that fails."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _backing_off(self) -> bool:
+        return (self._failed_at is not None
+                and time.monotonic() - self._failed_at < self.flush_interval)
+
+    def _expired(self) -> bool:
+        return (self._buffered_since is not None
+                and time.monotonic() - self._buffered_since >= self.flush_interval)
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.flush_interval)
+            self._timer = None
+            await self.flush()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error flushing buffered results: {e}")
@@ -0,0 +1,135 @@
+"""
+Replayable event log of scraping runs.
+
+Every event is appended to a capped Redis Stream per run and published on the
+run's pub/sub channel with its stream id, so SSE clients can replay what they
+missed from the stream and then tail the channel.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+
+from app.core.config import settings
+from app.core.redis import get_redis, run_channel
+
+logger = logging.getLogger(__name__)
+
+# Appends the event, refreshes the stream TTL and publishes the event with its
+# id in a single round trip. ARGV[2] is a JSON object, so its opening brace is
+# replaced by the id member.
+APPEND_EVENT_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'event', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', KEYS[2], '{"id": "' .. id .. '", ' .. string.sub(ARGV[2], 2))
+return id
+"""
+
+# Events read per XREAD while replaying
+REPLAY_BATCH_SIZE = 500
+
+_append_script = None
+
+
+def run_events_key(run_id: int) -> str:
+    """Key of the event stream of a run."""
+    return f"run:{run_id}:events"
+
+
+def get_append_script(redis):
+    """APPEND_EVENT_SCRIPT registered for EVALSHA, loaded into Redis on first use."""
+    global _append_script
+    if _append_script is None:
+        _append_script = redis.register_script(APPEND_EVENT_SCRIPT)
+    return _append_script
+
+
+def parse_event_id(event_id: str) -> Tuple[int, int]:
+    """
+    Parse a stream id such as "1700000000000-3" into a comparable tuple.
+
+    Raises:
+        ValueError: If the id is not a stream id
+    """
+    milliseconds, _, sequence = event_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+async def append_event(run_id: int, event_type: str, data: Any) -> str:
+    """
+    Append an event to the log of a run and publish it to live subscribers.
+
+    Args:
+        run_id (int): ID of the run
+        event_type (str): Event type, e.g. "record" or "status"
+        data: JSON-serializable event data
+
+    Returns:
+        str: Stream id of the event
+    """
+    redis = get_redis()
+    payload = json.dumps({"type": event_type, "data": data})
+    event_id = await get_append_script(redis)(
+        keys=[run_events_key(run_id), run_channel(run_id)],
+        args=[settings.RUN_EVENT_STREAM_MAXLEN, payload, settings.RUN_EVENT_STREAM_TTL],
+        client=redis,
+    )
+    return event_id.decode("utf-8") if isinstance(event_id, bytes) else event_id
+
+
+async def append_events(run_id: int, events: List[Tuple[str, Any]]) -> List[str]:
+    """
+    Append several events of a run in one pipelined round trip.
+
+    Args:
+        run_id (int): ID of the run
+        events (List[Tuple[str, Any]]): (event_type, data) pairs, oldest first
+
+    Returns:
+        List[str]: Stream ids of the events
+    """
+    if not events:
+        return []
+    redis = get_redis()
+    script = get_append_script(redis)
+    keys = [run_events_key(run_id), run_channel(run_id)]
+    pipe = redis.pipeline(transaction=False)
+    for event_type, data in events:
+        payload = json.dumps({"type": event_type, "data": data})
+        await script(
+            keys=keys,
+            args=[settings.RUN_EVENT_STREAM_MAXLEN, payload, settings.RUN_EVENT_STREAM_TTL],
+            client=pipe,
+        )
+    event_ids = await pipe.execute()
+    return [event_id.decode("utf-8") if isinstance(event_id, bytes) else event_id for event_id in event_ids]
+
+
+async def read_events(run_id: int, after_id: Optional[str] = None,
+                      count: int = REPLAY_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    Read logged events of a run that come after an event id.
+
+    Args:
+        run_id (int): ID of the run
+        after_id (str): Stream id of the last event the client has, None to
+            read from the start of the log
+        count (int): Maximum number of events to return
+
+    Returns:
+        List[dict]: Events with their `id`, `type` and `data`, oldest first
+    """
+    redis = get_redis()
+    response = await redis.xread({run_events_key(run_id): after_id or "0-0"}, count=count)
+
+    events = []
+    for _, entries in response or []:
+        for entry_id, fields in entries:
+            entry_id = entry_id.decode("utf-8") if isinstance(entry_id, bytes) else entry_id
+            raw = fields.get(b"event", fields.get("event"))
+            try:
+                event = json.loads(raw)
+            except (TypeError, ValueError):
+                logger.warning(f"Skipping malformed event {entry_id} of run {run_id}")
+                continue
+            events.append({"id": entry_id, "type": event.get("type", "message"), "data": event.get("data")})
+    return events
@@ -1,8 +1,12 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from fastapi import HTTPException
-from app.schemas.run import Run, RunCreate, RunUpdate, RunStatus
-from app.core.supabase import supabase
+from app.schemas.run import Run, RunCreate, RunUpdate, RunStatus, RunsResponse
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_db
+from app.repositories import get_repository
+from app.core.task_queues import run_queue, task_options
 from app.worker import celery
 import logging
 
@@ -11,6 +15,13 @@ logger = logging.getLogger(__name__)
 # Table name in Supabase
 RUNS_TABLE = "runs"
 
+# Columns of run listings; leaves out the per-URL `results` details
+RUN_LIST_COLUMNS = "id, project_id, status, config, url, urls, error, created_at, updated_at"
+
+# Project of each run. A run never moves between projects, so entries only
+# leave the cache on expiry or when the run is deleted.
+_run_project_cache = TTLCache(ttl=settings.RUN_PROJECT_CACHE_TTL, max_size=settings.OWNERSHIP_CACHE_SIZE)
+
 
 async def get_runs(project_id: Optional[int] = None) -> List[Run]:
     """
@@ -23,12 +34,12 @@ async def get_runs(project_id: Optional[int] = None) -> List[Run]:
         List[Run]: List of runs
     """
     try:
-        query = supabase.table(RUNS_TABLE).select("*")
+        query = get_db().table(RUNS_TABLE).select("*")
 
         if project_id is not None:
             query = query.eq("project_id", project_id)
 
-        response = query.execute()
+        response = await query.execute()
 
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching runs: {response.error}")
@@ -40,6 +51,51 @@ async def get_runs(project_id: Optional[int] = None) -> List[Run]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def get_runs_page(project_id: Optional[int] = None, cursor: Optional[int] = None,
+                        limit: Optional[int] = None) -> RunsResponse:
+    """
+    Get one page of runs, newest first, optionally filtered by project_id.
+
+    Pages are fetched with keyset pagination (`id < cursor`) and only the
+    columns of the Run schema are selected.
+
+    Args:
+        project_id (Optional[int]): Filter runs by project ID
+        cursor (Optional[int]): `next_cursor` of the previous page
+        limit (Optional[int]): Maximum number of runs, settings.DEFAULT_PAGE_SIZE if None
+
+    Returns:
+        RunsResponse: The runs and the cursor of the next page
+    """
+    limit = min(limit or settings.DEFAULT_PAGE_SIZE, settings.MAX_PAGE_SIZE)
+    try:
+        query = get_db().table(RUNS_TABLE).select(RUN_LIST_COLUMNS)
+
+        if project_id is not None:
+            query = query.eq("project_id", project_id)
+        if cursor is not None:
+            query = query.lt("id", cursor)
+
+        # One extra row tells whether there is a next page
+        response = await query.order("id", desc=True).limit(limit + 1).execute()
+
+        if hasattr(response, 'error') and response.error is not None:
+            logger.error(f"Error fetching runs: {response.error}")
+            raise HTTPException(status_code=500, detail="Failed to fetch runs")
+
+        runs = [Run(**run) for run in response.data[:limit]]
+        return RunsResponse(
+            runs=runs,
+            page_size=limit,
+            next_cursor=runs[-1].id if len(response.data) > limit else None
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_runs_page: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 async def get_run(id: int) -> Run:
     """
     Retrieve a single run by ID.
@@ -54,19 +110,56 @@ async def get_run(id: int) -> Run:
         HTTPException: If run not found
     """
     try:
-        response = supabase.table(RUNS_TABLE).select("*").eq("id", id).execute()
+        row = await get_repository().get_run(id)
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Run with ID {id} not found")
+
+        run = Run(**row)
+        _run_project_cache.set(id, run.project_id)
+        return run
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_run: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def get_run_project_id(id: int) -> int:
+    """
+    Return the ID of the project a run belongs to.
+
+    Used to authorize access to a run's results; the mapping is cached for
+    RUN_PROJECT_CACHE_TTL seconds.
+
+    Args:
+        id (int): Run ID
+
+    Returns:
+        int: Project ID
+
+    Raises:
+        HTTPException: If run not found
+    """
+    project_id = _run_project_cache.get(id)
+    if project_id is not None:
+        return project_id
+
+    try:
+        response = await get_db().table(RUNS_TABLE).select("project_id").eq("id", id).execute()
         if hasattr(response, 'error') and response.error is not None:
-            logger.error(f"Error fetching run {id}: {response.error}")
+            logger.error(f"Error fetching project of run {id}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to fetch run")
 
         if not response.data:
             raise HTTPException(status_code=404, detail=f"Run with ID {id} not found")
 
-        return Run(**response.data[0])
+        project_id = response.data[0]["project_id"]
+        _run_project_cache.set(id, project_id)
+        return project_id
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in get_run: {e}")
+        logger.error(f"Error in get_run_project_id: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -90,7 +183,7 @@ async def create_run(data: RunCreate) -> Run:
         if "updated_at" not in run_data:
             run_data["updated_at"] = now
 
-        response = supabase.table(RUNS_TABLE).insert(run_data).execute()
+        response = await get_db().table(RUNS_TABLE).insert(run_data).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error creating run: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to create run")
@@ -124,7 +217,7 @@ async def update_run(id: int, data: RunUpdate) -> Run:
         if "updated_at" not in update_data:
             update_data["updated_at"] = datetime.utcnow().isoformat()
 
-        response = supabase.table(RUNS_TABLE).update(update_data).eq("id", id).execute()
+        response = await get_db().table(RUNS_TABLE).update(update_data).eq("id", id).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error updating run {id}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to update run")
@@ -152,7 +245,8 @@ async def delete_run(id: int) -> None:
         await get_run(id)
 
         # Delete the run
-        response = supabase.table(RUNS_TABLE).delete().eq("id", id).execute()
+        response = await get_db().table(RUNS_TABLE).delete().eq("id", id).execute()
+        _run_project_cache.delete(id)
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error deleting run {id}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to delete run")
@@ -163,6 +257,38 @@ async def delete_run(id: int) -> None:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def increment_records_extracted(id: int, delta: int = 1) -> Optional[int]:
+    """
+    Atomically add to a run's records_extracted count.
+
+    The increment runs server side in the increment_run_records Postgres
+    function, so concurrent workers and retries never lose updates and a
+    batch of records costs a single round trip.
+
+    Args:
+        id (int): Run ID
+        delta (int): Number of records to add
+
+    Returns:
+        Optional[int]: The new count, or None if the run does not exist
+    """
+    if not delta:
+        return None
+
+    try:
+        response = await get_db().rpc("increment_run_records", {"p_run_id": id, "p_delta": delta}).execute()
+        if hasattr(response, 'error') and response.error is not None:
+            logger.error(f"Error incrementing records of run {id}: {response.error}")
+            raise HTTPException(status_code=500, detail="Failed to update run record count")
+
+        return response.data
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in increment_records_extracted: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 async def enqueue_run(project_id: int, config: Optional[Dict[str, Any]] = None,
                      url: Optional[str] = None, urls: Optional[List[str]] = None) -> Run:
     """
@@ -190,11 +316,13 @@ async def enqueue_run(project_id: int, config: Optional[Dict[str, Any]] = None,
         # Store the run in the database
         run = await create_run(run_data)
 
-        # Dispatch Celery task to process the run
+        # Dispatch Celery task to process the run, large runs go to the bulk queue
+        url_count = len(urls or []) + (1 if url else 0)
         task = celery.send_task(
             "process_scraping_run",
             args=[run.id, run.project_id, run.model_dump()],
-            countdown=1  # Start the task after 1 second
+            countdown=1,  # Start the task after 1 second
+            **task_options(run_queue(url_count))
         )
 
         logger.info(f"Enqueued run {run.id} for project {project_id}, task ID: {task.id}")
@@ -2,7 +2,8 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from fastapi import HTTPException
 from app.schemas.schedule import Schedule, ScheduleCreate, ScheduleUpdate, ScheduleStatus
-from app.core.supabase import supabase
+from app.core.database import get_db
+from app.core.task_queues import SCHEDULED, task_options
 from app.worker import celery
 from app.services import run_service
 from celery.schedules import crontab
@@ -34,12 +35,12 @@ async def get_schedules(project_id: Optional[int] = None) -> List[Schedule]:
         List[Schedule]: List of schedules
     """
     try:
-        query = supabase.table(SCHEDULES_TABLE).select("*")
+        query = get_db().table(SCHEDULES_TABLE).select("*")
 
         if project_id is not None:
             query = query.eq("project_id", project_id)
 
-        response = query.execute()
+        response = await query.execute()
 
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching schedules: {response.error}")
@@ -77,7 +78,7 @@ async def get_schedule(id: int) -> Schedule:
         HTTPException: If schedule not found
     """
     try:
-        response = supabase.table(SCHEDULES_TABLE).select("*").eq("id", id).execute()
+        response = await get_db().table(SCHEDULES_TABLE).select("*").eq("id", id).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching schedule {id}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to fetch schedule")
@@ -126,7 +127,7 @@ async def create_schedule(data: ScheduleCreate) -> Schedule:
         if not schedule_data.get('url') and not schedule_data.get('urls'):
             raise ValueError("Either url or urls must be provided")
 
-        response = supabase.table(SCHEDULES_TABLE).insert(schedule_data).execute()
+        response = await get_db().table(SCHEDULES_TABLE).insert(schedule_data).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error creating schedule: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to create schedule")
@@ -174,7 +175,7 @@ async def update_schedule(id: int, data: ScheduleUpdate) -> Schedule:
         if "updated_at" not in update_data:
             update_data["updated_at"] = datetime.utcnow().isoformat()
 
-        response = supabase.table(SCHEDULES_TABLE).update(update_data).eq("id", id).execute()
+        response = await get_db().table(SCHEDULES_TABLE).update(update_data).eq("id", id).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error updating schedule {id}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to update schedule")
@@ -220,7 +221,7 @@ async def delete_schedule(id: int) -> None:
         await unregister_schedule_with_celery(id)
 
         # Delete the schedule
-        response = supabase.table(SCHEDULES_TABLE).delete().eq("id", id).execute()
+        response = await get_db().table(SCHEDULES_TABLE).delete().eq("id", id).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error deleting schedule {id}: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to delete schedule")
@@ -268,7 +269,8 @@ async def register_schedule_with_celery(schedule: Schedule) -> None:
                 'urls': schedule.urls
             },
             'options': {
-                'expires': 60 * 60 * 2  # 2 hours
+                'expires': 60 * 60 * 2,  # 2 hours
+                **task_options(SCHEDULED)
             }
         }
 
@@ -372,7 +374,7 @@ async def load_and_register_schedules() -> None:
         logger.info("Loading and registering schedules with Celery-beat...")
 
         # Get all active schedules
-        response = supabase.table(SCHEDULES_TABLE).select("*").eq("status", "active").execute()
+        response = await get_db().table(SCHEDULES_TABLE).select("*").eq("status", "active").execute()
 
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error loading schedules: {response.error}")
@@ -422,7 +424,8 @@ async def trigger_schedule(id: int) -> Schedule:
         task = celery.send_task(
             'run_scheduled_scrape',
             args=(schedule.id, schedule.project_id),
-            kwargs=task_kwargs
+            kwargs=task_kwargs,
+            **task_options(SCHEDULED)
         )
 
         logger.info(f"Triggered immediate execution of schedule {id}, task ID: {task.id}")
@@ -431,7 +434,7 @@ async def trigger_schedule(id: int) -> Schedule:
         now = datetime.utcnow().isoformat()
         update_data = {"last_run": now, "updated_at": now}
 
-        response = supabase.table(SCHEDULES_TABLE).update(update_data).eq("id", id).execute()
+        response = await get_db().table(SCHEDULES_TABLE).update(update_data).eq("id", id).execute()
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error updating schedule {id} last_run time: {response.error}")
             raise HTTPException(status_code=500, detail="Failed to update schedule last run time")
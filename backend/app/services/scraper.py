@@ -0,0 +1,341 @@
+"""
+Page scraping helpers used by the Celery worker tasks.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.services.extractor import extract_page
+
+logger = logging.getLogger(__name__)
+
+FETCH_MODES = ("browser", "http", "auto")
+
+WAIT_UNTIL_STATES = ("commit", "domcontentloaded", "load", "networkidle")
+
+
+def get_readiness(options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Page readiness strategy of a run.
+
+    Args:
+        options (dict): Run options, may contain `wait_until`, `wait_for` and
+            `ready_timeout`
+
+    Returns:
+        dict: `wait_until` load state passed to `page.goto`, optional
+        `wait_for` ("selectors" for the schema's selectors, or a custom
+        selector) and the `timeout` budget in milliseconds
+    """
+    options = options or {}
+    wait_until = options.get('wait_until') or settings.PAGE_WAIT_UNTIL
+    if wait_until not in WAIT_UNTIL_STATES:
+        logger.warning(f"Unknown wait_until {wait_until!r}, using {settings.PAGE_WAIT_UNTIL}")
+        wait_until = settings.PAGE_WAIT_UNTIL
+    try:
+        timeout = float(options.get('ready_timeout') or settings.PAGE_READY_TIMEOUT)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid ready_timeout in run config: {options.get('ready_timeout')}")
+        timeout = settings.PAGE_READY_TIMEOUT
+    return {
+        "wait_until": wait_until,
+        "wait_for": options.get('wait_for'),
+        "timeout": timeout * 1000
+    }
+
+
+async def wait_until_ready(page, url: str, selector_schema: Dict[str, Any],
+                           readiness: Dict[str, Any]) -> Tuple[Dict[str, Any], Any]:
+    """
+    Navigate a page to a URL and wait until it is ready for extraction.
+
+    Navigation and the optional selector wait share one timeout budget. A
+    selector wait that runs out of budget is not an error: the page is
+    extracted as it is and the fields that did not render come back empty.
+    There is nothing to wait for after a 304 Not Modified response.
+
+    Args:
+        page (Page): Playwright page
+        url (str): URL to load
+        selector_schema (dict): Selector schema defining what to extract
+        readiness (dict): Readiness strategy from get_readiness
+
+    Returns:
+        Tuple[dict, Optional[Response]]: Milliseconds spent navigating and
+        waiting for selectors and whether the selector wait timed out, and
+        the response of the navigation
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    response = await page.goto(url, wait_until=readiness["wait_until"], timeout=readiness["timeout"])
+    navigated = loop.time()
+    navigation_ms = (navigated - started) * 1000
+
+    wait_for = readiness.get("wait_for")
+    if response is not None and response.status == 304:
+        wait_for = None
+    if wait_for == "selectors":
+        selectors = [
+            field_config['selector'] for field_config in selector_schema.values()
+            if field_config.get('selector') and field_config.get('required', True)
+        ]
+    elif wait_for:
+        selectors = [wait_for]
+    else:
+        selectors = []
+
+    timed_out = False
+    if selectors:
+        budget = max(readiness["timeout"] - navigation_ms, 1)
+        outcomes = await asyncio.gather(
+            *(page.wait_for_selector(selector, state="attached", timeout=budget) for selector in selectors),
+            return_exceptions=True
+        )
+        errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+        if errors:
+            timed_out = True
+            logger.warning(f"Readiness wait for {url} ended without all selectors: {errors[0]}")
+
+    timings = {
+        "navigation_ms": round(navigation_ms),
+        "wait_ms": round((loop.time() - navigated) * 1000),
+        "timed_out": timed_out
+    }
+    return timings, response
+
+
+async def scrape_page(context, url: str, selector_schema: Dict[str, Any],
+                      options: Optional[Dict[str, Any]] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Load a URL in a new page of a leased browser context and extract its fields.
+
+    Args:
+        context (BrowserContext): Browser context leased from the browser pool
+        url (str): URL to scrape
+        selector_schema (dict): Selector schema defining what to extract
+        options (dict): Run options such as the readiness strategy
+        headers (dict): Extra headers of the document request only, e.g.
+            conditional request headers
+
+    Returns:
+        dict: Result payload with url, title, extraction time, fields, the
+        time spent waiting for the page and the response's `validators`, plus
+        the `dom_hash` of the page in "dom" change detection mode; or a
+        `not_modified` payload if the server answered with 304
+
+    Raises:
+        ThrottledError: If the host answers 429 or 503
+    """
+    from app.services.change_detection import get_change_detection, html_hash
+    from app.services.politeness import THROTTLE_STATUSES, ThrottledError, parse_retry_after
+    from app.services.validator_cache import not_modified_payload, response_validators
+
+    page = await context.new_page()
+    try:
+        if headers:
+            # Subresources must not be revalidated with the document's validators
+            async def add_headers(route):
+                await route.continue_(headers={**route.request.headers, **headers})
+
+            await page.route(lambda request_url: request_url == url, add_headers)
+
+        timings, response = await wait_until_ready(page, url, selector_schema, get_readiness(options))
+        if response is not None and response.status == 304:
+            return not_modified_payload(url)
+        if response is not None and response.status in THROTTLE_STATUSES:
+            retry_after = parse_retry_after((await response.all_headers()).get("retry-after"))
+            raise ThrottledError(url, response.status, retry_after)
+        extracted_data, title = await extract_page(page, selector_schema, url)
+
+        payload = {
+            "url": url,
+            "title": title,
+            "extracted_at": datetime.utcnow().isoformat(),
+            "fields": extracted_data,
+            "timings": timings
+        }
+        validators = response_validators(await response.all_headers()) if response is not None else {}
+        if validators:
+            payload["validators"] = validators
+        if get_change_detection(options) == "dom":
+            payload["dom_hash"] = html_hash(await page.content())
+        return payload
+    finally:
+        await page.close()
+
+
+def get_fetch_mode(options: Optional[Dict[str, Any]]) -> str:
+    """
+    Fetch mode of a run: "browser", "http" or "auto".
+
+    Args:
+        options (dict): Run options, may contain `fetch_mode`
+
+    Returns:
+        str: The fetch mode, settings.DEFAULT_FETCH_MODE if unset or invalid
+    """
+    fetch_mode = (options or {}).get('fetch_mode') or settings.DEFAULT_FETCH_MODE
+    if fetch_mode not in FETCH_MODES:
+        logger.warning(f"Unknown fetch_mode {fetch_mode!r}, using {settings.DEFAULT_FETCH_MODE}")
+        fetch_mode = settings.DEFAULT_FETCH_MODE
+    return fetch_mode
+
+
+async def fetch_over_http(url: str, selector_schema: Dict[str, Any], fetch_mode: str,
+                          dom_hash: bool = False,
+                          headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch a URL without the browser if the fetch mode allows it.
+
+    In "auto" mode a failed request or an empty required field means the page
+    needs the browser, which is signalled by returning None rather than raising.
+
+    Args:
+        url (str): URL to scrape
+        selector_schema (dict): Selector schema defining what to extract
+        fetch_mode (str): "browser", "http" or "auto"
+        dom_hash (bool): Add the `dom_hash` of the page to the payload
+        headers (dict): Extra request headers, e.g. conditional request headers
+
+    Returns:
+        Optional[dict]: Result payload, or None if the URL must be loaded in
+        the browser
+
+    Raises:
+        httpx.HTTPError: If the request fails in "http" mode
+        ThrottledError: If the host answers 429 or 503
+    """
+    if fetch_mode == "browser":
+        return None
+
+    from app.services.http_fetcher import fetch_page, missing_required_fields
+
+    if fetch_mode == "http":
+        return await fetch_page(url, selector_schema, dom_hash, headers)
+
+    from app.services.politeness import ThrottledError
+
+    try:
+        payload = await fetch_page(url, selector_schema, dom_hash, headers)
+    except ThrottledError:
+        # The browser would be throttled just the same
+        raise
+    except Exception as fetch_error:
+        logger.info(f"HTTP fetch of {url} failed, falling back to the browser: {fetch_error}")
+        return None
+    if payload.get("not_modified"):
+        return payload
+    missing = missing_required_fields(payload["fields"], selector_schema)
+    if missing:
+        logger.info(f"Required fields {missing} empty for {url} over HTTP, falling back to the browser")
+        return None
+    return payload
+
+
+async def scrape_urls(urls: List[str], selector_schema: Dict[str, Any], concurrency: int,
+                      on_success: Callable[[str, Dict[str, Any]], Awaitable[None]],
+                      on_failure: Callable[[str, Exception], Awaitable[None]],
+                      options: Optional[Dict[str, Any]] = None,
+                      conditional_headers: Optional[Callable[[str], Awaitable[Optional[Dict[str, str]]]]] = None
+                      ) -> Optional[Dict[str, Any]]:
+    """
+    Scrape URLs with at most `concurrency` pages in flight.
+
+    `concurrency` slots pull URLs from a shared queue. Unless the `politeness`
+    option disables it, a URL is only taken once its domain granted a lease
+    from the fleet-wide per-domain limits, so slots move on to other domains
+    while one is rate limited, and URLs whose host answers 429/503 are put
+    back while the domain backs off. Depending on the
+    `fetch_mode` option a slot fetches pages over plain HTTP ("http"), loads
+    them in a browser context leased from the browser pool ("browser"), or
+    tries HTTP first and falls back to the browser when the request fails or
+    required fields come back empty ("auto"). Contexts are only leased once a
+    slot needs the browser, and route their requests through the run's
+    resource blocker. The callbacks are awaited as soon as each URL finishes.
+
+    Args:
+        urls (List[str]): URLs to scrape
+        selector_schema (dict): Selector schema defining what to extract
+        concurrency (int): Maximum number of pages loaded in parallel
+        on_success: Coroutine called with the URL and its result payload
+        on_failure: Coroutine called with the URL and the scraping error
+        options (dict): Run options such as `fetch_mode`, the readiness
+            strategy, `block_resources` and `politeness`
+        conditional_headers: Coroutine returning the conditional request
+            headers of a URL, None to fetch it unconditionally. Pages the
+            server reports as not modified are passed to `on_success` as a
+            `not_modified` payload.
+
+    Returns:
+        Optional[dict]: Request counters of the resource blocker, None if
+        resource blocking is disabled
+    """
+    from app.services.browser_pool import browser_pool
+    from app.services.change_detection import get_change_detection
+    from app.services.politeness import DomainQueue, ThrottledError, get_politeness_scheduler
+    from app.services.resource_blocker import get_resource_blocker
+
+    fetch_mode = get_fetch_mode(options)
+    dom_hash = get_change_detection(options) == "dom"
+    blocker = get_resource_blocker(options)
+    queue = DomainQueue(urls, get_politeness_scheduler(options))
+
+    async def slot():
+        context = None
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                url, lease = item
+                logger.info(f"Scraping URL: {url}")
+                try:
+                    headers = await conditional_headers(url) if conditional_headers else None
+                    payload = await fetch_over_http(url, selector_schema, fetch_mode, dom_hash, headers)
+                    if payload is None:
+                        if context is None:
+                            context = await browser_pool.acquire()
+                            if blocker:
+                                await blocker.install(context)
+                        payload = await scrape_page(context, url, selector_schema, options, headers)
+                except ThrottledError as throttled:
+                    if not await queue.throttled(url, lease, throttled):
+                        await on_failure(url, throttled)
+                    continue
+                except Exception as url_error:
+                    await queue.done(url, lease)
+                    await on_failure(url, url_error)
+                else:
+                    await queue.done(url, lease)
+                    await on_success(url, payload)
+        finally:
+            if context is not None:
+                await browser_pool.release(context)
+
+    slots = max(1, min(concurrency, len(urls)))
+    await run_slots([slot() for _ in range(slots)])
+    return blocker.stats() if blocker else None
+
+
+async def run_slots(coroutines: List[Awaitable[None]]) -> None:
+    """
+    Run slot coroutines concurrently until all finished or one raised.
+
+    When a slot raises, the others are cancelled and awaited, so they release
+    their browser contexts before the error propagates and none keeps calling
+    the callbacks of a run that is being closed. Cancelling the caller
+    cancels every slot too.
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            task.cancel()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            raise outcome
@@ -2,7 +2,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from fastapi import HTTPException
 from app.schemas.template import Template, TemplateCreate, TemplateUpdate
-from app.core.supabase import supabase
+from app.core.database import get_db
 from app.core.config import settings
 import logging
 import json
@@ -25,9 +25,9 @@ template_id_counter = 1
 # Fail fast if Supabase credentials are missing in production
 if not use_in_memory_db:
     try:
-        # Check if supabase connection is valid
-        if not supabase:
-            raise ValueError("Supabase client is not initialized")
+        # Check that the database client can be created
+        if not get_db():
+            raise ValueError("Database client is not initialized")
     except Exception as e:
         logger.error(f"Supabase connection error: {e}")
         raise RuntimeError(f"Failed to connect to Supabase database. Please check your credentials. Error: {e}")
@@ -45,7 +45,7 @@ async def get_templates() -> List[Template]:
         return [Template(**template) for template in in_memory_templates]
 
     try:
-        response = supabase.table(TEMPLATES_TABLE).select("*").execute()
+        response = await get_db().table(TEMPLATES_TABLE).select("*").execute()
 
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching templates: {response.error}")
@@ -78,7 +78,7 @@ async def get_template(id: int) -> Template:
         raise HTTPException(status_code=404, detail=f"Template with ID {id} not found")
 
     try:
-        response = supabase.table(TEMPLATES_TABLE).select("*").eq("id", id).execute()
+        response = await get_db().table(TEMPLATES_TABLE).select("*").eq("id", id).execute()
 
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error fetching template {id}: {response.error}")
@@ -128,7 +128,7 @@ async def create_template(data: TemplateCreate) -> Template:
         template_data["created_at"] = now
         template_data["updated_at"] = now
 
-        response = supabase.table(TEMPLATES_TABLE).insert(template_data).execute()
+        response = await get_db().table(TEMPLATES_TABLE).insert(template_data).execute()
 
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error creating template: {response.error}")
@@ -180,7 +180,7 @@ async def update_template(id: int, data: TemplateUpdate) -> Template:
         if "updated_at" not in update_data:
             update_data["updated_at"] = datetime.utcnow().isoformat()
 
-        response = supabase.table(TEMPLATES_TABLE).update(update_data).eq("id", id).execute()
+        response = await get_db().table(TEMPLATES_TABLE).update(update_data).eq("id", id).execute()
 
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error updating template {id}: {response.error}")
@@ -219,7 +219,7 @@ async def delete_template(id: int) -> None:
         await get_template(id)
 
         # Delete the template
-        response = supabase.table(TEMPLATES_TABLE).delete().eq("id", id).execute()
+        response = await get_db().table(TEMPLATES_TABLE).delete().eq("id", id).execute()
 
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error deleting template {id}: {response.error}")
@@ -342,7 +342,7 @@ async def seed_initial_templates() -> List[Template]:
 
         for template in templates:
             # Check if template with same name exists
-            response = supabase.table(TEMPLATES_TABLE).select("*").eq("name", template["name"]).execute()
+            response = await get_db().table(TEMPLATES_TABLE).select("*").eq("name", template["name"]).execute()
 
             now = datetime.utcnow().isoformat()
             template["updated_at"] = now
@@ -350,12 +350,12 @@ async def seed_initial_templates() -> List[Template]:
             if response.data and len(response.data) > 0:
                 # Update existing template
                 template_id = response.data[0]["id"]
-                response = supabase.table(TEMPLATES_TABLE).update(template).eq("id", template_id).execute()
+                response = await get_db().table(TEMPLATES_TABLE).update(template).eq("id", template_id).execute()
                 logger.info(f"Updated existing template: {template['name']}")
             else:
                 # Create new template
                 template["created_at"] = now
-                response = supabase.table(TEMPLATES_TABLE).insert(template).execute()
+                response = await get_db().table(TEMPLATES_TABLE).insert(template).execute()
                 logger.info(f"Created new template: {template['name']}")
 
             if hasattr(response, 'error') and response.error is not None:
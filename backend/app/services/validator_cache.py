@@ -0,0 +1,120 @@
+"""
+HTTP validator cache for conditional requests.
+
+The ETag and Last-Modified validators a page was served with are kept in Redis
+per schedule, together with the fingerprint of what was extracted from it. The
+next run of the schedule sends them as If-None-Match / If-Modified-Since, and a
+304 Not Modified response lets the worker skip downloading and extracting the
+page.
+"""
+from typing import Any, Dict, List, Mapping, Optional
+import hashlib
+import logging
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Keys read per pipelined round trip when loading a run's validators
+LOAD_BATCH_SIZE = 500
+
+
+def response_validators(headers: Mapping[str, str]) -> Dict[str, str]:
+    """ETag and Last-Modified of a response, whichever it has."""
+    validators = {}
+    for header, name in (("etag", "etag"), ("last-modified", "last_modified")):
+        value = headers.get(header)
+        if value:
+            validators[name] = value
+    return validators
+
+
+def conditional_headers(validators: Mapping[str, str]) -> Dict[str, str]:
+    """Request headers revalidating a page against its cached validators."""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def not_modified_payload(url: str) -> Dict[str, Any]:
+    """Result payload of a page the server answered with 304 Not Modified."""
+    return {"url": url, "not_modified": True}
+
+
+class ValidatorCache:
+    """
+    Validators and fingerprints of the pages of one schedule.
+
+    `load` reads the entries of a run's URLs with pipelined HGETALLs, after
+    which `get` is a dictionary lookup. `set` writes through to Redis, where
+    entries expire VALIDATOR_CACHE_TTL seconds after their page was last
+    fetched.
+    """
+
+    def __init__(self, scope: str, ttl: Optional[int] = None):
+        self.scope = scope
+        self.ttl = ttl if ttl is not None else settings.VALIDATOR_CACHE_TTL
+        self._entries: Dict[str, Dict[str, str]] = {}
+
+    def key(self, url: str) -> str:
+        return f"validators:{self.scope}:{hashlib.sha1(url.encode('utf-8')).hexdigest()}"
+
+    async def load(self, urls: List[str]) -> None:
+        """Read the cached validators of the given URLs."""
+        redis = get_redis()
+        for start in range(0, len(urls), LOAD_BATCH_SIZE):
+            batch = urls[start:start + LOAD_BATCH_SIZE]
+            pipe = redis.pipeline(transaction=False)
+            for url in batch:
+                pipe.hgetall(self.key(url))
+            for url, entry in zip(batch, await pipe.execute()):
+                if entry:
+                    self._entries[url] = {
+                        (k.decode("utf-8") if isinstance(k, bytes) else k): (v.decode("utf-8") if isinstance(v, bytes) else v)
+                        for k, v in entry.items()
+                    }
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        """Cached validators and fingerprint of a URL, None if unknown."""
+        return self._entries.get(url)
+
+    async def set(self, url: str, validators: Dict[str, str], fingerprint: str) -> None:
+        """
+        Cache the validators a page was served with.
+
+        Args:
+            url (str): URL of the page
+            validators (dict): `etag` and/or `last_modified` of the response
+            fingerprint (str): Fingerprint of the fields extracted from it
+        """
+        entry = {**validators, "fingerprint": fingerprint}
+        key = self.key(url)
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.delete(key)
+        pipe.hset(key, mapping=entry)
+        pipe.expire(key, self.ttl)
+        await pipe.execute()
+        self._entries[url] = entry
+
+
+def get_validator_cache(options: Optional[Dict[str, Any]]) -> Optional[ValidatorCache]:
+    """
+    Validator cache of a run, None unless it is a scheduled run that sends
+    conditional requests.
+
+    Needs change detection, since a page that was not modified is stored as
+    an unchanged reference to the previous run's result.
+    """
+    from app.services.change_detection import get_change_detection
+
+    options = options or {}
+    enabled = options.get('conditional_requests')
+    if enabled is None:
+        enabled = settings.CONDITIONAL_REQUESTS
+    if not enabled or not options.get('schedule_id') or get_change_detection(options) == "off":
+        return None
+    return ValidatorCache(f"schedule:{options['schedule_id']}")
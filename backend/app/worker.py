@@ -1,12 +1,14 @@
-from celery import Celery, group
+from celery import Celery, chord, group
+from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.core.config import settings
+from app.core.redis import close_redis, get_redis
+from app.core import task_queues
 import logging
 import time
 import requests
 from datetime import datetime
 import asyncio
-import json
-import aioredis
 
 # Import and configure Sentry
 import sentry_sdk
@@ -37,24 +39,273 @@ celery.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # One queue per class of work, prioritized within each queue
+    task_queues=task_queues.TASK_QUEUES,
+    task_routes=task_queues.TASK_ROUTES,
+    task_default_queue=task_queues.INTERACTIVE,
+    task_default_priority=task_queues.PRIORITIES[task_queues.INTERACTIVE],
+    broker_transport_options=task_queues.BROKER_TRANSPORT_OPTIONS,
+    # Prefetched tasks would skip the priority order of the broker
+    worker_prefetch_multiplier=1,
+    # Nightly results maintenance, see app/services/result_archive.py
+    beat_schedule={
+        "archive-results": {"task": "archive_results", "schedule": crontab(hour=3, minute=0)},
+    },
 )
 
-# Global Redis client (initialized once per worker process)
-# Ensure REDIS_URL is set in your settings
-_redis_client = None
-
 async def get_redis_client():
-    global _redis_client
-    if _redis_client is None:
-        _redis_client = await aioredis.from_url(settings.REDIS_URL)
-    return _redis_client
+    """Redis client of the worker process, backed by the shared connection pool."""
+    return get_redis()
 
 async def publish_event(run_id: int, event_type: str, data: dict):
-    redis = await get_redis_client()
-    channel = f"run:{run_id}"
-    payload = {"type": event_type, "data": data}
-    await redis.publish(channel, json.dumps(payload))
-    logger.info(f"Published event to {channel}: {event_type}")
+    """Append an event to the run's replayable log and publish it to live subscribers."""
+    from app.services.run_events import append_event
+
+    event_id = await append_event(run_id, event_type, data)
+    logger.info(f"Published event {event_id} of run {run_id}: {event_type}")
+
+
+class RunRecorder:
+    """
+    Persists the outcome of each scraped URL of a run and publishes its events.
+
+    Results are buffered by a ResultWriter and written in bulk, and events by
+    an EventBatcher that publishes them in pipelined batches and coalesces
+    status updates, so `close()` must be awaited once the run's URLs are done.
+
+    With `shared_progress` the counters published in status events are kept in
+    a Redis hash, so chunks of a distributed run running on different workers
+    report the totals of the whole run instead of their own.
+
+    With a `change_detector` pages whose fingerprint matches the previous run
+    of the schedule are stored as "unchanged" results referencing the result
+    that holds their data. With a `validator_cache` as well, those pages are
+    requested conditionally and a 304 response skips their extraction.
+
+    The fair share slots of the run are refreshed when scraping starts and
+    with the status updates, so they outlive RUN_SLOT_TTL while it progresses.
+    """
+
+    def __init__(self, run_id: int, shared_progress: bool = False, change_detector=None,
+                 validator_cache=None):
+        from app.services.event_batcher import EventBatcher
+        from app.services.fair_share import SlotHeartbeat
+        from app.services.result_writer import ResultWriter
+
+        self.run_id = run_id
+        self.shared_progress = shared_progress
+        self.change_detector = change_detector
+        self.validator_cache = validator_cache if change_detector is not None else None
+        self.records_extracted = 0
+        self.failed = 0
+        self.details = {}
+        self.resource_stats = None
+        self.writer = ResultWriter()
+        self.events = EventBatcher(run_id, status_factory=self._status)
+        self.slot = SlotHeartbeat(run_id)
+        # Counters already added to the shared progress hash
+        self._reported = (0, 0)
+
+    async def scrape(self, urls, selector_schema, concurrency: int = 1, options=None):
+        """Scrape URLs, recording each outcome, and flush the buffered results."""
+        from app.services.scraper import scrape_urls
+
+        try:
+            await self.slot.beat()
+            if self.change_detector is not None:
+                await self.change_detector.load(urls)
+            if self.validator_cache is not None:
+                await self.validator_cache.load(urls)
+            self.resource_stats = await scrape_urls(
+                urls, selector_schema, concurrency, self.success, self.failure, options,
+                self.conditional_headers if self.validator_cache is not None else None
+            )
+        finally:
+            await self.close()
+
+    async def close(self):
+        try:
+            await self.writer.close()
+        finally:
+            await self.events.close()
+
+    @property
+    def changes(self):
+        """New/changed/unchanged page counts, None without change detection."""
+        return dict(self.change_detector.counts) if self.change_detector is not None else None
+
+    async def conditional_headers(self, url: str):
+        """
+        Conditional request headers of a URL, None to fetch it unconditionally.
+
+        Only pages the previous run stored the cached content of are
+        revalidated, so a 304 can always reference the previous result.
+        """
+        from app.services.validator_cache import conditional_headers
+
+        previous = self.change_detector.previous(url)
+        validators = self.validator_cache.get(url)
+        if previous is None or validators is None or validators.get("fingerprint") != previous[0]:
+            return None
+        return conditional_headers(validators) or None
+
+    async def success(self, url: str, result_data_payload: dict):
+        from app.schemas.result import ResultCreate
+
+        if result_data_payload.get("not_modified"):
+            fingerprint, source_id = self.change_detector.not_modified(url)
+            await self.unchanged(url, fingerprint, source_id)
+            return
+
+        validators = result_data_payload.pop("validators", None)
+        if self.change_detector is not None:
+            change, source_id = self.change_detector.classify(url, result_data_payload)
+            if validators and self.validator_cache is not None:
+                await self.validator_cache.set(url, validators, result_data_payload["fingerprint"])
+            if change == "unchanged":
+                await self.unchanged(url, result_data_payload["fingerprint"], source_id)
+                return
+
+        # Create a result with status "success"
+        await self.writer.add(ResultCreate(
+            run_id=self.run_id,
+            data=result_data_payload,
+            url=url,
+            status="success",
+            error_message=None
+        ))
+
+        self.records_extracted += 1
+        self.details[url] = result_data_payload # Storing the payload, not the DB object
+
+        # Queue record event and status update
+        self.events.add("record", result_data_payload)
+        self.events.status_changed()
+
+    async def unchanged(self, url: str, fingerprint: str, source_id: int):
+        from app.schemas.result import ResultCreate
+
+        # Store a reference to the result holding the data instead of a copy
+        reference = {"fingerprint": fingerprint, "unchanged_from": source_id}
+        await self.writer.add(ResultCreate(
+            run_id=self.run_id,
+            data=reference,
+            url=url,
+            status="unchanged",
+            error_message=None
+        ))
+
+        self.records_extracted += 1
+        self.details[url] = reference
+
+        self.events.add("unchanged", {"url": url, **reference})
+        self.events.status_changed()
+
+    async def failure(self, url: str, url_error: Exception):
+        from app.schemas.result import ResultCreate
+
+        logger.error(f"Error scraping URL {url}: {url_error}")
+        error_message = str(url_error)
+
+        # Store the failed result in the database
+        await self.writer.add(ResultCreate(
+            run_id=self.run_id,
+            data={},  # Empty data for failed scrape
+            url=url,
+            status="failed",
+            error_message=error_message
+        ))
+
+        self.failed += 1
+        self.details[url] = {"error": error_message}
+
+        # Queue error event for this URL
+        self.events.add("url_error", {
+            "url": url,
+            "error": error_message
+        })
+        self.events.status_changed()
+
+    async def _status(self):
+        """Build the coalesced running status event, called by the event batcher."""
+        await self.slot.beat()
+        records_extracted, failed = await self._progress()
+        return {
+            "records_extracted": records_extracted,
+            "status": "running",
+            "failed_urls": failed
+        }
+
+    async def _progress(self):
+        """Return the (records_extracted, failed) totals to report for the run."""
+        if not self.shared_progress:
+            return self.records_extracted, self.failed
+
+        records = self.records_extracted - self._reported[0]
+        failed = self.failed - self._reported[1]
+        self._reported = (self.records_extracted, self.failed)
+
+        redis = await get_redis_client()
+        key = f"run:{self.run_id}:progress"
+        pipe = redis.pipeline()
+        pipe.hincrby(key, "records_extracted", records)
+        pipe.hincrby(key, "failed", failed)
+        pipe.expire(key, 24 * 60 * 60)
+        records_extracted, failed_total, _ = await pipe.execute()
+        return records_extracted, failed_total
+
+# Event loop of the current worker process. Tasks share it so that the browser
+# pool and the Redis client, which are bound to a loop, survive between tasks.
+_worker_loop = None
+
+def get_worker_loop():
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Launch the browser pool once when a worker process boots."""
+    from app.services.browser_pool import browser_pool
+
+    try:
+        get_worker_loop().run_until_complete(browser_pool.start())
+    except Exception as e:
+        # Tasks start the pool lazily, so a failed warm-up is not fatal
+        logger.error(f"Failed to start browser pool: {e}")
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """Close the pooled browsers and the event loop of the worker process."""
+    from app.core.database import close_db
+    from app.repositories import close_repository
+    from app.services.browser_pool import browser_pool
+    from app.services.http_fetcher import close_http_client
+
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    # Each resource is closed even if closing another one failed
+    resources = [
+        ("browser pool", browser_pool.close),
+        ("HTTP client", close_http_client),
+        ("Redis client", close_redis),
+        ("repository", close_repository),
+        ("database client", close_db),
+    ]
+    try:
+        for name, close in resources:
+            try:
+                _worker_loop.run_until_complete(close())
+            except Exception as e:
+                logger.error(f"Error closing the {name}: {e}")
+    finally:
+        _worker_loop.close()
+        _worker_loop = None
 
 # Import tasks modules
 # celery.autodiscover_tasks(["app.services.scraper"])
@@ -78,34 +329,39 @@ def process_scraping_run(self, run_id, project_id, run_data):
     Returns:
         dict: Results of the run
     """
+    from app.services.fair_share import acquire_run_slot, get_project_owner, release_run_slot
+
     logger.info(f"Processing scraping run {run_id} for project {project_id}")
-    loop = asyncio.new_event_loop() # Create a new event loop for this task
-    asyncio.set_event_loop(loop)
+    loop = get_worker_loop()
+    recorder = None
+
+    # Defer the run while its project or owner already uses its share of the fleet
+    if not loop.run_until_complete(acquire_run_slot(run_id, project_id, get_project_owner(project_id))):
+        queue = (self.request.delivery_info or {}).get('routing_key')
+        if queue not in task_queues.PRIORITIES:
+            queue = task_queues.INTERACTIVE
+        process_scraping_run.apply_async(
+            (run_id, project_id, run_data),
+            countdown=settings.FAIR_SHARE_RETRY_DELAY,
+            **task_queues.task_options(queue)
+        )
+        logger.info(f"Deferred run {run_id}, project {project_id} is at its limit of active runs")
+        loop.run_until_complete(publish_event(run_id, "status", {"status": "pending", "deferred": True}))
+        return {
+            "status": "deferred",
+            "run_id": run_id
+        }
 
+    # Distributed runs keep their slot until finalize_distributed_run
+    distributed = False
     try:
         # Update run status to running and publish event
         update_run_status(run_id, "running")
         loop.run_until_complete(publish_event(run_id, "status", {"records_extracted": 0, "status": "running"}))
 
-        # Get project details to get the selector schema
         from app.core.supabase import supabase
 
-        # First try to get selector schema from run_data or config
-        selector_schema = None
-        if run_data.get('config') and run_data['config'].get('selector_schema'):
-            selector_schema = run_data['config']['selector_schema']
-
-        # If not found, try to get it from the template if a template_id is specified
-        if not selector_schema and run_data.get('template_id'):
-            template_response = supabase.table("templates").select("selector_schema").eq("id", run_data['template_id']).execute()
-            if template_response.data:
-                selector_schema = template_response.data[0].get('selector_schema')
-
-        # If still not found, get from the project
-        if not selector_schema:
-            project_response = supabase.table("projects").select("configuration").eq("id", project_id).execute()
-            if project_response.data and project_response.data[0].get('configuration'):
-                selector_schema = project_response.data[0]['configuration'].get('selector_schema')
+        selector_schema, options = resolve_run_options(project_id, run_data)
 
         if not selector_schema:
             # Publish error status
@@ -125,106 +381,35 @@ def process_scraping_run(self, run_id, project_id, run_data):
             loop.run_until_complete(publish_event(run_id, "status", {"status": "failed", "error": "No URLs specified"}))
             raise ValueError("No URLs specified for scraping")
 
-        # Use Playwright to scrape each URL
-        from playwright.sync_api import sync_playwright
-
-        total_records = 0
-        all_results = {}
-        total_failed = 0
-
-        # For simplicity, we'll do sequential processing here
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch(headless=True)
-
-            for url_index, url in enumerate(urls):
-                try:
-                    logger.info(f"Scraping URL: {url}")
-                    page = browser.new_page()
-                    page.goto(url, wait_until="networkidle")
-
-                    extracted_data = {}
-                    for field_name, field_config in selector_schema.items():
-                        selector = field_config.get('selector')
-                        field_type = field_config.get('type', 'text')
-                        attribute = field_config.get('attribute')
-                        try:
-                            if field_type == 'text':
-                                value = page.locator(selector).first.inner_text()
-                            elif field_type == 'html':
-                                value = page.locator(selector).first.inner_html()
-                            elif field_type == 'link' and attribute:
-                                value = page.locator(selector).first.get_attribute(attribute)
-                            else:
-                                value = page.locator(selector).first.inner_text()
-                            extracted_data[field_name] = value
-                        except Exception as field_error:
-                            logger.warning(f"Failed to extract {field_name} with selector {selector} for {url}: {field_error}")
-                            extracted_data[field_name] = None
-
-                    from app.services.result_service import create_result
-                    from app.schemas.result import ResultCreate
-
-                    result_data_payload = {
-                        "url": url,
-                        "title": page.title(),
-                        "extracted_at": datetime.utcnow().isoformat(),
-                        "fields": extracted_data
-                    }
-
-                    # Create a result with status "success"
-                    result_obj = ResultCreate(
-                        run_id=run_id,
-                        data=result_data_payload,
-                        url=url,
-                        status="success",
-                        error_message=None
-                    )
-                    # create_result is async, so we run it in the loop
-                    persisted_result = loop.run_until_complete(create_result(result_obj))
-
-                    total_records += 1
-                    all_results[url] = result_data_payload # Storing the payload, not the DB object
-
-                    # Publish record event
-                    loop.run_until_complete(publish_event(run_id, "record", result_data_payload))
-
-                    # Publish status update
-                    loop.run_until_complete(publish_event(run_id, "status", {
-                        "records_extracted": total_records,
-                        "status": "running",
-                        "failed_urls": total_failed
-                    }))
-
-                    page.close()
-                except Exception as url_error:
-                    logger.error(f"Error scraping URL {url}: {url_error}")
-                    error_message = str(url_error)
-
-                    # Store the failed result in the database
-                    from app.services.result_service import create_result
-                    from app.schemas.result import ResultCreate
-
-                    failed_result_obj = ResultCreate(
-                        run_id=run_id,
-                        data={},  # Empty data for failed scrape
-                        url=url,
-                        status="failed",
-                        error_message=error_message
-                    )
-
-                    # Persist failed result
-                    loop.run_until_complete(create_result(failed_result_obj))
-                    total_failed += 1
-
-                    all_results[url] = {"error": error_message}
-
-                    # Publish error event for this URL
-                    loop.run_until_complete(publish_event(run_id, "url_error", {
-                        "url": url,
-                        "error": error_message
-                    }))
-
-            browser.close()
+        concurrency = get_run_concurrency(options)
+
+        # Scheduled runs are compared with the previous run of their schedule
+        from app.services.change_detection import find_previous_run, get_change_detection, get_change_detector
+
+        from app.services.validator_cache import get_validator_cache
+
+        if get_change_detection(options) != "off":
+            options['schedule_id'] = run_data.get('schedule_id')
+            options['previous_run_id'] = loop.run_until_complete(
+                find_previous_run(run_data.get('schedule_id'), run_id)
+            )
+        recorder = RunRecorder(
+            run_id,
+            change_detector=get_change_detector(options),
+            validator_cache=get_validator_cache(options)
+        )
+
+        # Spread large runs over the worker fleet instead of scraping them here
+        chunk_size = get_run_chunk_size(options, len(urls))
+        if chunk_size:
+            distributed = True
+            return dispatch_distributed_run(run_id, urls, selector_schema, concurrency, chunk_size, options)
+
+        # Scrape the URLs, `concurrency` pages at a time
+        loop.run_until_complete(recorder.scrape(urls, selector_schema, concurrency, options))
+        total_records = recorder.records_extracted
+        total_failed = recorder.failed
+        all_results = recorder.details
 
         # Update run with results summary and mark as completed
         finished_at = datetime.utcnow().isoformat()
@@ -234,7 +419,9 @@ def process_scraping_run(self, run_id, project_id, run_data):
             "results": {
                 "summary": f"Extracted {total_records} records from {len(urls)} URLs ({total_failed} failed)",
                 "details": all_results,
-                "failed_count": total_failed
+                "failed_count": total_failed,
+                "resources": recorder.resource_stats,
+                "changes": recorder.changes
             },
             "finished_at": finished_at,
             "updated_at": finished_at
@@ -261,7 +448,8 @@ def process_scraping_run(self, run_id, project_id, run_data):
         # Update run with error
         update_run_error(run_id, str(e)) # This also sets status to 'failed'
         # Publish error status
-        loop.run_until_complete(publish_event(run_id, "status", {"records_extracted": total_records, "status": "failed", "error": str(e)}))
+        records_extracted = recorder.records_extracted if recorder else 0
+        loop.run_until_complete(publish_event(run_id, "status", {"records_extracted": records_extracted, "status": "failed", "error": str(e)}))
 
         # Retry if appropriate
         try:
@@ -277,105 +465,230 @@ def process_scraping_run(self, run_id, project_id, run_data):
                 "error": str(e)
             }
     finally:
-        loop.close() # Close the event loop
+        if not distributed:
+            loop.run_until_complete(release_run_slot(run_id))
 
 
-@celery.task(name="scrape_url", bind=True, max_retries=3)
-def scrape_url(self, url, selector_schema, run_id):
+@celery.task(name="scrape_url_chunk")
+def scrape_url_chunk(run_id, urls, selector_schema, concurrency=1, options=None):
     """
-    Scrape a single URL using Playwright.
-    This is a subtask that can be used in a group for parallel processing.
+    Scrape one chunk of the URLs of a distributed run.
 
     Args:
-        url (str): URL to scrape
-        selector_schema (dict): Selector schema defining what to extract
         run_id (int): ID of the parent run
+        urls (List[str]): URLs of this chunk
+        selector_schema (dict): Selector schema defining what to extract
+        concurrency (int): Number of pages loaded in parallel
+        options (dict): Run options such as `fetch_mode`
 
     Returns:
-        dict: Extracted data
+        dict: Number of extracted records and the errors of failed URLs
     """
-    logger.info(f"Scraping URL: {url} for run {run_id}")
+    from app.services.change_detection import get_change_detector
+    from app.services.validator_cache import get_validator_cache
+
+    logger.info(f"Scraping chunk of {len(urls)} URLs for run {run_id}")
+    loop = get_worker_loop()
+    recorder = RunRecorder(
+        run_id,
+        shared_progress=True,
+        change_detector=get_change_detector(options),
+        validator_cache=get_validator_cache(options)
+    )
 
     try:
-        from playwright.sync_api import sync_playwright
-
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.goto(url, wait_until="networkidle")
-
-            # Extract data based on selector schema
-            extracted_data = {}
-
-            for field_name, field_config in selector_schema.items():
-                selector = field_config.get('selector')
-                field_type = field_config.get('type', 'text')
-                attribute = field_config.get('attribute')
-
-                try:
-                    element = page.locator(selector).first
-
-                    if field_type == 'text':
-                        value = page.locator(selector).inner_text()
-                    elif field_type == 'html':
-                        value = page.locator(selector).inner_html()
-                    elif field_type == 'link' and attribute:
-                        value = page.locator(selector).get_attribute(attribute)
-                    else:
-                        value = page.locator(selector).inner_text()
-
-                    extracted_data[field_name] = value
-                except Exception as field_error:
-                    logger.warning(f"Failed to extract {field_name} with selector {selector}: {field_error}")
-                    extracted_data[field_name] = None
-
-            # Create a result record for this URL
-            from app.services.result_service import create_result
-            from app.schemas.result import ResultCreate
+        loop.run_until_complete(recorder.scrape(urls, selector_schema, concurrency, options))
+    except Exception as e:
+        # Retrying a chord member would confuse the chord counter, so report
+        # the URLs this chunk could not get to as failed instead
+        logger.error(f"Error scraping chunk of run {run_id}: {e}")
+        for url in urls:
+            recorder.details.setdefault(url, {"error": str(e)})
+
+    return {
+        "records_extracted": recorder.records_extracted,
+        "failed": {url: detail["error"] for url, detail in recorder.details.items() if "error" in detail},
+        "resources": recorder.resource_stats,
+        "changes": recorder.changes
+    }
+
+
+@celery.task(name="finalize_distributed_run")
+def finalize_distributed_run(chunk_results, run_id, url_count):
+    """
+    Chord callback aggregating the chunks of a distributed run.
 
-            # Store metadata with the extracted data
-            result_data = {
-                "url": url,
-                "title": page.title(),
-                "extracted_at": datetime.utcnow().isoformat(),
-                "fields": extracted_data
-            }
+    Args:
+        chunk_results (List[dict]): Return values of the scrape_url_chunk tasks
+        run_id (int): ID of the run
+        url_count (int): Total number of URLs in the run
 
-            # Create the result asynchronously
-            loop = asyncio.get_event_loop()
-            if not loop.is_running():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-            result = loop.run_until_complete(
-                create_result(
-                    ResultCreate(
-                        run_id=run_id,
-                        data=result_data
-                    )
-                )
-            )
+    Returns:
+        dict: Results of the run
+    """
+    from app.core.supabase import supabase
+    from app.services.change_detection import merge_change_counts
+    from app.services.fair_share import release_run_slot
+    from app.services.resource_blocker import merge_resource_stats
+
+    loop = get_worker_loop()
+    total_records = sum(result.get("records_extracted", 0) for result in chunk_results)
+    failed_urls = {}
+    for result in chunk_results:
+        failed_urls.update(result.get("failed", {}))
+    total_failed = len(failed_urls)
+
+    finished_at = datetime.utcnow().isoformat()
+    supabase.table("runs").update({
+        "status": "completed",
+        "records_extracted": total_records,
+        "results": {
+            "summary": f"Extracted {total_records} records from {url_count} URLs ({total_failed} failed)",
+            # Successful payloads are in the results table; keep only the failures here
+            "details": {url: {"error": error} for url, error in failed_urls.items()},
+            "failed_count": total_failed,
+            "chunks": len(chunk_results),
+            "resources": merge_resource_stats(result.get("resources") for result in chunk_results),
+            "changes": merge_change_counts(result.get("changes") for result in chunk_results)
+        },
+        "finished_at": finished_at,
+        "updated_at": finished_at
+    }).eq("id", run_id).execute()
+    loop.run_until_complete(release_run_slot(run_id))
+
+    logger.info(f"Completed distributed run {run_id} with {total_records} records extracted and {total_failed} failures")
+
+    loop.run_until_complete(publish_event(run_id, "status", {
+        "records_extracted": total_records,
+        "status": "completed",
+        "failed_urls": total_failed
+    }))
+
+    return {
+        "status": "completed",
+        "run_id": run_id,
+        "records_extracted": total_records,
+        "failed_count": total_failed
+    }
+
+
+def resolve_run_options(project_id, run_data):
+    """
+    Resolve the selector schema and options of a run.
 
-            page.close()
-            browser.close()
+    Options are merged from the project configuration, the template config and
+    the run config, later sources overriding earlier ones. The selector schema
+    is taken from the first of run config, template and project configuration
+    that defines one.
 
-            return {
-                "url": url,
-                "status": "success",
-                "data": extracted_data
-            }
-    except Exception as e:
-        logger.error(f"Error scraping URL {url}: {e}")
+    Args:
+        project_id (int): ID of the project
+        run_data (dict): Data of the run
 
-        # Retry if appropriate
-        try:
-            raise self.retry(exc=e, countdown=30)  # Retry after 30 seconds
-        except Exception:
-            return {
-                "url": url,
-                "status": "failed",
-                "error": str(e)
-            }
+    Returns:
+        Tuple[dict, dict]: Selector schema (None if not found) and run options
+    """
+    from app.core.supabase import supabase
+
+    run_config = run_data.get('config') or {}
+
+    template = {}
+    if run_data.get('template_id'):
+        template_response = supabase.table("templates").select("selector_schema, config").eq("id", run_data['template_id']).execute()
+        if template_response.data:
+            template = template_response.data[0]
+
+    project_configuration = {}
+    project_response = supabase.table("projects").select("configuration").eq("id", project_id).execute()
+    if project_response.data and project_response.data[0].get('configuration'):
+        project_configuration = project_response.data[0]['configuration']
+
+    selector_schema = (
+        run_config.get('selector_schema')
+        or template.get('selector_schema')
+        or project_configuration.get('selector_schema')
+    )
+    options = {**project_configuration, **(template.get('config') or {}), **run_config}
+    options.pop('selector_schema', None)
+    return selector_schema, options
+
+
+def get_run_concurrency(config):
+    """
+    Number of pages a run may load in parallel.
+
+    Args:
+        config (dict): Run configuration, may contain `concurrency`
+
+    Returns:
+        int: Concurrency between 1 and settings.MAX_RUN_CONCURRENCY
+    """
+    try:
+        concurrency = int((config or {}).get('concurrency') or 1)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid concurrency in run config: {config.get('concurrency')}")
+        concurrency = 1
+    return max(1, min(concurrency, settings.MAX_RUN_CONCURRENCY))
+
+
+def get_run_chunk_size(config, url_count):
+    """
+    Chunk size for a distributed run, or None to scrape the run in one task.
+
+    A run is distributed when its config sets `distributed: true` or when it
+    has at least settings.DISTRIBUTED_RUN_THRESHOLD URLs (0 disables this).
+
+    Args:
+        config (dict): Run configuration, may contain `distributed` and `chunk_size`
+        url_count (int): Number of URLs in the run
+
+    Returns:
+        Optional[int]: Number of URLs per chunk task
+    """
+    config = config or {}
+    threshold = settings.DISTRIBUTED_RUN_THRESHOLD
+    distributed = config.get('distributed')
+    if distributed is None:
+        distributed = bool(threshold) and url_count >= threshold
+    if not distributed:
+        return None
+
+    try:
+        chunk_size = int(config.get('chunk_size') or settings.RUN_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        chunk_size = settings.RUN_CHUNK_SIZE
+    chunk_size = max(1, chunk_size)
+    # A single chunk gains nothing from the fan-out
+    return chunk_size if url_count > chunk_size else None
+
+
+def dispatch_distributed_run(run_id, urls, selector_schema, concurrency, chunk_size, options=None):
+    """
+    Fan a run out as a chord of scrape_url_chunk tasks.
+
+    The chord callback, finalize_distributed_run, aggregates the chunk results
+    into the runs row and publishes the final status event.
+
+    Returns:
+        dict: Dispatch summary of the run
+    """
+    chunks = [urls[i:i + chunk_size] for i in range(0, len(urls), chunk_size)]
+    header = group(
+        scrape_url_chunk.s(run_id, chunk, selector_schema, concurrency, options).set(
+            **task_queues.task_options(task_queues.BULK)
+        )
+        for chunk in chunks
+    )
+    chord(header)(finalize_distributed_run.s(run_id, len(urls)).set(
+        **task_queues.task_options(task_queues.INTERACTIVE)
+    ))
+
+    logger.info(f"Dispatched run {run_id} as {len(chunks)} chunks of up to {chunk_size} URLs")
+    return {
+        "status": "dispatched",
+        "run_id": run_id,
+        "chunks": len(chunks)
+    }
 
 
 def update_run_status(run_id, status):
@@ -506,8 +819,12 @@ def run_scheduled_scrape(self, schedule_id, project_id, **kwargs):
             "updated_at": datetime.utcnow().isoformat()
         }).eq("id", schedule_id).execute()
 
-        # Process the run
-        process_scraping_run.delay(run_id, project_id, run_data)
+        # Process the run, large runs go to the bulk queue
+        url_count = len(run_data.get('urls') or []) + (1 if run_data.get('url') else 0)
+        process_scraping_run.apply_async(
+            (run_id, project_id, run_data),
+            **task_queues.task_options(task_queues.run_queue(url_count, scheduled=True))
+        )
 
         return {
             "status": "enqueued",
@@ -536,8 +853,22 @@ def run_scheduled_scrape(self, schedule_id, project_id, **kwargs):
                 "error": str(e)
             }
 
+@celery.task(name="archive_results")
+def archive_results():
+    """
+    Create the upcoming results partitions and archive the expired results.
+
+    Returns:
+        dict: Summary of the maintenance
+    """
+    from app.services.result_archive import run_maintenance
+
+    summary = get_worker_loop().run_until_complete(run_maintenance())
+    logger.info(f"Results maintenance done: {summary}")
+    return summary
+
 @celery.task(name="process_single_url", bind=True, max_retries=3)
-def process_single_url(self, run_id, url, selector_schema):
+def process_single_url(self, run_id, url, selector_schema, options=None, attempt=1):
     """
     Process a single URL from a scraping run.
     This is used for retrying failed URLs.
@@ -546,116 +877,97 @@ def process_single_url(self, run_id, url, selector_schema):
         run_id (int): ID of the run to process
         url (str): The URL to scrape
         selector_schema (dict): The selector schema to use
+        options (dict): Run options such as `fetch_mode`
+        attempt (int): Attempt number of the URL, 1 for its first retry (the
+            run's own scrape is attempt 0). Results are keyed by (run_id, url,
+            attempt), so a redelivered retry is not stored twice
 
     Returns:
         dict: Result of the scraping
     """
     logger.info(f"Processing single URL: {url} for run {run_id}")
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    loop = get_worker_loop()
 
     try:
-        # Use Playwright to scrape the URL
-        from playwright.sync_api import sync_playwright
+        # Fetch the URL over HTTP if the fetch mode allows it, else use a pooled browser
+        from app.services.browser_pool import browser_pool
+        from app.services.resource_blocker import get_resource_blocker
+        from app.services.scraper import fetch_over_http, get_fetch_mode, scrape_page
 
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch(headless=True)
+        context = None
 
-            try:
-                page = browser.new_page()
-                page.goto(url, wait_until="networkidle")
-
-                extracted_data = {}
-                for field_name, field_config in selector_schema.items():
-                    selector = field_config.get('selector')
-                    field_type = field_config.get('type', 'text')
-                    attribute = field_config.get('attribute')
-                    try:
-                        if field_type == 'text':
-                            value = page.locator(selector).first.inner_text()
-                        elif field_type == 'html':
-                            value = page.locator(selector).first.inner_html()
-                        elif field_type == 'link' and attribute:
-                            value = page.locator(selector).first.get_attribute(attribute)
-                        else:
-                            value = page.locator(selector).first.inner_text()
-                        extracted_data[field_name] = value
-                    except Exception as field_error:
-                        logger.warning(f"Failed to extract {field_name} with selector {selector} for {url}: {field_error}")
-                        extracted_data[field_name] = None
-
-                from app.services.result_service import create_result
-                from app.schemas.result import ResultCreate
-
-                result_data_payload = {
-                    "url": url,
-                    "title": page.title(),
-                    "extracted_at": datetime.utcnow().isoformat(),
-                    "fields": extracted_data
-                }
-
-                # Create a result with status "success"
-                result_obj = ResultCreate(
-                    run_id=run_id,
-                    data=result_data_payload,
-                    url=url,
-                    status="success",
-                    error_message=None
-                )
-
-                # create_result is async, so we run it in the loop
-                persisted_result = loop.run_until_complete(create_result(result_obj))
-
-                # Update run record count directly
-                from app.core.supabase import supabase
-                update_response = supabase.table("runs").select("records_extracted").eq("id", run_id).execute()
-                if update_response.data:
-                    current_count = update_response.data[0].get("records_extracted", 0) or 0
-                    supabase.table("runs").update({"records_extracted": current_count + 1}).eq("id", run_id).execute()
-
-                # Publish record event
-                loop.run_until_complete(publish_event(run_id, "record", result_data_payload))
-
-                page.close()
-                return {
-                    "status": "success",
-                    "url": url,
-                    "data": result_data_payload
-                }
-
-            except Exception as url_error:
-                logger.error(f"Error scraping URL {url} during retry: {url_error}")
-                error_message = str(url_error)
-
-                # Store the failed result in the database, keeping the "failed" status
-                from app.services.result_service import create_result
-                from app.schemas.result import ResultCreate
-
-                failed_result_obj = ResultCreate(
-                    run_id=run_id,
-                    data={},  # Empty data for failed scrape
-                    url=url,
-                    status="failed",
-                    error_message=error_message
-                )
-
-                # Persist failed result (update the existing one)
-                loop.run_until_complete(create_result(failed_result_obj))
-
-                # Publish error event for this URL
-                loop.run_until_complete(publish_event(run_id, "url_error", {
-                    "url": url,
-                    "error": error_message
-                }))
-
-                # Retry logic - at this point, retrying failed URLs is itself a retry mechanism
-                return {
-                    "status": "failed",
-                    "url": url,
-                    "error": error_message
-                }
-            finally:
-                browser.close()
+        try:
+            result_data_payload = loop.run_until_complete(
+                fetch_over_http(url, selector_schema, get_fetch_mode(options))
+            )
+            if result_data_payload is None:
+                context = loop.run_until_complete(browser_pool.acquire())
+                blocker = get_resource_blocker(options)
+                if blocker:
+                    loop.run_until_complete(blocker.install(context))
+                result_data_payload = loop.run_until_complete(scrape_page(context, url, selector_schema, options))
+
+            from app.services.result_service import create_result
+            from app.schemas.result import ResultCreate
+
+            # Create a result with status "success"
+            result_obj = ResultCreate(
+                run_id=run_id,
+                data=result_data_payload,
+                url=url,
+                status="success",
+                error_message=None,
+                attempt=attempt
+            )
+
+            # create_result is async, so we run it in the loop. It also
+            # atomically increments the run's records_extracted count.
+            persisted_result = loop.run_until_complete(create_result(result_obj))
+
+            # Publish record event
+            loop.run_until_complete(publish_event(run_id, "record", result_data_payload))
+
+            return {
+                "status": "success",
+                "url": url,
+                "data": result_data_payload
+            }
+
+        except Exception as url_error:
+            logger.error(f"Error scraping URL {url} during retry: {url_error}")
+            error_message = str(url_error)
+
+            # Store the failed result in the database, keeping the "failed" status
+            from app.services.result_service import create_result
+            from app.schemas.result import ResultCreate
+
+            failed_result_obj = ResultCreate(
+                run_id=run_id,
+                data={},  # Empty data for failed scrape
+                url=url,
+                status="failed",
+                error_message=error_message,
+                attempt=attempt
+            )
+
+            # Persist the failed attempt
+            loop.run_until_complete(create_result(failed_result_obj))
+
+            # Publish error event for this URL
+            loop.run_until_complete(publish_event(run_id, "url_error", {
+                "url": url,
+                "error": error_message
+            }))
+
+            # Retry logic - at this point, retrying failed URLs is itself a retry mechanism
+            return {
+                "status": "failed",
+                "url": url,
+                "error": error_message
+            }
+        finally:
+            if context is not None:
+                loop.run_until_complete(browser_pool.release(context))
     except Exception as e:
         logger.error(f"Unexpected error processing URL {url} for run {run_id}: {e}")
         return {
@@ -663,5 +975,3 @@ def process_single_url(self, run_id, url, selector_schema):
             "url": url,
             "error": str(e)
         }
-    finally:
-        loop.close()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Benchmark single-pass schema extraction against the per-locator loop.
+
+Loads scripts/fixtures/extraction_benchmark.html in headless Chromium and
+extracts a 23-field selector schema repeatedly with both strategies.
+
+Usage:
+    cd backend
+    python scripts/benchmark_extraction.py [--iterations 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.extractor import extract_page, extract_fields_with_locators  # noqa: E402
+
+FIXTURE = Path(__file__).parent / "fixtures" / "extraction_benchmark.html"
+
+SELECTOR_SCHEMA = {
+    "title": {"selector": "h1.tender-title", "type": "text"},
+    "organisation": {"selector": ".tender-meta .organisation", "type": "text"},
+    "description": {"selector": ".description", "type": "html"},
+}
+for i in range(1, 21):
+    if i % 2:
+        SELECTOR_SCHEMA[f"field_{i}"] = {"selector": f".value-{i}", "type": "text"}
+    else:
+        SELECTOR_SCHEMA[f"link_{i}"] = {"selector": f"a.link-{i}", "type": "link", "attribute": "href"}
+
+
+async def benchmark(iterations: int) -> None:
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.goto(FIXTURE.resolve().as_uri())
+        url = page.url
+
+        async def per_locator():
+            fields = await extract_fields_with_locators(page, SELECTOR_SCHEMA, url)
+            return fields, await page.title()
+
+        async def single_pass():
+            return await extract_page(page, SELECTOR_SCHEMA, url)
+
+        baseline, _ = await per_locator()
+        compiled, _ = await single_pass()
+        assert baseline == compiled, "strategies disagree on the extracted fields"
+
+        timings = {}
+        for name, strategy in (("per-locator loop", per_locator), ("single page.evaluate", single_pass)):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await strategy()
+            timings[name] = (time.perf_counter() - start) / iterations * 1000
+
+        await browser.close()
+
+    print(f"{len(SELECTOR_SCHEMA)} fields, {iterations} iterations")
+    for name, ms in timings.items():
+        print(f"  {name:<22} {ms:8.2f} ms/page")
+    print(f"  speedup                {timings['per-locator loop'] / timings['single page.evaluate']:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.iterations))
@@ -0,0 +1,98 @@
+-- Schema of a plain Postgres database for the "postgres" repository backend
+-- (DB_BACKEND=postgres). Used by the `postgres` service of docker-compose and
+-- the repository integration tests; Supabase projects use the migrations.
+
+CREATE TABLE IF NOT EXISTS projects (
+    id BIGSERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    configuration JSONB,
+    user_id UUID NOT NULL,
+    retention_days INTEGER CHECK (retention_days > 0),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id BIGSERIAL PRIMARY KEY,
+    project_id BIGINT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    config JSONB,
+    url TEXT,
+    urls JSONB,
+    results JSONB,
+    error TEXT,
+    records_extracted INTEGER NOT NULL DEFAULT 0,
+    schedule_id BIGINT,
+    template_id BIGINT,
+    finished_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Partitioned by month of created_at, see the 20240101000010 migration
+CREATE TABLE IF NOT EXISTS results (
+    id BIGSERIAL,
+    run_id BIGINT NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    url TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'success',
+    data JSONB NOT NULL,
+    error_message TEXT,
+    attempt INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS results_default PARTITION OF results DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_runs_project_id_id ON runs(project_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_results_run_id_url_attempt ON results(run_id, url, attempt);
+CREATE INDEX IF NOT EXISTS idx_results_run_id_id ON results(run_id, id);
+CREATE INDEX IF NOT EXISTS idx_results_run_id_failed ON results(run_id, id) WHERE status = 'failed';
+
+CREATE OR REPLACE FUNCTION create_results_partition(p_day DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_start TIMESTAMPTZ := date_trunc('month', p_day::timestamp) AT TIME ZONE 'UTC';
+    v_end TIMESTAMPTZ := (date_trunc('month', p_day::timestamp) + interval '1 month') AT TIME ZONE 'UTC';
+    v_name TEXT := 'results_' || to_char(p_day, 'YYYY_MM');
+    v_misplaced BOOLEAN;
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+    SELECT EXISTS (SELECT 1 FROM results_default WHERE created_at >= v_start AND created_at < v_end)
+    INTO v_misplaced;
+
+    IF v_misplaced THEN
+        ALTER TABLE results DETACH PARTITION results_default;
+    END IF;
+    EXECUTE format('CREATE TABLE %I PARTITION OF results FOR VALUES FROM (%L) TO (%L)', v_name, v_start, v_end);
+    IF v_misplaced THEN
+        EXECUTE format(
+            'INSERT INTO %I SELECT * FROM results_default WHERE created_at >= %L AND created_at < %L',
+            v_name, v_start, v_end
+        );
+        DELETE FROM results_default WHERE created_at >= v_start AND created_at < v_end;
+        ALTER TABLE results ATTACH PARTITION results_default DEFAULT;
+    END IF;
+    RETURN v_name;
+END;
+$$;
+
+SELECT create_results_partition((now() + months * interval '1 month')::date)
+FROM generate_series(0, 2) AS months;
+
+CREATE OR REPLACE FUNCTION increment_run_records(p_run_id BIGINT, p_delta INTEGER)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    UPDATE runs
+    SET records_extracted = COALESCE(records_extracted, 0) + p_delta,
+        updated_at = now()
+    WHERE id = p_run_id
+    RETURNING records_extracted;
+$$;
@@ -12,8 +12,8 @@ CREATE TABLE IF NOT EXISTS runs (
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
--- Add index on project_id for faster lookups
-CREATE INDEX IF NOT EXISTS idx_runs_project_id ON runs(project_id);
+-- Add index on project_id for listing a project's runs newest first
+CREATE INDEX IF NOT EXISTS idx_runs_project_id_id ON runs(project_id, id DESC);
 
 -- Add index on status for filtering
 CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status);
@@ -0,0 +1,15 @@
+-- Make sure runs can count their extracted records
+ALTER TABLE public.runs ADD COLUMN IF NOT EXISTS records_extracted INTEGER NOT NULL DEFAULT 0;
+
+-- Atomically add a (batched) delta to runs.records_extracted.
+-- The UPDATE takes a row lock, so concurrent workers never lose increments.
+CREATE OR REPLACE FUNCTION public.increment_run_records(p_run_id BIGINT, p_delta INTEGER)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    UPDATE public.runs
+    SET records_extracted = COALESCE(records_extracted, 0) + p_delta,
+        updated_at = now()
+    WHERE id = p_run_id
+    RETURNING records_extracted;
+$$;
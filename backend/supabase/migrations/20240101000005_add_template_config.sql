@@ -0,0 +1,3 @@
+-- Default run options of a template, such as fetch_mode. Options of the run
+-- itself take precedence over these.
+ALTER TABLE public.templates ADD COLUMN IF NOT EXISTS config JSONB;
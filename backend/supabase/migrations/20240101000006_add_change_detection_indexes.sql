@@ -0,0 +1,4 @@
+-- Change detection looks up the previous completed run of a schedule and the
+-- fingerprints that run stored per URL.
+CREATE INDEX IF NOT EXISTS idx_runs_schedule_id ON public.runs(schedule_id, id DESC) WHERE status = 'completed';
+CREATE INDEX IF NOT EXISTS idx_results_run_id_url ON public.results(run_id, url);
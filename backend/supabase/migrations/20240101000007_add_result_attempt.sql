@@ -0,0 +1,15 @@
+-- Results are keyed by (run_id, url, attempt): workers insert them with
+-- ON CONFLICT DO NOTHING, so a redelivered or retried task cannot store a
+-- page twice, while retries of failed URLs store a new attempt.
+ALTER TABLE public.results ADD COLUMN IF NOT EXISTS attempt INTEGER NOT NULL DEFAULT 0;
+
+-- Number the duplicates stored before the key existed instead of dropping them
+UPDATE public.results AS r
+SET attempt = d.attempt
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY run_id, url ORDER BY id) - 1 AS attempt
+    FROM public.results
+) AS d
+WHERE r.id = d.id AND d.attempt > 0;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_results_run_id_url_attempt ON public.results(run_id, url, attempt);
@@ -0,0 +1,13 @@
+-- Indexes matching how results are read:
+--   listing a run's results page by page: run_id = ? AND id > ? ORDER BY id
+--   failed results of a run for retries:  run_id = ? AND status = 'failed'
+--   per-URL lookups of a run (retries, change detection): run_id = ? AND url IN (...),
+--     served by the (run_id, url, attempt) key
+CREATE INDEX IF NOT EXISTS idx_results_run_id_id ON public.results(run_id, id);
+CREATE INDEX IF NOT EXISTS idx_results_run_id_failed ON public.results(run_id, id) WHERE status = 'failed';
+
+-- Superseded by the indexes above and the result key
+DROP INDEX IF EXISTS public.idx_results_run_id_url;
+DROP INDEX IF EXISTS public.idx_results_run_id;
+DROP INDEX IF EXISTS public.idx_results_status;
+DROP INDEX IF EXISTS public.idx_results_url;
@@ -0,0 +1,6 @@
+-- Runs of a project are listed newest first, paging on the ID:
+--   project_id = ? AND id < ? ORDER BY id DESC
+CREATE INDEX IF NOT EXISTS idx_runs_project_id_id ON public.runs(project_id, id DESC);
+
+-- Superseded by the index above
+DROP INDEX IF EXISTS public.idx_runs_project_id;
@@ -0,0 +1,141 @@
+-- Range-partition results by month of created_at, so old months can be
+-- detached, archived and dropped by the `archive_results` maintenance task
+-- instead of deleted row by row, and the current partition stays small.
+
+-- Retention of a project's results in days, RESULT_RETENTION_DAYS if NULL
+ALTER TABLE public.projects ADD COLUMN IF NOT EXISTS retention_days INTEGER CHECK (retention_days > 0);
+
+ALTER TABLE public.results RENAME TO results_unpartitioned;
+ALTER TABLE public.results_unpartitioned RENAME CONSTRAINT results_pkey TO results_unpartitioned_pkey;
+DROP INDEX IF EXISTS public.idx_results_run_id_url_attempt;
+DROP INDEX IF EXISTS public.idx_results_run_id_id;
+DROP INDEX IF EXISTS public.idx_results_run_id_failed;
+UPDATE public.results_unpartitioned SET created_at = COALESCE(updated_at, now()) WHERE created_at IS NULL;
+
+CREATE TABLE public.results (LIKE public.results_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+PARTITION BY RANGE (created_at);
+ALTER TABLE public.results ALTER COLUMN created_at SET NOT NULL;
+
+-- Keys of a partitioned table include the partition key; the ID stays unique
+-- through its sequence, which moves to the new table
+ALTER TABLE public.results ADD PRIMARY KEY (id, created_at);
+ALTER SEQUENCE public.results_id_seq OWNED BY public.results.id;
+ALTER TABLE public.results
+    ADD CONSTRAINT results_run_id_fkey FOREIGN KEY (run_id) REFERENCES public.runs(id) ON DELETE CASCADE;
+
+-- Postgres cannot enforce (run_id, url, attempt) across partitions, so
+-- insert_results() below serializes the inserts of a run and skips stored keys
+CREATE INDEX idx_results_run_id_url_attempt ON public.results(run_id, url, attempt);
+CREATE INDEX idx_results_run_id_id ON public.results(run_id, id);
+CREATE INDEX idx_results_run_id_failed ON public.results(run_id, id) WHERE status = 'failed';
+
+-- Create the monthly partition holding the given day, named results_YYYY_MM.
+-- Rows of that month caught by the default partition are moved into it.
+CREATE OR REPLACE FUNCTION public.create_results_partition(p_day DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_start TIMESTAMPTZ := date_trunc('month', p_day::timestamp) AT TIME ZONE 'UTC';
+    v_end TIMESTAMPTZ := (date_trunc('month', p_day::timestamp) + interval '1 month') AT TIME ZONE 'UTC';
+    v_name TEXT := 'results_' || to_char(p_day, 'YYYY_MM');
+    v_misplaced BOOLEAN := false;
+BEGIN
+    IF to_regclass('public.' || v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+    IF to_regclass('public.results_default') IS NOT NULL THEN
+        SELECT EXISTS (SELECT 1 FROM public.results_default WHERE created_at >= v_start AND created_at < v_end)
+        INTO v_misplaced;
+    END IF;
+
+    IF v_misplaced THEN
+        ALTER TABLE public.results DETACH PARTITION public.results_default;
+    END IF;
+    EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.results FOR VALUES FROM (%L) TO (%L)',
+        v_name, v_start, v_end
+    );
+    IF v_misplaced THEN
+        EXECUTE format(
+            'INSERT INTO public.%I SELECT * FROM public.results_default WHERE created_at >= %L AND created_at < %L',
+            v_name, v_start, v_end
+        );
+        DELETE FROM public.results_default WHERE created_at >= v_start AND created_at < v_end;
+        ALTER TABLE public.results ATTACH PARTITION public.results_default DEFAULT;
+    END IF;
+    RETURN v_name;
+END;
+$$;
+
+DO $$
+DECLARE
+    v_month DATE;
+BEGIN
+    FOR v_month IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE((SELECT min(created_at) FROM public.results_unpartitioned), now()) AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '2 months',
+            interval '1 month'
+        )::date
+    LOOP
+        PERFORM public.create_results_partition(v_month);
+    END LOOP;
+END;
+$$;
+
+-- Catches rows outside the created months until the maintenance task has
+-- created their partition; it is expected to stay empty
+CREATE TABLE IF NOT EXISTS public.results_default PARTITION OF public.results DEFAULT;
+
+INSERT INTO public.results SELECT * FROM public.results_unpartitioned;
+DROP TABLE public.results_unpartitioned;
+
+-- Policies and grants of scripts/init_results_table.sql
+ALTER TABLE public.results ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY select_results ON public.results
+    FOR SELECT USING (true);
+
+CREATE POLICY insert_results ON public.results
+    FOR INSERT WITH CHECK (
+        auth.uid() = (current_setting('request.jwt.claims', true)::jsonb->>'sub')::uuid
+    );
+
+CREATE POLICY delete_results ON public.results
+    FOR DELETE USING (
+        auth.uid() = (current_setting('request.jwt.claims', true)::jsonb->>'sub')::uuid
+    );
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON public.results TO authenticated;
+GRANT SELECT ON public.results TO anon;
+
+-- Insert results, skipping those whose (run_id, url, attempt) is stored
+-- already, and return the new rows. Called by the PostgREST repository.
+CREATE OR REPLACE FUNCTION public.insert_results(p_rows JSONB)
+RETURNS SETOF public.results
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Concurrent inserts of a run wait for each other, so the check below
+    -- sees the rows of the previous one
+    PERFORM pg_advisory_xact_lock(run_id)
+    FROM (SELECT DISTINCT run_id FROM jsonb_populate_recordset(NULL::public.results, p_rows) ORDER BY run_id) AS runs;
+
+    RETURN QUERY
+    WITH inserted AS (
+        INSERT INTO public.results (run_id, url, status, data, error_message, attempt, created_at, updated_at)
+        SELECT DISTINCT ON (s.run_id, s.url, COALESCE(s.attempt, 0))
+            s.run_id, s.url, COALESCE(s.status, 'success'), COALESCE(s.data, '{}'::jsonb), s.error_message,
+            COALESCE(s.attempt, 0), COALESCE(s.created_at, now()), COALESCE(s.updated_at, now())
+        FROM jsonb_populate_recordset(NULL::public.results, p_rows) AS s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM public.results AS r
+            WHERE r.run_id = s.run_id AND r.url = s.url AND r.attempt = COALESCE(s.attempt, 0)
+        )
+        ORDER BY s.run_id, s.url, COALESCE(s.attempt, 0)
+        RETURNING *
+    )
+    SELECT * FROM inserted;
+END;
+$$;
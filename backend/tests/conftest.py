@@ -11,7 +11,7 @@ sys.path.insert(0, app_path)
 
 # Import mocks
 try:
-    from tests.mocks import MockRedis, MockSupabase
+    from tests.mocks import MockRedis, MockSupabase, MockAsyncSupabase
 except ImportError:
     # If mocks.py doesn't exist yet, create simple mock classes
     from unittest.mock import MagicMock
@@ -37,6 +37,8 @@ except ImportError:
             mock_response.execute.return_value.error = None
             return mock_response
 
+    MockAsyncSupabase = None
+
 # Mock dependencies that might not be available in CI environment
 MOCK_MODULES = ['croniter', 'playwright', 'redis', 'celery', 'ormar']
 for module_name in MOCK_MODULES:
@@ -112,6 +114,8 @@ if "SENTRY_DSN" not in os.environ:
 
 # Mock Supabase client
 sys.modules['app.core.supabase'] = type('module', (), {'supabase': MockSupabase()})
+# Async database client of the API services (app.core.database)
+mock_database = MockAsyncSupabase() if MockAsyncSupabase else MagicMock()
 
 # Mock Redis client
 if 'redis' in sys.modules:
@@ -146,6 +150,24 @@ def setup_test_environment():
     # Clean up after tests (if needed)
     print("Test environment cleanup completed")
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Keep cached projects and runs from leaking between tests."""
+    from app.services import project_service, run_service
+
+    project_service._project_cache.clear()
+    run_service._run_project_cache.clear()
+    yield
+
+@pytest.fixture(autouse=True)
+def mock_database_client():
+    """Serve the services' database client from the in-memory mock."""
+    from app.core import database
+
+    database._db = mock_database
+    yield
+    database._db = None
+
 @pytest.fixture
 def client():
     """Test client for FastAPI application."""
@@ -1,7 +1,7 @@
 """
 Mock objects for testing.
 """
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 # Mock Redis client
 class MockRedis:
@@ -132,3 +132,39 @@ class MockRPC:
         response.data = {}
         response.error = None
         return response
+
+# Mock async PostgREST client of app.core.database
+class MockAsyncTable(MockTable):
+    async def execute(self):
+        return MockTable.execute(self)
+
+class MockAsyncRPC(MockRPC):
+    async def execute(self):
+        return MockRPC.execute(self)
+
+class MockAsyncSupabase(MockSupabase):
+    def table(self, name):
+        return MockAsyncTable(self.tables.get(name, []))
+
+    def rpc(self, *args, **kwargs):
+        return MockAsyncRPC()
+
+    async def aclose(self):
+        pass
+
+# Query builder methods of the PostgREST client returning the query itself
+QUERY_METHODS = ("select", "insert", "update", "delete", "eq", "neq", "gt", "lt", "in_", "order", "limit", "range")
+
+def async_database_returning(rows):
+    """
+    Async PostgREST client whose queries all return `rows`.
+
+    Every table shares one query mock, so tests can assert the builder calls
+    and count the executions on `database.table.return_value`.
+    """
+    database = MagicMock()
+    query = database.table.return_value
+    for method in QUERY_METHODS:
+        getattr(query, method).return_value = query
+    query.execute = AsyncMock(return_value=MagicMock(data=rows, error=None))
+    return database
@@ -0,0 +1,79 @@
+"""
+Load test of the async PostgREST client: concurrent API requests waiting on
+slow queries overlap instead of queueing behind each other.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+import httpx
+from app.core import database
+from app.core.auth import get_current_user
+from app.main import app
+from app.services import project_service
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+QUERY_SECONDS = 0.1
+REQUESTS = 20
+
+
+class SlowPostgrest:
+    """PostgREST answering every query after QUERY_SECONDS, counting queries in flight."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.paths = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(QUERY_SECONDS)
+        self.in_flight -= 1
+        return httpx.Response(200, json=[{
+            "id": 1,
+            "name": "Tenders",
+            "description": None,
+            "user_id": USER_ID,
+            "created_at": "2024-01-01T00:00:00",
+            "updated_at": "2024-01-01T00:00:00",
+        }])
+
+
+def test_concurrent_requests_overlap_their_queries():
+    postgrest = SlowPostgrest()
+    db = database.create_db_client(transport=httpx.MockTransport(postgrest))
+
+    async def load():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(client.get("/api/v1/projects/") for _ in range(REQUESTS)))
+            elapsed = time.perf_counter() - started
+        await db.aclose()
+        return responses, elapsed
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=USER_ID)
+    try:
+        with patch.object(project_service, "get_db", return_value=db):
+            responses, elapsed = asyncio.run(load())
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+    assert [response.status_code for response in responses] == [200] * REQUESTS
+    assert postgrest.paths == ["/rest/v1/projects"] * REQUESTS
+    # Blocking calls would run the queries one at a time, taking REQUESTS * QUERY_SECONDS
+    assert postgrest.peak == REQUESTS
+    assert elapsed < REQUESTS * QUERY_SECONDS / 4
+
+
+def test_client_targets_the_rest_endpoint_with_the_api_key():
+    with patch.object(database.settings, "SUPABASE_URL", "https://project.supabase.co/"), \
+         patch.object(database.settings, "SUPABASE_KEY", "anon-key"):
+        db = database.create_db_client()
+
+    assert str(db.session.base_url) == "https://project.supabase.co/rest/v1/"
+    assert db.session.headers["apikey"] == "anon-key"
+    assert db.session.headers["Authorization"] == "Bearer anon-key"
+    asyncio.run(db.aclose())
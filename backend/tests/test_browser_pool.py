@@ -0,0 +1,126 @@
+"""
+Tests for the worker browser pool.
+"""
+import asyncio
+from app.services.browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self):
+        self.handlers = {}
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def new_page(self):
+        self.handlers["page"](object())
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        return FakeContext()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeChromium:
+    def __init__(self):
+        self.launched = []
+
+    async def launch(self, **kwargs):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+
+    async def stop(self):
+        pass
+
+
+def make_pool(**kwargs):
+    pool = BrowserPool(max_rss_mb=0, **kwargs)
+    pool._playwright = FakePlaywright()
+    return pool
+
+
+def test_contexts_share_a_single_launch():
+    """Leasing several contexts does not launch new browsers"""
+    async def scenario():
+        pool = make_pool(size=1)
+        pool._browsers.append(await pool._launch())
+        for _ in range(3):
+            async with pool.lease() as context:
+                await context.new_page()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert len(pool._playwright.chromium.launched) == 1
+    assert pool._browsers[0].pages_served == 3
+
+
+def test_browser_recycled_after_max_pages():
+    """A browser that served max_pages is replaced and closed"""
+    async def scenario():
+        pool = make_pool(size=1, max_pages=2)
+        pool._browsers.append(await pool._launch())
+        for _ in range(3):
+            async with pool.lease() as context:
+                await context.new_page()
+                await context.new_page()
+        return pool
+
+    pool = asyncio.run(scenario())
+    launched = pool._playwright.chromium.launched
+    assert len(launched) == 3
+    assert launched[0].closed and launched[1].closed
+    assert not launched[2].closed
+
+
+def test_disconnected_browser_is_relaunched():
+    """Health check replaces a crashed browser on the next lease"""
+    async def scenario():
+        pool = make_pool(size=1)
+        pool._browsers.append(await pool._launch())
+        pool._browsers[0].browser.connected = False
+        context = await pool.acquire()
+        await pool.release(context)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert len(pool._playwright.chromium.launched) == 2
+    assert pool._browsers[0].browser is pool._playwright.chromium.launched[1]
+
+
+def test_retired_browser_closed_after_last_lease():
+    """A browser recycled while leased is only closed once released"""
+    async def scenario():
+        pool = make_pool(size=1, max_pages=1)
+        pool._browsers.append(await pool._launch())
+        first = await pool.acquire()
+        await first.new_page()
+        second = await pool.acquire()
+        old_browser = pool._playwright.chromium.launched[0]
+        still_open = not old_browser.closed
+        await pool.release(first)
+        await pool.release(second)
+        return still_open, old_browser
+
+    still_open, old_browser = asyncio.run(scenario())
+    assert still_open
+    assert old_browser.closed
@@ -0,0 +1,66 @@
+"""
+Tests for change detection between runs of a schedule.
+"""
+import asyncio
+from unittest.mock import patch
+from app.services import change_detection
+from app.services.change_detection import ChangeDetector, fingerprint, get_change_detection
+from tests.mocks import async_database_returning
+
+
+def payload(**fields):
+    return {"url": "https://example.com", "title": "Tender", "extracted_at": "2024-01-01T00:00:00", "fields": fields}
+
+
+def test_fingerprint_ignores_whitespace_and_extraction_time():
+    first = payload(title="  Road  works\n", lots=["A", " B"])
+    second = {**payload(title="Road works", lots=["A", "B"]), "extracted_at": "2024-02-01T00:00:00"}
+
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) != fingerprint(payload(title="Road works", lots=["A"]))
+
+
+def test_dom_hash_only_counts_in_dom_mode():
+    first = {**payload(title="Tender"), "dom_hash": "a"}
+    second = {**payload(title="Tender"), "dom_hash": "b"}
+
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first, include_dom=True) != fingerprint(second, include_dom=True)
+
+
+def test_change_detection_mode_from_options():
+    assert get_change_detection({"change_detection": False}) == "off"
+    assert get_change_detection({"change_detection": "dom"}) == "dom"
+    assert get_change_detection({"change_detection": "bogus"}) == change_detection.settings.CHANGE_DETECTION
+
+
+def test_previous_run_is_the_last_completed_run_of_the_schedule():
+    database = async_database_returning([{"id": 8}])
+
+    with patch.object(change_detection, "get_db", return_value=database):
+        assert asyncio.run(change_detection.find_previous_run(3, 10)) == 8
+        assert asyncio.run(change_detection.find_previous_run(None, 10)) is None
+
+    table = database.table.return_value
+    table.lt.assert_called_once_with("id", 10)
+    table.order.assert_called_once_with("id", desc=True)
+    table.execute.assert_awaited_once()
+
+
+def test_classify_against_previous_run():
+    unchanged = payload(title="Same")
+    rows = [
+        {"id": 11, "url": "https://example.com/same", "fingerprint": fingerprint(unchanged), "unchanged_from": "3"},
+        {"id": 12, "url": "https://example.com/changed", "fingerprint": fingerprint(payload(title="Old")), "unchanged_from": None},
+    ]
+    detector = ChangeDetector(previous_run_id=5)
+
+    with patch.object(change_detection, "get_db", return_value=async_database_returning(rows)):
+        asyncio.run(detector.load(["https://example.com/same", "https://example.com/changed", "https://example.com/new"]))
+
+    # Unchanged pages point at the result holding the data, not at the previous reference
+    assert detector.classify("https://example.com/same", unchanged) == ("unchanged", 3)
+    assert detector.classify("https://example.com/changed", payload(title="New")) == ("changed", None)
+    assert detector.classify("https://example.com/new", payload(title="New")) == ("new", None)
+    assert detector.counts == {"new": 1, "changed": 1, "unchanged": 1, "not_modified": 0}
+    assert "fingerprint" in unchanged
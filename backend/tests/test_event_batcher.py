@@ -0,0 +1,80 @@
+"""
+Tests for batched and coalesced run events.
+"""
+import asyncio
+from unittest.mock import patch
+from app.services import run_events
+from app.services.event_batcher import EventBatcher
+
+
+class Published:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, run_id, events):
+        self.batches.append(list(events))
+        return [f"{i}-0" for i in range(len(events))]
+
+
+def test_records_are_batched_and_statuses_coalesced():
+    """Many updates become a few pipelined batches with one status each"""
+    published = Published()
+    counter = {"records": 0}
+
+    async def status():
+        return {"records_extracted": counter["records"], "status": "running"}
+
+    async def run():
+        batcher = EventBatcher(1, status, batch_size=10, flush_interval=60, status_interval=60)
+        for i in range(25):
+            counter["records"] += 1
+            batcher.add("record", {"n": i})
+            batcher.status_changed()
+            await asyncio.sleep(0)
+        await batcher.close()
+
+    with patch.object(run_events, "append_events", published):
+        asyncio.run(run())
+
+    events = [event for batch in published.batches for event in batch]
+    assert [data["n"] for event_type, data in events if event_type == "record"] == list(range(25))
+    statuses = [data for event_type, data in events if event_type == "status"]
+    # The first status goes out right away, later ones wait for the interval
+    # and the latest is always published on close
+    assert len(statuses) == 2
+    assert statuses[-1] == {"records_extracted": 25, "status": "running"}
+    assert events[-1][0] == "status"
+    assert len(published.batches) <= 4
+
+
+def test_flush_interval_publishes_in_background():
+    """A partial batch is published without waiting for close"""
+    published = Published()
+
+    async def run():
+        batcher = EventBatcher(1, batch_size=100, flush_interval=0.01)
+        batcher.add("url_error", {"url": "https://example.com"})
+        await asyncio.sleep(0.05)
+        flushed_before_close = len(published.batches)
+        await batcher.close()
+        return flushed_before_close
+
+    with patch.object(run_events, "append_events", published):
+        flushed_before_close = asyncio.run(run())
+
+    assert flushed_before_close == 1
+    assert published.batches == [[("url_error", {"url": "https://example.com"})]]
+
+
+def test_publish_errors_do_not_break_the_run():
+    async def failing(run_id, events):
+        raise ConnectionError("redis down")
+
+    async def run():
+        batcher = EventBatcher(1, batch_size=1)
+        batcher.add("record", {})
+        await asyncio.sleep(0)
+        await batcher.close()
+
+    with patch.object(run_events, "append_events", failing):
+        asyncio.run(run())
@@ -0,0 +1,99 @@
+"""
+Tests for the shared run event fan-out of the SSE endpoint.
+"""
+import asyncio
+from unittest.mock import patch
+from app.core import redis as redis_module
+from app.core.redis import RunEventBroker
+
+
+class FakePubSub:
+    """One pub/sub connection; published messages are read by listen()"""
+
+    def __init__(self):
+        self.channels = set()
+        self.subscribe_calls = 0
+        self.messages = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        self.subscribe_calls += 1
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+    async def close(self):
+        pass
+
+    def publish(self, channel, data):
+        if channel in self.channels:
+            self.messages.put_nowait({"type": "message", "channel": channel.encode(), "data": data})
+
+
+class FakeRedis:
+    def __init__(self):
+        self.connections = []
+
+    def pubsub(self, **kwargs):
+        pubsub = FakePubSub()
+        self.connections.append(pubsub)
+        return pubsub
+
+
+def test_broker_fans_out_over_one_connection():
+    """Many clients of several runs share one subscription per run"""
+    fake_redis = FakeRedis()
+
+    async def run():
+        broker = RunEventBroker()
+        clients = [await broker.subscribe(1) for _ in range(50)] + [await broker.subscribe(2)]
+        pubsub = fake_redis.connections[0]
+
+        pubsub.publish("run:1", b'{"type": "status"}')
+        pubsub.publish("run:2", b'{"type": "record"}')
+        received = await asyncio.wait_for(asyncio.gather(*(client.get() for client in clients)), 1)
+
+        for client in clients[:50]:
+            await broker.unsubscribe(1, client)
+        remaining_channels = set(pubsub.channels)
+        await broker.close()
+        return pubsub, received, remaining_channels
+
+    with patch.object(redis_module, "get_redis", return_value=fake_redis):
+        pubsub, received, remaining_channels = asyncio.run(run())
+
+    assert len(fake_redis.connections) == 1
+    # The initial connect plus one SUBSCRIBE per run channel
+    assert pubsub.subscribe_calls == 3
+    assert received == [b'{"type": "status"}'] * 50 + [b'{"type": "record"}']
+    assert remaining_channels == {RunEventBroker.IDLE_CHANNEL, "run:2"}
+
+
+def test_slow_client_does_not_block_others():
+    """A client with a full queue misses events, others still get them"""
+    fake_redis = FakeRedis()
+
+    async def run():
+        broker = RunEventBroker(queue_size=1)
+        slow = await broker.subscribe(1)
+        fast = await broker.subscribe(1)
+        pubsub = fake_redis.connections[0]
+
+        pubsub.publish("run:1", b"first")
+        assert await asyncio.wait_for(fast.get(), 1) == b"first"
+        pubsub.publish("run:1", b"second")
+        second = await asyncio.wait_for(fast.get(), 1)
+
+        await broker.close()
+        return second, slow.qsize(), slow.get_nowait()
+
+    with patch.object(redis_module, "get_redis", return_value=fake_redis):
+        second, slow_size, slow_first = asyncio.run(run())
+
+    assert second == b"second"
+    assert slow_size == 1
+    assert slow_first == b"first"
@@ -0,0 +1,49 @@
+"""
+Tests for browserless extraction of server-rendered pages.
+"""
+from app.services.http_fetcher import extract_from_html, missing_required_fields
+
+HTML = """
+<html>
+  <head><title> Tender 42 </title></head>
+  <body>
+    <h1 class="title">Supply of
+        water pumps</h1>
+    <div class="description"><p>Two <b>pumps</b></p></div>
+    <a class="more" href="/tenders/42">Details</a>
+  </body>
+</html>
+"""
+
+
+def test_extract_from_html():
+    """Text, html and link fields are extracted like in the browser"""
+    schema = {
+        "title": {"selector": "h1.title", "type": "text"},
+        "description": {"selector": ".description", "type": "html"},
+        "link": {"selector": "a.more", "type": "link", "attribute": "href"},
+        "missing": {"selector": ".nope"},
+    }
+
+    fields, title = extract_from_html(HTML, schema, "https://example.com/42")
+
+    assert title == "Tender 42"
+    assert fields == {
+        "title": "Supply of water pumps",
+        "description": "<p>Two <b>pumps</b></p>",
+        "link": "/tenders/42",
+        "missing": None,
+    }
+
+
+def test_missing_required_fields():
+    """Fields are required unless they opt out"""
+    schema = {
+        "title": {"selector": "h1"},
+        "price": {"selector": ".price", "required": False},
+        "deadline": {"selector": ".deadline"},
+    }
+
+    missing = missing_required_fields({"title": "Pumps", "price": None, "deadline": ""}, schema)
+
+    assert missing == ["deadline"]
@@ -0,0 +1,76 @@
+"""
+Tests for local verification of Supabase access tokens.
+"""
+import time
+import jwt
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.core import auth
+from app.main import app
+
+client = TestClient(app)
+
+SECRET = "test-jwt-secret-with-at-least-32-bytes!"
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def make_token(**overrides):
+    claims = {
+        "sub": USER_ID,
+        "email": "test@example.com",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, SECRET, algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def jwt_secret():
+    auth.clear_auth_cache()
+    with patch.object(auth.settings, "SUPABASE_JWT_SECRET", SECRET):
+        yield
+    auth.clear_auth_cache()
+
+
+@patch("app.services.project_service.get_projects")
+@patch("app.core.auth.get_supabase_client")
+def test_signed_token_is_verified_without_gotrue(mock_get_supabase_client, mock_get_projects):
+    """A valid Supabase JWT never reaches GoTrue, and is cached"""
+    mock_get_projects.return_value = []
+    headers = {"Authorization": f"Bearer {make_token()}"}
+
+    with patch.object(auth.jwt, "decode", wraps=jwt.decode) as decode:
+        assert client.get("/api/v1/projects/", headers=headers).status_code == 200
+        assert client.get("/api/v1/projects/", headers=headers).status_code == 200
+
+    mock_get_supabase_client.assert_not_called()
+    assert decode.call_count == 1
+    mock_get_projects.assert_called_with(USER_ID)
+
+
+@pytest.mark.parametrize("token", [
+    make_token(exp=int(time.time()) - 3600),
+    make_token(aud="anon"),
+    jwt.encode({"sub": USER_ID, "aud": "authenticated", "exp": int(time.time()) + 60}, "another-secret-of-sufficient-length", algorithm="HS256"),
+])
+@patch("app.core.auth.get_supabase_client")
+def test_invalid_signed_tokens_are_rejected(mock_get_supabase_client, token):
+    """Expired, foreign-audience and badly signed tokens get a 401"""
+    response = client.get("/api/v1/projects/", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 401
+    mock_get_supabase_client.assert_not_called()
+
+
+@patch("app.core.auth.get_supabase_client")
+def test_revocation_sensitive_routes_check_gotrue(mock_get_supabase_client):
+    """Deleting a project always validates the session with GoTrue"""
+    mock_get_supabase_client.return_value.auth.get_user.side_effect = Exception("Session revoked")
+
+    response = client.delete("/api/v1/projects/1", headers={"Authorization": f"Bearer {make_token()}"})
+
+    assert response.status_code == 401
+    mock_get_supabase_client.return_value.auth.get_user.assert_called_once()
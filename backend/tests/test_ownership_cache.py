@@ -0,0 +1,60 @@
+"""
+Tests for the authorization caches of projects and runs.
+"""
+import asyncio
+from unittest.mock import MagicMock, patch
+from app.repositories import postgrest as postgrest_repository
+from app.services import project_service, run_service
+from tests.mocks import async_database_returning
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+PROJECT_ROW = {
+    "id": 1,
+    "name": "Tenders",
+    "description": "Public tenders",
+    "user_id": USER_ID,
+    "created_at": "2024-01-01T00:00:00",
+    "updated_at": "2024-01-01T00:00:00",
+}
+
+
+def test_get_project_is_cached_per_user():
+    """Repeated authorization of the same user and project is one query"""
+    database = async_database_returning([PROJECT_ROW])
+
+    with patch.object(project_service, "get_db", return_value=database), \
+         patch.object(postgrest_repository, "get_db", return_value=database):
+        for _ in range(3):
+            asyncio.run(project_service.get_project(1, USER_ID))
+        asyncio.run(project_service.get_project(1, "someone-else"))
+
+    # One query for the owner, one for the other user
+    assert database.table.return_value.execute.call_count == 2
+
+
+def test_project_update_and_delete_invalidate():
+    database = async_database_returning([PROJECT_ROW])
+
+    with patch.object(project_service, "get_db", return_value=database), \
+         patch.object(postgrest_repository, "get_db", return_value=database):
+        asyncio.run(project_service.get_project(1, USER_ID))
+        asyncio.run(project_service.delete_project(1, USER_ID))
+        database.table.return_value.execute.return_value = MagicMock(data=[], error=None)
+
+        try:
+            asyncio.run(project_service.get_project(1, USER_ID))
+            raise AssertionError("deleted project is still authorized")
+        except project_service.HTTPException as e:
+            assert e.status_code == 404
+
+
+def test_run_project_id_is_cached():
+    """A run's project is looked up once, also when get_run already saw it"""
+    database = async_database_returning([{"project_id": 7}])
+
+    with patch.object(run_service, "get_db", return_value=database):
+        assert asyncio.run(run_service.get_run_project_id(3)) == 7
+        assert asyncio.run(run_service.get_run_project_id(3)) == 7
+
+    assert database.table.return_value.execute.call_count == 1
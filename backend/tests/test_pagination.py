@@ -0,0 +1,98 @@
+"""
+Tests for the keyset pagination of results and runs.
+"""
+import asyncio
+from unittest.mock import MagicMock, patch
+from app.services import result_service, run_service
+from tests.mocks import async_database_returning
+
+
+def result_row(id, run_id=1):
+    return {
+        "id": id,
+        "run_id": run_id,
+        "url": f"https://example.com/{id}",
+        "data": {"title": f"Page {id}"},
+        "status": "success",
+        "error_message": None,
+        "created_at": "2024-01-01T00:00:00",
+        "updated_at": "2024-01-01T00:00:00",
+    }
+
+
+def run_row(id, project_id=1):
+    return {
+        "id": id,
+        "project_id": project_id,
+        "status": "completed",
+        "config": {},
+        "url": f"https://example.com/{id}",
+        "urls": None,
+        "error": None,
+        "created_at": "2024-01-01T00:00:00",
+        "updated_at": "2024-01-01T00:00:00",
+    }
+
+
+def test_results_pages_follow_the_cursor():
+    rows = [result_row(id) for id in (5, 1, 4, 2, 3)] + [result_row(6, run_id=2)]
+
+    with patch.object(result_service, "in_memory_results", rows):
+        first = asyncio.run(result_service.get_results_page(run_id=1, limit=2))
+        second = asyncio.run(result_service.get_results_page(run_id=1, cursor=first.next_cursor, limit=2))
+        last = asyncio.run(result_service.get_results_page(run_id=1, cursor=second.next_cursor, limit=2))
+
+    assert [r.id for r in first.results] == [1, 2]
+    assert [r.id for r in second.results] == [3, 4]
+    assert [r.id for r in last.results] == [5]
+    assert last.next_cursor is None
+
+
+def test_results_page_leaves_out_data_unless_requested():
+    with patch.object(result_service, "in_memory_results", [result_row(1)]):
+        page = asyncio.run(result_service.get_results_page(run_id=1))
+        with_data = asyncio.run(result_service.get_results_page(run_id=1, include_data=True))
+
+    assert page.results[0].data is None
+    assert with_data.results[0].data == {"title": "Page 1"}
+
+
+def test_page_size_is_capped():
+    with patch.object(result_service, "in_memory_results", []), \
+         patch.object(result_service.settings, "MAX_PAGE_SIZE", 10):
+        page = asyncio.run(result_service.get_results_page(limit=50))
+
+    assert page.page_size == 10
+
+
+def test_runs_page_is_newest_first_after_the_cursor():
+    # The extra row tells that there is another page
+    database = async_database_returning([run_row(9), run_row(8), run_row(7)])
+
+    with patch.object(run_service, "get_db", return_value=database):
+        page = asyncio.run(run_service.get_runs_page(project_id=1, cursor=10, limit=2))
+
+    table = database.table.return_value
+    table.select.assert_called_once_with(run_service.RUN_LIST_COLUMNS)
+    table.lt.assert_called_once_with("id", 10)
+    table.order.assert_called_once_with("id", desc=True)
+    table.limit.assert_called_once_with(3)
+    assert [run.id for run in page.runs] == [9, 8]
+    assert page.next_cursor == 8
+
+
+def test_results_page_resolves_unchanged_results_in_one_lookup():
+    unchanged = result_row(2)
+    unchanged.update(status="unchanged", data={"fingerprint": "abc", "unchanged_from": 1})
+    page_query = async_database_returning([unchanged, result_row(3)]).table.return_value
+    source_query = async_database_returning([{"id": 1, "data": {"title": "Page 1"}}]).table.return_value
+    database = MagicMock()
+    database.table.side_effect = [page_query, source_query]
+
+    with patch.object(result_service, "use_in_memory_db", False), \
+         patch.object(result_service, "get_db", return_value=database):
+        page = asyncio.run(result_service.get_results_page(run_id=1, include_data=True))
+
+    source_query.in_.assert_called_once_with("id", [1])
+    assert page.results[0].data == {"title": "Page 1", "fingerprint": "abc", "unchanged_from": 1}
+    assert page.results[1].data == {"title": "Page 3"}
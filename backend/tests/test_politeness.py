@@ -0,0 +1,107 @@
+"""
+Tests for the per-domain politeness scheduling of page loads.
+"""
+import asyncio
+from unittest.mock import patch
+from app.services import politeness, scraper
+from app.services.politeness import DomainQueue, ThrottledError, domain_of, get_politeness_scheduler
+
+
+class FakeScheduler:
+    """Grants leases except for domains listed as throttled."""
+
+    def __init__(self, throttled=()):
+        self.throttled_domains = set(throttled)
+        self.released = []
+
+    async def acquire(self, domain):
+        if domain in self.throttled_domains:
+            return None, 60.0
+        return f"lease-{domain}", 0.0
+
+    async def release(self, domain, lease):
+        self.released.append(lease)
+
+    async def throttled(self, domain, lease, retry_after=None):
+        self.throttled_domains.add(domain)
+        return 60.0
+
+
+def drain(queue):
+    async def collect():
+        items = []
+        while True:
+            item = await asyncio.wait_for(queue.get(), timeout=1)
+            if item is None:
+                return items
+            items.append(item)
+    return asyncio.run(collect())
+
+
+def test_domain_of_ignores_www_and_case():
+    assert domain_of("https://WWW.Gem.gov.in/tenders?page=2") == "gem.gov.in"
+    assert domain_of("http://bidplus.gem.gov.in:8080/") == "bidplus.gem.gov.in"
+
+
+def test_queue_round_robins_over_domains():
+    urls = ["https://a.com/1", "https://a.com/2", "https://a.com/3", "https://b.com/1", "https://c.com/1"]
+
+    items = drain(DomainQueue(urls))
+
+    assert [url for url, _ in items] == [
+        "https://a.com/1", "https://b.com/1", "https://c.com/1", "https://a.com/2", "https://a.com/3"
+    ]
+
+
+def test_throttled_domain_is_skipped():
+    """URLs of other domains are handed out while one domain waits"""
+    queue = DomainQueue(["https://slow.com/1", "https://fast.com/1", "https://fast.com/2"],
+                        FakeScheduler(throttled={"slow.com"}))
+
+    async def take_two():
+        return [await queue.get(), await queue.get()]
+
+    assert asyncio.run(take_two()) == [
+        ("https://fast.com/1", "lease-fast.com"),
+        ("https://fast.com/2", "lease-fast.com"),
+    ]
+
+
+def test_throttled_urls_are_retried_then_failed():
+    attempts = []
+    failed = {}
+
+    async def fake_fetch_over_http(url, selector_schema, fetch_mode, dom_hash=False, headers=None):
+        attempts.append(url)
+        if url.endswith("/busy"):
+            raise ThrottledError(url, 429)
+        return {"url": url, "fields": {}}
+
+    async def on_success(url, payload):
+        pass
+
+    async def on_failure(url, error):
+        failed[url] = error
+
+    with patch.object(scraper, "fetch_over_http", fake_fetch_over_http), \
+         patch.object(politeness.settings, "DOMAIN_BACKOFF_BASE", 0.01), \
+         patch.object(politeness.settings, "THROTTLED_URL_ATTEMPTS", 3):
+        asyncio.run(scraper.scrape_urls(
+            ["https://a.com/busy", "https://b.com/ok"], {}, 1, on_success, on_failure, {"fetch_mode": "http"}
+        ))
+
+    assert attempts.count("https://a.com/busy") == 3
+    assert attempts.count("https://b.com/ok") == 1
+    assert isinstance(failed["https://a.com/busy"], ThrottledError)
+
+
+def test_politeness_options():
+    # Off by default, runs opt in
+    assert get_politeness_scheduler({}) is None
+    assert get_politeness_scheduler({"politeness": True}).limits("example.com") == (
+        politeness.settings.DOMAIN_QPS, politeness.settings.DOMAIN_MAX_CONCURRENCY
+    )
+    assert get_politeness_scheduler({"politeness": False}) is None
+    scheduler = get_politeness_scheduler({"politeness": {"qps": 1, "domains": {"GeM.gov.in": {"qps": 0.2, "max_concurrency": 1}}}})
+    assert scheduler.limits("gem.gov.in") == (0.2, 1)
+    assert scheduler.limits("example.com") == (1.0, politeness.settings.DOMAIN_MAX_CONCURRENCY)
@@ -0,0 +1,98 @@
+"""
+Tests for request interception of browser contexts.
+"""
+import asyncio
+from app.services.resource_blocker import ResourceBlocker, get_resource_blocker, merge_resource_stats
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url):
+        self.resource_type = resource_type
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = FakeRequest(resource_type, url)
+        self.outcome = None
+
+    async def abort(self, error_code=None):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+class FakeResponse:
+    def __init__(self, content_length):
+        self.headers = {"content-length": content_length} if content_length is not None else {}
+
+
+class FakeContext:
+    def __init__(self):
+        self.handler = None
+        self.listeners = {}
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    def on(self, event, listener):
+        self.listeners[event] = listener
+
+
+def test_blocker_aborts_by_type_and_domain():
+    """Blocked types and tracker domains, including subdomains, are aborted"""
+    blocker = ResourceBlocker(["image", "font"], ["google-analytics.com"])
+    context = FakeContext()
+    routes = [
+        FakeRoute("document", "https://portal.example.com/tenders"),
+        FakeRoute("image", "https://portal.example.com/logo.png"),
+        FakeRoute("script", "https://www.google-analytics.com/analytics.js"),
+        FakeRoute("script", "https://portal.example.com/app.js"),
+    ]
+
+    async def run():
+        await blocker.install(context)
+        for route in routes:
+            await context.handler(route)
+
+    asyncio.run(run())
+    context.listeners["response"](FakeResponse("1200"))
+    context.listeners["response"](FakeResponse(None))
+
+    assert [route.outcome for route in routes] == ["continued", "aborted", "aborted", "continued"]
+    assert blocker.stats() == {
+        "requests_allowed": 2,
+        "requests_blocked": 2,
+        "blocked_by_type": {"image": 1, "script": 1},
+        "bytes_downloaded": 1200,
+    }
+
+
+def test_get_resource_blocker_options():
+    """Run options disable blocking or replace the configured lists"""
+    assert get_resource_blocker({"block_resources": False}) is None
+
+    default = get_resource_blocker({})
+    assert "image" in default.resource_types
+
+    custom = get_resource_blocker({"block_resources": {"resource_types": ["stylesheet"]}})
+    assert custom.resource_types == {"stylesheet"}
+    assert custom.domains == default.domains
+
+
+def test_merge_resource_stats():
+    """Chunk counters are summed, chunks without a blocker are skipped"""
+    merged = merge_resource_stats([
+        {"requests_allowed": 3, "requests_blocked": 2, "blocked_by_type": {"image": 2}, "bytes_downloaded": 100},
+        None,
+        {"requests_allowed": 1, "requests_blocked": 1, "blocked_by_type": {"font": 1}, "bytes_downloaded": 50},
+    ])
+
+    assert merged == {
+        "requests_allowed": 4,
+        "requests_blocked": 3,
+        "blocked_by_type": {"image": 2, "font": 1},
+        "bytes_downloaded": 150,
+    }
+    assert merge_resource_stats([None, None]) is None
@@ -0,0 +1,238 @@
+"""
+Tests for the retention and archival of results.
+
+The MinIO test writes to TEST_ARCHIVE_URI, e.g. the `minio` service of
+docker-compose:
+
+    AWS_ACCESS_KEY_ID=minioadmin AWS_SECRET_ACCESS_KEY=minioadmin \\
+    TEST_ARCHIVE_URI="s3://results-archive?endpoint_override=localhost:9002&scheme=http&allow_bucket_creation=true" \\
+    pytest tests/test_result_archive.py
+
+The retention queries run against TEST_DATABASE_URL when it is set, in a
+scratch schema dropped afterwards.
+"""
+import asyncio
+import gzip
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+
+import asyncpg
+import pyarrow.parquet as pq
+import pytest
+
+from app.services import result_archive
+
+TEST_ARCHIVE_URI = os.environ.get("TEST_ARCHIVE_URI")
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+NOW = datetime(2024, 6, 15, 3, 0, tzinfo=timezone.utc)
+
+
+def archived_row(id, run_id=7, created_at=datetime(2024, 1, 10, tzinfo=timezone.utc)):
+    return {
+        "id": id,
+        "run_id": run_id,
+        "url": f"https://example.com/{id}",
+        "status": "success",
+        "data": json.dumps({"fields": {"title": f"Tender {id}"}}),
+        "error_message": None,
+        "attempt": 0,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    async def fetch(self, n):
+        page, self.rows = self.rows[:n], self.rows[n:]
+        return page
+
+
+class FakeConnection:
+    """Connection answering the maintenance queries from in-memory tables."""
+
+    def __init__(self, partitions, projects, rows):
+        self.partitions = partitions
+        self.projects = projects
+        self.rows = rows
+        self.executed = []
+        self.parameters = []
+
+    async def fetchval(self, query, day):
+        return f"results_{day:%Y_%m}"
+
+    async def fetch(self, query, *args):
+        if query == result_archive.LIST_PARTITIONS_SQL:
+            return [{"name": name, "attached": attached} for name, attached in self.partitions]
+        return [{"id": id, "retention_days": days or args[0]} for id, days in self.projects]
+
+    async def cursor(self, query, *args):
+        if query == result_archive.EXPIRED_RESULTS_SQL:
+            return FakeCursor(self.rows.get(args[0], []))
+        return FakeCursor(self.rows.get(query.split('"')[1], []))
+
+    async def execute(self, query, *args):
+        self.executed.append(query)
+        self.parameters.append(args)
+
+    @asynccontextmanager
+    async def transaction(self, **kwargs):
+        yield
+
+
+def test_partition_months():
+    assert result_archive.partition_month("results_2024_01") == date(2024, 1, 1)
+    assert result_archive.partition_month("results_default") is None
+    assert result_archive.add_months(date(2024, 11, 20), 2) == date(2025, 1, 1)
+
+
+def test_retention_cutoffs():
+    horizon, cutoffs = result_archive.retention_cutoffs([(1, 30), (2, 90), (3, 90)], NOW)
+    assert horizon == NOW - timedelta(days=90)
+    assert cutoffs == {1: NOW - timedelta(days=30)}
+
+    # A project keeping its results keeps every partition
+    horizon, cutoffs = result_archive.retention_cutoffs([(1, 30), (2, None)], NOW)
+    assert horizon is None
+    assert cutoffs == {1: NOW - timedelta(days=30)}
+
+
+@pytest.mark.parametrize("archive_format", ["parquet", "ndjson"])
+def test_archive_writer_round_trip(tmp_path, archive_format):
+    filesystem, root = result_archive.open_archive(str(tmp_path))
+    path = f"{root}/partitions/results_2024_01{result_archive.ARCHIVE_FORMATS[archive_format]}"
+
+    writer = result_archive.ArchiveWriter(filesystem, path, archive_format)
+    writer.write([archived_row(1), archived_row(2)])
+    writer.write([archived_row(3)])
+    writer.close()
+
+    assert writer.rows == 3
+    if archive_format == "parquet":
+        table = pq.read_table(path)
+        assert table.column("id").to_pylist() == [1, 2, 3]
+        assert json.loads(table.column("data")[0].as_py()) == {"fields": {"title": "Tender 1"}}
+    else:
+        with gzip.open(path, "rt") as archive:
+            records = [json.loads(line) for line in archive]
+        assert [record["id"] for record in records] == [1, 2, 3]
+        assert records[0]["data"] == {"fields": {"title": "Tender 1"}}
+        assert records[0]["created_at"] == "2024-01-10T00:00:00+00:00"
+
+
+def test_maintain_archives_expired_partitions(tmp_path):
+    connection = FakeConnection(
+        partitions=[("results_2023_12", False), ("results_2024_01", True), ("results_2024_05", True)],
+        projects=[(1, 60), (2, None)],
+        rows={"results_2023_12": [archived_row(1)], "results_2024_01": [archived_row(2), archived_row(3)]},
+    )
+
+    with patch.object(result_archive.settings, "RESULT_RETENTION_DAYS", 90), \
+         patch.object(result_archive, "ARCHIVE_PAGE_SIZE", 1):
+        summary = asyncio.run(result_archive.maintain(connection, NOW, str(tmp_path), "parquet"))
+
+    assert summary["partitions"] == ["results_2024_06", "results_2024_07", "results_2024_08"]
+    # The partition left detached by an earlier run and the one past the horizon
+    assert summary["archived_partitions"] == {"results_2023_12": 1, "results_2024_01": 2}
+    assert connection.executed == [
+        result_archive.MATERIALIZE_PARTITION_SOURCES_SQL.format(partition="results_2023_12"),
+        'DROP TABLE "results_2023_12"',
+        'ALTER TABLE results DETACH PARTITION "results_2024_01"',
+        result_archive.MATERIALIZE_PARTITION_SOURCES_SQL.format(partition="results_2024_01"),
+        'DROP TABLE "results_2024_01"',
+    ]
+    # Results of later months referencing a dropped result get its data first
+    assert connection.parameters[0] == (datetime(2024, 1, 1, tzinfo=timezone.utc),)
+    assert connection.parameters[3] == (datetime(2024, 2, 1, tzinfo=timezone.utc),)
+    assert pq.read_table(tmp_path / "partitions" / "results_2024_01.parquet").num_rows == 2
+
+
+def test_expired_results_referenced_by_unchanged_results_are_materialized(tmp_path):
+    # Project 1 expires after 30 days; a kept unchanged result of a later run
+    # references expired result 1
+    connection = FakeConnection(partitions=[], projects=[(1, 30), (2, None)], rows={1: [archived_row(1)]})
+
+    with patch.object(result_archive.settings, "RESULT_RETENTION_DAYS", None):
+        summary = asyncio.run(result_archive.maintain(connection, NOW, str(tmp_path), "ndjson"))
+
+    cutoff = NOW - timedelta(days=30)
+    assert summary["projects"] == {1: 1}
+    # The data is copied into the referencing results before the delete
+    assert connection.executed == [
+        result_archive.MATERIALIZE_EXPIRED_SOURCES_SQL,
+        result_archive.DELETE_EXPIRED_RESULTS_SQL,
+    ]
+    assert connection.parameters == [(1, cutoff), (1, cutoff)]
+    assert "ref.created_at >= $2" in result_archive.MATERIALIZE_EXPIRED_SOURCES_SQL
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_expire_keeps_data_of_referencing_results(tmp_path):
+    schema = f"archive_test_{uuid.uuid4().hex[:8]}"
+    old, recent = NOW - timedelta(days=60), NOW - timedelta(days=1)
+
+    async def expire():
+        connection = await asyncpg.connect(TEST_DATABASE_URL)
+        try:
+            await connection.execute(f"CREATE SCHEMA {schema}; SET search_path TO {schema}")
+            await connection.execute(
+                "CREATE TABLE runs (id BIGINT PRIMARY KEY, project_id BIGINT NOT NULL);"
+                "CREATE TABLE results (id BIGINT PRIMARY KEY, run_id BIGINT NOT NULL, url TEXT, status TEXT,"
+                " data JSONB, error_message TEXT, attempt INTEGER, created_at TIMESTAMPTZ, updated_at TIMESTAMPTZ);"
+                "INSERT INTO runs VALUES (1, 1), (2, 1)"
+            )
+            await connection.executemany(
+                "INSERT INTO results VALUES ($1, $2, 'https://example.com/1', $3, $4::jsonb, NULL, 0, $5, $5)",
+                [
+                    (1, 1, "success", json.dumps({"fields": {"title": "Tender 1"}, "fingerprint": "f"}), old),
+                    (2, 2, "unchanged", json.dumps({"fingerprint": "f", "unchanged_from": 1}), recent),
+                ],
+            )
+            filesystem, root = result_archive.open_archive(str(tmp_path))
+            archived = await result_archive.expire_project_results(
+                connection, 1, NOW - timedelta(days=30), filesystem, root, "ndjson"
+            )
+            return archived, await connection.fetch("SELECT id, data::text AS data FROM results ORDER BY id")
+        finally:
+            await connection.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            await connection.close()
+
+    archived, rows = asyncio.run(expire())
+
+    assert archived == 1
+    assert [row["id"] for row in rows] == [2]
+    assert json.loads(rows[0]["data"]) == {"fields": {"title": "Tender 1"}, "fingerprint": "f"}
+
+
+def test_maintain_keeps_results_without_archive_uri():
+    connection = FakeConnection(partitions=[("results_2020_01", True)], projects=[(1, 1)], rows={})
+
+    with patch.object(result_archive.settings, "RESULT_ARCHIVE_URI", None):
+        summary = asyncio.run(result_archive.maintain(connection, NOW))
+
+    assert len(summary["partitions"]) == result_archive.settings.RESULT_PARTITIONS_AHEAD + 1
+    assert summary["archived_partitions"] == {}
+    assert connection.executed == []
+
+
+@pytest.mark.skipif(not TEST_ARCHIVE_URI, reason="TEST_ARCHIVE_URI is not set")
+def test_archive_to_object_storage():
+    filesystem, root = result_archive.open_archive(TEST_ARCHIVE_URI)
+    path = f"{root}/tests/{uuid.uuid4()}.parquet"
+
+    writer = result_archive.ArchiveWriter(filesystem, path, "parquet")
+    writer.write([archived_row(1), archived_row(2)])
+    writer.close()
+
+    try:
+        with filesystem.open_input_file(path) as archive:
+            assert pq.read_table(archive).column("id").to_pylist() == [1, 2]
+    finally:
+        filesystem.delete_file(path)
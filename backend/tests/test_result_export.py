@@ -0,0 +1,99 @@
+"""
+Tests for the streaming export of run results.
+"""
+import asyncio
+import csv
+import io
+import json
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+from app.services import result_export, result_service
+
+
+def result_row(id, run_id=1, fields=None):
+    return {
+        "id": id,
+        "run_id": run_id,
+        "url": f"https://example.com/{id}",
+        "data": {
+            "title": f"Page {id}",
+            "extracted_at": "2024-01-01T00:00:00",
+            "fields": fields if fields is not None else {"name": f"Item {id}", "tags": ["a", "b"]},
+        },
+        "status": "success",
+        "error_message": None,
+        "created_at": "2024-01-01T00:00:00",
+        "updated_at": "2024-01-01T00:00:00",
+    }
+
+
+def export(rows, export_format, field_names=None, page_size=2):
+    async def collect():
+        return [chunk async for chunk in result_export.export_results(1, export_format, field_names)]
+
+    with patch.object(result_service, "in_memory_results", rows), \
+         patch.object(result_export.settings, "EXPORT_PAGE_SIZE", page_size):
+        return asyncio.run(collect())
+
+
+def test_ndjson_streams_one_chunk_per_page():
+    rows = [result_row(id) for id in range(1, 6)] + [result_row(6, run_id=2)]
+
+    chunks = export(rows, "ndjson")
+
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4, 5]
+    assert json.loads(lines[0])["data"]["fields"]["name"] == "Item 1"
+
+
+def test_csv_flattens_schema_fields():
+    rows = [result_row(1), result_row(2, fields={"name": "Item 2", "url": "https://example.com/x"})]
+
+    content = b"".join(export(rows, "csv", ["name", "tags", "url"])).decode("utf-8")
+
+    records = list(csv.DictReader(io.StringIO(content)))
+    assert [record["name"] for record in records] == ["Item 1", "Item 2"]
+    assert records[0]["tags"] == '["a", "b"]'
+    # A field named like a result column is prefixed
+    assert records[1]["fields.url"] == "https://example.com/x"
+    assert records[1]["url"] == "https://example.com/2"
+
+
+def test_csv_of_empty_run_has_header():
+    content = b"".join(export([], "csv", ["name"])).decode("utf-8")
+
+    assert content.strip() == ",".join(result_export.column_names(["name"]))
+
+
+def test_parquet_writes_a_row_group_per_page():
+    rows = [result_row(id) for id in range(1, 6)]
+
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(export(rows, "parquet"))))
+
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column("id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("name").to_pylist()[-1] == "Item 5"
+
+
+def unchanged_row(id, source_id, run_id=1):
+    row = result_row(id, run_id)
+    row.update(status="unchanged", data={"fingerprint": "abc", "unchanged_from": source_id})
+    return row
+
+
+def test_exports_resolve_unchanged_results():
+    # Result 1 of an earlier run holds the data of the unchanged pages of run 1
+    rows = [result_row(1, run_id=2), unchanged_row(2, 1), unchanged_row(3, 1), result_row(4)]
+
+    records = list(csv.DictReader(io.StringIO(b"".join(export(rows, "csv", ["name"])).decode("utf-8"))))
+    lines = b"".join(export(rows, "ndjson")).decode("utf-8").splitlines()
+
+    assert [record["name"] for record in records] == ["Item 1", "Item 1", "Item 4"]
+    unchanged = json.loads(lines[0])
+    assert unchanged["status"] == "unchanged"
+    assert unchanged["data"]["fields"]["name"] == "Item 1"
+    assert unchanged["data"]["unchanged_from"] == 1
@@ -0,0 +1,151 @@
+"""
+Tests for the buffered result writer and bulk result creation.
+"""
+import asyncio
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import pytest
+from app.schemas.result import ResultCreate
+from app.services import result_service
+from app.services.result_writer import ResultWriter
+
+
+def make_result(i, status="success"):
+    return ResultCreate(run_id=42, data={"i": i}, url=f"https://example.com/{i}", status=status)
+
+
+def test_create_results_in_memory():
+    """Bulk creation assigns ids and keeps the in-memory database consistent"""
+    with patch.object(result_service.run_service, "increment_records_extracted",
+                      new_callable=AsyncMock) as mock_increment:
+        created = asyncio.run(result_service.create_results([make_result(1), make_result(2, "failed")]))
+
+    # The run is counted like with the database, the failed result is not
+    mock_increment.assert_awaited_once_with(42, 1)
+    assert len(created) == 2
+    assert created[0].id != created[1].id
+    stored = asyncio.run(result_service.get_results(42))
+    assert {result.id for result in created} <= {result.id for result in stored}
+
+
+def test_create_results_skips_stored_keys_in_memory():
+    """A redelivered batch does not store its results twice, retries do"""
+    batch = [ResultCreate(run_id=43, data={}, url=f"https://example.com/{i}") for i in range(2)]
+    retry = ResultCreate(run_id=43, data={}, url="https://example.com/0", attempt=1)
+
+    with patch.object(result_service.run_service, "increment_records_extracted",
+                      new_callable=AsyncMock) as mock_increment:
+        first = asyncio.run(result_service.create_results(batch))
+        again = asyncio.run(result_service.create_results(batch + [retry]))
+
+    assert [call.args for call in mock_increment.await_args_list] == [(43, 2), (43, 1)]
+    assert len(first) == 2
+    assert [(result.url, result.attempt) for result in again] == [("https://example.com/0", 1)]
+
+
+def test_create_results_counts_stored_results_only():
+    """records_extracted only grows by the successful results that were new"""
+    repository = MagicMock()
+    repository.insert_results = AsyncMock(return_value=[
+        {"id": 1, "run_id": 42, "url": "https://example.com/1", "status": "success", "data": {}, "attempt": 0,
+         "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00"},
+    ])
+
+    with patch.object(result_service, "use_in_memory_db", False), \
+         patch.object(result_service, "get_repository", return_value=repository), \
+         patch.object(result_service.run_service, "increment_records_extracted", new_callable=AsyncMock) as mock_increment:
+        created = asyncio.run(result_service.create_results([make_result(1), make_result(2)]))
+
+    assert [result.id for result in created] == [1]
+    mock_increment.assert_awaited_once_with(42, 1)
+
+
+def test_writer_batch_size_follows_repository():
+    """Writers without an explicit batch size use the backend's batch size"""
+    with patch("app.services.result_writer.get_repository", return_value=MagicMock(batch_size=1000)):
+        writer = ResultWriter(flush_interval=60)
+
+    assert writer.batch_size == 1000
+
+
+def test_writer_flushes_by_size():
+    """A full buffer is written with a single bulk insert"""
+    async def scenario(mock_create):
+        writer = ResultWriter(batch_size=3, flush_interval=60)
+        for i in range(7):
+            await writer.add(make_result(i))
+        calls_before_close = mock_create.await_count
+        await writer.close()
+        return calls_before_close
+
+    with patch.object(result_service, "create_results", new_callable=AsyncMock) as mock_create:
+        calls_before_close = asyncio.run(scenario(mock_create))
+
+    assert calls_before_close == 2
+    assert [len(call.args[0]) for call in mock_create.await_args_list] == [3, 3, 1]
+
+
+def test_writer_flushes_by_time():
+    """Buffered results are written once the flush interval elapses"""
+    async def scenario(mock_create):
+        writer = ResultWriter(batch_size=100, flush_interval=0.01)
+        await writer.add(make_result(1))
+        await asyncio.sleep(0.05)
+        flushed = mock_create.await_count
+        await writer.close()
+        return flushed
+
+    with patch.object(result_service, "create_results", new_callable=AsyncMock) as mock_create:
+        flushed = asyncio.run(scenario(mock_create))
+
+    assert flushed == 1
+    assert mock_create.await_count == 1
+
+
+def test_writer_keeps_results_when_flush_fails():
+    """Results of a failed flush are retried on the next flush"""
+    async def scenario(mock_create):
+        writer = ResultWriter(batch_size=2, flush_interval=60)
+        await writer.add(make_result(1))
+        await writer.add(make_result(2))
+        mock_create.side_effect = None
+        await writer.close()
+
+    with patch.object(result_service, "create_results", new_callable=AsyncMock) as mock_create:
+        mock_create.side_effect = RuntimeError("database unavailable")
+        asyncio.run(scenario(mock_create))
+
+    assert len(mock_create.await_args_list[-1].args[0]) == 2
+
+
+def test_failed_size_flush_does_not_interrupt_the_scrape():
+    """A failed flush from add is logged; adding goes on and close() retries"""
+    async def scenario(mock_create):
+        writer = ResultWriter(batch_size=2, flush_interval=60)
+        for i in range(5):
+            await writer.add(make_result(i))
+        # Backing off: the failed batch is not retried on every add
+        attempts = mock_create.await_count
+        mock_create.side_effect = None
+        await writer.close()
+        return attempts
+
+    with patch.object(result_service, "create_results", new_callable=AsyncMock) as mock_create:
+        mock_create.side_effect = RuntimeError("database unavailable")
+        attempts = asyncio.run(scenario(mock_create))
+
+    assert attempts == 1
+    assert [result.data["i"] for result in mock_create.await_args_list[-1].args[0]] == [0, 1, 2, 3, 4]
+
+
+def test_close_raises_when_results_cannot_be_written():
+    """A persistent failure surfaces once, when the writer is closed"""
+    async def scenario():
+        writer = ResultWriter(batch_size=1, flush_interval=60)
+        await writer.add(make_result(1))
+        await writer.close()
+
+    with patch.object(result_service, "create_results", new_callable=AsyncMock,
+                      side_effect=RuntimeError("database unavailable")), \
+         pytest.raises(RuntimeError, match="database unavailable"):
+        asyncio.run(scenario())
@@ -0,0 +1,70 @@
+"""
+Tests for the replayable run event log.
+"""
+import asyncio
+import json
+from unittest.mock import patch
+from app.services import run_events
+
+
+class FakeScript:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, keys, args, client):
+        self.calls.append((keys, args))
+        return b"1700000000000-0"
+
+
+class FakeRedis:
+    def __init__(self, entries=()):
+        self.entries = list(entries)
+        self.script = FakeScript()
+
+    def register_script(self, script):
+        return self.script
+
+    async def xread(self, streams, count):
+        (key, after_id), = streams.items()
+        after = run_events.parse_event_id(after_id)
+        newer = [entry for entry in self.entries if run_events.parse_event_id(entry[0].decode()) > after]
+        return [[key.encode(), newer[:count]]] if newer else []
+
+
+def event(entry_id, event_type, data):
+    return entry_id.encode(), {b"event": json.dumps({"type": event_type, "data": data}).encode()}
+
+
+def test_append_event_logs_and_publishes_in_one_call():
+    """The event is appended to the run's stream and published on its channel"""
+    fake_redis = FakeRedis()
+
+    with patch.object(run_events, "get_redis", return_value=fake_redis), \
+         patch.object(run_events, "_append_script", None):
+        event_id = asyncio.run(run_events.append_event(7, "status", {"status": "running"}))
+
+    assert event_id == "1700000000000-0"
+    keys, args = fake_redis.script.calls[0]
+    assert keys == ["run:7:events", "run:7"]
+    assert json.loads(args[1]) == {"type": "status", "data": {"status": "running"}}
+
+
+def test_read_events_resumes_after_last_event_id():
+    """Only events after the client's last event id are replayed"""
+    fake_redis = FakeRedis([
+        event("1-0", "status", {"status": "running"}),
+        event("2-0", "record", {"url": "https://example.com/a"}),
+        event("2-1", "record", {"url": "https://example.com/b"}),
+    ])
+
+    with patch.object(run_events, "get_redis", return_value=fake_redis):
+        everything = asyncio.run(run_events.read_events(7))
+        resumed = asyncio.run(run_events.read_events(7, "2-0"))
+
+    assert [e["id"] for e in everything] == ["1-0", "2-0", "2-1"]
+    assert resumed == [{"id": "2-1", "type": "record", "data": {"url": "https://example.com/b"}}]
+
+
+def test_parse_event_id_orders_sequence_numbers():
+    assert run_events.parse_event_id("2-10") > run_events.parse_event_id("2-9")
+    assert run_events.parse_event_id("3") == (3, 0)
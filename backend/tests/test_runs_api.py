@@ -114,14 +114,14 @@ def sample_run_updated(sample_run):
 @pytest.fixture
 def mock_run_service(sample_run, sample_run_updated):
     """Mock run service functions"""
-    with patch("app.services.run_service.get_runs", new_callable=AsyncMock) as mock_get_runs, \
+    with patch("app.services.run_service.get_runs_page", new_callable=AsyncMock) as mock_get_runs_page, \
          patch("app.services.run_service.get_run", new_callable=AsyncMock) as mock_get_run, \
          patch("app.services.run_service.enqueue_run", new_callable=AsyncMock) as mock_enqueue_run, \
          patch("app.services.run_service.update_run", new_callable=AsyncMock) as mock_update_run, \
          patch("app.services.run_service.delete_run", new_callable=AsyncMock) as mock_delete_run:
         
         # Set return values
-        mock_get_runs.return_value = [sample_run]
+        mock_get_runs_page.return_value = {"runs": [sample_run.model_dump()], "page_size": 100, "next_cursor": None}
         mock_get_run.return_value = sample_run
         
         # Create a pending run with proper field types
@@ -156,7 +156,7 @@ def mock_run_service(sample_run, sample_run_updated):
         mock_get_run.side_effect = get_run_side_effect
         
         yield {
-            "get_runs": mock_get_runs,
+            "get_runs_page": mock_get_runs_page,
             "get_run": mock_get_run,
             "enqueue_run": mock_enqueue_run,
             "update_run": mock_update_run,
@@ -177,7 +177,8 @@ def test_get_runs_for_project(mock_get_project, mock_get_supabase_client, mock_s
     print_response(response)
 
     assert response.status_code == 200
-    mock_run_service["get_runs"].assert_called_once_with(1)
+    mock_run_service["get_runs_page"].assert_called_once_with(1, None, None)
+    assert response.json()["next_cursor"] is None
 
 @patch("app.core.auth.get_supabase_client")
 @patch("app.services.project_service.get_project")
@@ -317,3 +318,14 @@ def test_run_api_workflow(mock_get_project, mock_get_supabase_client, mock_supab
     # Delete a run
     delete_response = client.delete(f"/api/v1/runs/{run_id}", headers=auth_headers)
     assert delete_response.status_code == 204
+
+@patch("app.core.auth.get_supabase_client")
+def test_export_run_results_rejects_unknown_format(mock_get_supabase_client, mock_supabase_client, auth_headers, mock_run_service):
+    """Test that exporting with an unknown format is rejected"""
+    mock_get_supabase_client.return_value = mock_supabase_client
+
+    response = client.get("/api/v1/runs/1/results/export?format=xlsx", headers=auth_headers)
+    print_response(response)
+
+    assert response.status_code == 400
+    mock_run_service["get_run"].assert_not_called()
@@ -0,0 +1,313 @@
+"""
+Tests for the worker scraping helpers.
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from app.services import extractor, http_fetcher, scraper
+
+
+class FakeContext:
+    def __init__(self):
+        self.routed = False
+
+    async def route(self, pattern, handler):
+        self.routed = True
+
+    def on(self, event, listener):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.leases = 0
+        self.released = 0
+
+    async def acquire(self, **kwargs):
+        self.leases += 1
+        return FakeContext()
+
+    async def release(self, context):
+        self.released += 1
+
+
+def test_scrape_urls_bounded_concurrency():
+    """URLs are fetched in parallel but never more than `concurrency` at once"""
+    in_flight = 0
+    peak = 0
+    succeeded = []
+    failed = []
+
+    async def fake_scrape_page(context, url, selector_schema, options=None, headers=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if url.endswith("/bad"):
+            raise RuntimeError("boom")
+        return {"url": url, "fields": {}}
+
+    async def on_success(url, payload):
+        succeeded.append(url)
+
+    async def on_failure(url, error):
+        failed.append((url, str(error)))
+
+    urls = [f"https://example.com/{i}" for i in range(10)] + ["https://example.com/bad"]
+    pool = FakePool()
+
+    with patch("app.services.browser_pool.browser_pool", pool), \
+         patch.object(scraper, "scrape_page", fake_scrape_page):
+        stats = asyncio.run(scraper.scrape_urls(urls, {}, 4, on_success, on_failure))
+
+    assert stats["requests_blocked"] == 0
+    assert peak == 4
+    assert pool.leases == 4
+    assert sorted(succeeded) == sorted(urls[:-1])
+    assert failed == [("https://example.com/bad", "boom")]
+
+
+def test_scrape_urls_stops_every_slot_when_a_callback_raises():
+    """A failing callback cancels the other slots, which release their contexts"""
+    succeeded = []
+    after_error = []
+    failed = False
+
+    async def fake_scrape_page(context, url, selector_schema, options=None, headers=None):
+        await asyncio.sleep(0.01)
+        return {"url": url, "fields": {}}
+
+    async def on_success(url, payload):
+        nonlocal failed
+        if failed:
+            after_error.append(url)
+        if url.endswith("/3"):
+            failed = True
+            raise RuntimeError("flush failed")
+        succeeded.append(url)
+
+    async def on_failure(url, error):
+        pass
+
+    urls = [f"https://example.com/{i}" for i in range(20)]
+    pool = FakePool()
+    # The worker's loop outlives the task, like get_worker_loop()
+    loop = asyncio.new_event_loop()
+
+    try:
+        with patch("app.services.browser_pool.browser_pool", pool), \
+             patch.object(scraper, "scrape_page", fake_scrape_page):
+            with pytest.raises(RuntimeError, match="flush failed"):
+                loop.run_until_complete(scraper.scrape_urls(urls, {}, 4, on_success, on_failure))
+            loop.run_until_complete(asyncio.sleep(0.1))
+    finally:
+        loop.close()
+
+    assert pool.released == pool.leases == 4
+    assert after_error == []
+    assert len(succeeded) < len(urls) - 1
+
+
+def test_scrape_urls_never_opens_more_slots_than_urls():
+    """A small run does not lease idle contexts"""
+    pool = FakePool()
+
+    async def fake_scrape_page(context, url, selector_schema, options=None, headers=None):
+        return {"url": url}
+
+    async def noop(*args):
+        pass
+
+    with patch("app.services.browser_pool.browser_pool", pool), \
+         patch.object(scraper, "scrape_page", fake_scrape_page):
+        asyncio.run(scraper.scrape_urls(["https://example.com"], {}, 8, noop, noop))
+
+    assert pool.leases == 1
+
+
+def test_scrape_urls_auto_falls_back_to_browser():
+    """Auto mode only loads pages in the browser when HTTP is not enough"""
+    schema = {
+        "title": {"selector": "h1"},
+        "price": {"selector": ".price", "required": False},
+    }
+    browser_urls = []
+    succeeded = {}
+
+    async def fake_fetch_page(url, selector_schema, dom_hash=False, headers=None):
+        if url.endswith("/blocked"):
+            raise RuntimeError("403 Forbidden")
+        title = None if url.endswith("/spa") else "Static"
+        return {"url": url, "fields": {"title": title, "price": None}, "fetch_mode": "http"}
+
+    async def fake_scrape_page(context, url, selector_schema, options=None, headers=None):
+        browser_urls.append(url)
+        return {"url": url, "fields": {"title": "Rendered", "price": "10"}}
+
+    async def on_success(url, payload):
+        succeeded[url] = payload["fields"]["title"]
+
+    async def on_failure(url, error):
+        raise AssertionError(f"{url} failed: {error}")
+
+    urls = ["https://example.com/static", "https://example.com/spa", "https://example.com/blocked"]
+    pool = FakePool()
+
+    with patch("app.services.browser_pool.browser_pool", pool), \
+         patch.object(http_fetcher, "fetch_page", fake_fetch_page), \
+         patch.object(scraper, "scrape_page", fake_scrape_page):
+        asyncio.run(scraper.scrape_urls(urls, schema, 1, on_success, on_failure, {"fetch_mode": "auto"}))
+
+    assert browser_urls == ["https://example.com/spa", "https://example.com/blocked"]
+    assert succeeded == {
+        "https://example.com/static": "Static",
+        "https://example.com/spa": "Rendered",
+        "https://example.com/blocked": "Rendered",
+    }
+    # One slot leased a single context for both fallbacks
+    assert pool.leases == pool.released == 1
+
+
+def test_scrape_urls_http_mode_never_uses_browser():
+    """HTTP mode reports fetch errors instead of falling back"""
+    failed = []
+
+    async def fake_fetch_page(url, selector_schema, dom_hash=False, headers=None):
+        raise RuntimeError("timeout")
+
+    async def on_failure(url, error):
+        failed.append(url)
+
+    async def noop(*args):
+        pass
+
+    pool = FakePool()
+
+    with patch("app.services.browser_pool.browser_pool", pool), \
+         patch.object(http_fetcher, "fetch_page", fake_fetch_page):
+        asyncio.run(scraper.scrape_urls(["https://example.com"], {}, 4, noop, on_failure, {"fetch_mode": "http"}))
+
+    assert failed == ["https://example.com"]
+    assert pool.leases == 0
+
+
+class FakeNavigationPage:
+    def __init__(self, missing=()):
+        self.missing = missing
+        self.goto_calls = []
+        self.waited = []
+
+    async def goto(self, url, wait_until, timeout):
+        self.goto_calls.append((url, wait_until, timeout))
+
+    async def wait_for_selector(self, selector, state, timeout):
+        self.waited.append(selector)
+        if selector in self.missing:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded waiting for {selector}")
+
+
+def test_get_readiness_defaults_and_overrides():
+    """Run options override the configured readiness strategy"""
+    assert scraper.get_readiness({}) == {"wait_until": "networkidle", "wait_for": None, "timeout": 30000}
+    assert scraper.get_readiness({"wait_until": "domcontentloaded", "wait_for": "#app", "ready_timeout": 5}) == {
+        "wait_until": "domcontentloaded", "wait_for": "#app", "timeout": 5000
+    }
+    assert scraper.get_readiness({"wait_until": "whenever"})["wait_until"] == "networkidle"
+
+
+def test_wait_until_ready_waits_for_required_selectors():
+    """The schema's required selectors are awaited and a timeout is recorded"""
+    schema = {
+        "title": {"selector": "h1"},
+        "price": {"selector": ".price"},
+        "note": {"selector": ".note", "required": False},
+    }
+    page = FakeNavigationPage(missing={".price"})
+    readiness = scraper.get_readiness({"wait_until": "domcontentloaded", "wait_for": "selectors"})
+
+    timings, _ = asyncio.run(scraper.wait_until_ready(page, "https://example.com", schema, readiness))
+
+    assert page.goto_calls == [("https://example.com", "domcontentloaded", 30000)]
+    assert page.waited == ["h1", ".price"]
+    assert timings["timed_out"] is True
+    assert set(timings) == {"navigation_ms", "wait_ms", "timed_out"}
+
+
+def test_wait_until_ready_custom_selector():
+    """A custom wait_for selector is awaited on its own"""
+    page = FakeNavigationPage()
+    readiness = scraper.get_readiness({"wait_for": "#results"})
+
+    timings, _ = asyncio.run(scraper.wait_until_ready(page, "https://example.com", {"title": {"selector": "h1"}}, readiness))
+
+    assert page.waited == ["#results"]
+    assert timings["timed_out"] is False
+
+
+class FakeLocator:
+    def __init__(self, value):
+        self.value = value
+        self.first = self
+
+    async def inner_text(self):
+        return self.value
+
+
+class FakePage:
+    def __init__(self, extraction):
+        self.extraction = extraction
+        self.evaluate_calls = 0
+        self.locator_calls = []
+
+    async def evaluate(self, script, fields):
+        self.evaluate_calls += 1
+        self.fields = fields
+        return self.extraction
+
+    def locator(self, selector):
+        self.locator_calls.append(selector)
+        return FakeLocator("from locator")
+
+
+def test_extract_page_single_round_trip():
+    """All fields and the title come back from one evaluate call"""
+    schema = {
+        "title": {"selector": "h1", "type": "text"},
+        "link": {"selector": "a.more", "type": "link", "attribute": "href"},
+        "missing": {"selector": ".nope"},
+    }
+    page = FakePage({
+        "title": "Tender",
+        "values": {"title": "Supply of pumps", "link": "/t/1", "missing": None},
+        "errors": {"missing": "No element matches selector .nope"},
+        "fallback": [],
+    })
+
+    fields, title = asyncio.run(extractor.extract_page(page, schema, "https://example.com"))
+
+    assert page.evaluate_calls == 1
+    assert page.locator_calls == []
+    assert page.fields[1] == {"name": "link", "selector": "a.more", "type": "link", "attribute": "href"}
+    assert fields == {"title": "Supply of pumps", "link": "/t/1", "missing": None}
+    assert title == "Tender"
+
+
+def test_extract_page_falls_back_for_playwright_selectors():
+    """Selectors that are not valid CSS are extracted with a locator"""
+    schema = {
+        "title": {"selector": "h1"},
+        "status": {"selector": "text=Open"},
+    }
+    page = FakePage({
+        "title": "Tender",
+        "values": {"title": "Supply of pumps"},
+        "errors": {},
+        "fallback": ["status"],
+    })
+
+    fields, _ = asyncio.run(extractor.extract_page(page, schema, "https://example.com"))
+
+    assert page.locator_calls == ["text=Open"]
+    assert fields == {"title": "Supply of pumps", "status": "from locator"}
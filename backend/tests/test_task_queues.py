@@ -0,0 +1,148 @@
+"""
+Tests for the task queue routing and the per-tenant fair share of runs.
+"""
+import asyncio
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock, AsyncMock
+from app import worker
+from app.core import task_queues
+from app.services import fair_share
+
+
+def test_run_queue_sends_large_runs_to_bulk():
+    with patch.object(task_queues.settings, "BULK_RUN_THRESHOLD", 1000):
+        assert task_queues.run_queue(5) == task_queues.INTERACTIVE
+        assert task_queues.run_queue(5, scheduled=True) == task_queues.SCHEDULED
+        assert task_queues.run_queue(1000) == task_queues.BULK
+        assert task_queues.run_queue(1000, scheduled=True) == task_queues.BULK
+    with patch.object(task_queues.settings, "BULK_RUN_THRESHOLD", 0):
+        assert task_queues.run_queue(100000) == task_queues.INTERACTIVE
+
+
+def test_interactive_tasks_have_the_highest_priority():
+    """On the Redis broker a lower number is served first"""
+    priorities = [task_queues.task_options(queue)["priority"] for queue in
+                  (task_queues.INTERACTIVE, task_queues.RETRY, task_queues.SCHEDULED, task_queues.BULK)]
+    assert priorities == sorted(priorities)
+    assert task_queues.task_options(task_queues.BULK) == {"queue": "bulk", "priority": 9}
+
+
+def test_distributed_chunks_go_to_the_bulk_queue():
+    urls = [f"https://example.com/{i}" for i in range(20)]
+    chord_callable = MagicMock()
+
+    with patch.object(worker, "chord", return_value=chord_callable) as mock_chord:
+        worker.dispatch_distributed_run(7, urls, {"title": {"selector": "h1"}}, 2, 10)
+
+    header = mock_chord.call_args[0][0]
+    assert {signature.options["queue"] for signature in header.tasks} == {"bulk"}
+    assert chord_callable.call_args[0][0].options["queue"] == "interactive"
+
+
+def test_queue_depths_sum_priority_lists():
+    lengths = {"interactive": 2, "interactive:3": 1, "bulk:9": 40}
+    calls = []
+
+    class FakePipeline:
+        def llen(self, key):
+            calls.append(key)
+
+        def execute(self):
+            return [lengths.get(key, 0) for key in calls]
+
+    @contextmanager
+    def connection_or_acquire():
+        client = SimpleNamespace(pipeline=FakePipeline)
+        yield SimpleNamespace(default_channel=SimpleNamespace(client=client))
+
+    celery = SimpleNamespace(connection_or_acquire=connection_or_acquire)
+
+    depths = asyncio.run(task_queues.get_queue_depths(celery))
+
+    assert depths == {"interactive": 3, "retry": 0, "scheduled": 0, "bulk": 40}
+
+
+def test_acquire_run_slot_reports_limit():
+    script = AsyncMock(return_value=0)
+    redis = MagicMock()
+    redis.register_script.return_value = script
+
+    with patch.object(fair_share, "get_redis", return_value=redis), \
+         patch.object(fair_share, "_acquire_script", None), \
+         patch.object(fair_share.settings, "MAX_ACTIVE_RUNS_PER_PROJECT", 2), \
+         patch.object(fair_share.settings, "MAX_ACTIVE_RUNS_PER_USER", 3):
+        assert asyncio.run(fair_share.acquire_run_slot(7, 42, "user-1")) is False
+
+    kwargs = script.await_args.kwargs
+    assert kwargs["keys"] == ["fairshare:project:42", "fairshare:user:user-1", "fairshare:run:7"]
+    assert kwargs["args"][:3] == [7, 2, 3]
+
+
+def test_acquire_run_slot_fails_open():
+    """Runs are not held back while Redis is unavailable"""
+    with patch.object(fair_share, "get_redis", side_effect=ConnectionError("redis down")), \
+         patch.object(fair_share, "_acquire_script", None), \
+         patch.object(fair_share.settings, "MAX_ACTIVE_RUNS_PER_PROJECT", 2):
+        assert asyncio.run(fair_share.acquire_run_slot(7, 42, "user-1")) is True
+
+
+def test_runs_are_not_limited_by_default():
+    with patch.object(fair_share, "get_redis") as mock_redis:
+        assert asyncio.run(fair_share.acquire_run_slot(7, 42, "user-1")) is True
+
+    mock_redis.assert_not_called()
+
+
+def test_refresh_run_slot_extends_held_slots():
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis = MagicMock()
+    redis.hgetall = AsyncMock(return_value={b"project": b"fairshare:project:42", b"user": b"fairshare:user:user-1"})
+    redis.time = AsyncMock(return_value=(1000, 500000))
+    redis.pipeline.return_value = pipe
+
+    with patch.object(fair_share, "get_redis", return_value=redis), \
+         patch.object(fair_share.settings, "RUN_SLOT_TTL", 60):
+        asyncio.run(fair_share.refresh_run_slot(7))
+
+    # Only slots the run still holds are extended, from the Redis clock
+    assert [call.args for call in pipe.zadd.call_args_list] == [
+        ("fairshare:project:42", {7: 1_060_500}), ("fairshare:user:user-1", {7: 1_060_500})
+    ]
+    assert all(call.kwargs == {"xx": True} for call in pipe.zadd.call_args_list)
+    pipe.pexpire.assert_any_call("fairshare:run:7", 60_000)
+    pipe.execute.assert_awaited_once()
+
+
+def test_slot_heartbeat_refreshes_once_per_interval():
+    with patch.object(fair_share, "refresh_run_slot", new_callable=AsyncMock) as mock_refresh, \
+         patch.object(fair_share.settings, "RUN_SLOT_TTL", 3600):
+        heartbeat = fair_share.SlotHeartbeat(7)
+
+        async def beat():
+            for _ in range(3):
+                await heartbeat.beat()
+
+        asyncio.run(beat())
+
+    assert heartbeat.interval == 900
+    mock_refresh.assert_awaited_once_with(7)
+
+
+def test_run_over_its_share_is_deferred():
+    with patch.object(fair_share, "acquire_run_slot", new_callable=AsyncMock, return_value=False), \
+         patch.object(fair_share, "get_project_owner", return_value="user-1"), \
+         patch.object(fair_share, "release_run_slot", new_callable=AsyncMock) as mock_release, \
+         patch.object(worker, "update_run_status") as mock_status, \
+         patch.object(worker, "publish_event", new_callable=AsyncMock) as mock_publish, \
+         patch.object(worker.process_scraping_run, "apply_async") as mock_apply, \
+         patch.object(worker.settings, "FAIR_SHARE_RETRY_DELAY", 30):
+        result = worker.process_scraping_run(7, 42, {"urls": ["https://example.com"]})
+
+    assert result == {"status": "deferred", "run_id": 7}
+    mock_status.assert_not_called()
+    mock_release.assert_not_awaited()
+    mock_publish.assert_awaited_once_with(7, "status", {"status": "pending", "deferred": True})
+    assert mock_apply.call_args.args == ((7, 42, {"urls": ["https://example.com"]}),)
+    assert mock_apply.call_args.kwargs == {"countdown": 30, "queue": "interactive", "priority": 0}
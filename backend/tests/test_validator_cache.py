@@ -0,0 +1,99 @@
+"""
+Tests for conditional requests of scheduled runs.
+"""
+import asyncio
+from unittest.mock import patch
+from app.services import validator_cache
+from app.services.change_detection import ChangeDetector
+from app.services.validator_cache import ValidatorCache, conditional_headers, get_validator_cache, response_validators
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def hgetall(self, key):
+        self.commands.append(lambda: {k.encode(): v.encode() for k, v in self.redis.hashes.get(key, {}).items()})
+
+    def delete(self, key):
+        self.commands.append(lambda: self.redis.hashes.pop(key, None))
+
+    def hset(self, key, mapping):
+        self.commands.append(lambda: self.redis.hashes.setdefault(key, {}).update(mapping))
+
+    def expire(self, key, ttl):
+        self.commands.append(lambda: self.redis.ttls.__setitem__(key, ttl))
+
+    async def execute(self):
+        return [command() for command in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def test_validators_round_trip():
+    fake_redis = FakeRedis()
+    url = "https://example.com/tender"
+
+    with patch.object(validator_cache, "get_redis", return_value=fake_redis):
+        asyncio.run(ValidatorCache("schedule:1", ttl=60).set(url, {"etag": '"abc"'}, "f1"))
+        cache = ValidatorCache("schedule:1")
+        asyncio.run(cache.load([url, "https://example.com/other"]))
+
+    assert cache.get(url) == {"etag": '"abc"', "fingerprint": "f1"}
+    assert cache.get("https://example.com/other") is None
+    assert list(fake_redis.ttls.values()) == [60]
+
+
+def test_headers_from_validators():
+    validators = response_validators({"etag": 'W/"1"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    assert conditional_headers(validators) == {
+        "If-None-Match": 'W/"1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    assert response_validators({"content-type": "text/html"}) == {}
+
+
+def test_only_scheduled_runs_use_the_cache():
+    assert get_validator_cache({}) is None
+    assert get_validator_cache({"schedule_id": 3, "conditional_requests": False}) is None
+    assert get_validator_cache({"schedule_id": 3, "change_detection": "off"}) is None
+    assert get_validator_cache({"schedule_id": 3}).scope == "schedule:3"
+
+
+def test_not_modified_pages_are_stored_as_unchanged():
+    from app.worker import RunRecorder
+
+    url = "https://example.com/tender"
+    detector = ChangeDetector(previous_run_id=5)
+    detector._previous[url] = ("f1", 42)
+    cache = ValidatorCache("schedule:1")
+    cache._entries[url] = {"etag": '"abc"', "fingerprint": "f1"}
+    recorder = RunRecorder(9, change_detector=detector, validator_cache=cache)
+    stored = []
+
+    async def record():
+        async def add(result):
+            stored.append(result)
+
+        with patch.object(recorder.writer, "add", add), \
+             patch.object(recorder.events, "add"), \
+             patch.object(recorder.events, "status_changed"):
+            headers = await recorder.conditional_headers(url)
+            await recorder.success(url, {"url": url, "not_modified": True})
+            return headers
+
+    headers = asyncio.run(record())
+
+    assert headers == {"If-None-Match": '"abc"'}
+    assert stored[0].status == "unchanged"
+    assert stored[0].data == {"fingerprint": "f1", "unchanged_from": 42}
+    assert recorder.changes["not_modified"] == 1
@@ -0,0 +1,84 @@
+"""
+Tests for the Celery worker run helpers.
+"""
+import sys
+from unittest.mock import patch, MagicMock, AsyncMock
+from app import worker
+
+
+def test_run_chunk_size_threshold():
+    """Runs are only distributed when large enough or explicitly requested"""
+    with patch.object(worker.settings, "DISTRIBUTED_RUN_THRESHOLD", 1000), \
+         patch.object(worker.settings, "RUN_CHUNK_SIZE", 100):
+        assert worker.get_run_chunk_size({}, 999) is None
+        assert worker.get_run_chunk_size({}, 1000) == 100
+        assert worker.get_run_chunk_size({"distributed": True, "chunk_size": 10}, 50) == 10
+        assert worker.get_run_chunk_size({"distributed": False}, 5000) is None
+        # A run that fits in one chunk is scraped in place
+        assert worker.get_run_chunk_size({"distributed": True}, 100) is None
+
+
+def test_dispatch_distributed_run_shards_urls():
+    """URLs are split into chord members of at most chunk_size URLs"""
+    urls = [f"https://example.com/{i}" for i in range(25)]
+    chord_callable = MagicMock()
+
+    with patch.object(worker, "chord", return_value=chord_callable) as mock_chord:
+        summary = worker.dispatch_distributed_run(7, urls, {"title": {"selector": "h1"}}, 2, 10)
+
+    header = mock_chord.call_args[0][0]
+    chunk_sizes = [len(signature.args[1]) for signature in header.tasks]
+    assert chunk_sizes == [10, 10, 5]
+    callback = chord_callable.call_args[0][0]
+    assert callback.args == (7, 25)
+    assert summary == {"status": "dispatched", "run_id": 7, "chunks": 3}
+
+
+def test_finalize_distributed_run_aggregates_chunks():
+    """The chord callback sums the chunks into the run row and final status"""
+    supabase = MagicMock()
+    chunk_results = [
+        {"records_extracted": 9, "failed": {"https://example.com/bad": "timeout"}},
+        {"records_extracted": 5, "failed": {}},
+    ]
+
+    with patch.object(sys.modules["app.core.supabase"], "supabase", supabase), \
+         patch.object(worker, "publish_event", new_callable=AsyncMock) as mock_publish:
+        result = worker.finalize_distributed_run(chunk_results, 7, 15)
+
+    update = supabase.table.return_value.update.call_args[0][0]
+    assert update["status"] == "completed"
+    assert update["records_extracted"] == 14
+    assert update["results"]["failed_count"] == 1
+    mock_publish.assert_awaited_once_with(7, "status", {
+        "records_extracted": 14,
+        "status": "completed",
+        "failed_urls": 1
+    })
+    assert result["records_extracted"] == 14
+
+
+def test_worker_shutdown_closes_every_resource():
+    """A resource failing to close does not keep the others open"""
+    import asyncio
+    from app.core import database
+    from app import repositories
+    from app.services import browser_pool, http_fetcher
+
+    closes = {name: AsyncMock() for name in ("http", "redis", "repository", "db")}
+    pool = MagicMock()
+    pool.close = AsyncMock(side_effect=RuntimeError("browser crashed"))
+    loop = asyncio.new_event_loop()
+
+    with patch.object(worker, "_worker_loop", loop), \
+         patch.object(browser_pool, "browser_pool", pool), \
+         patch.object(http_fetcher, "close_http_client", closes["http"]), \
+         patch.object(worker, "close_redis", closes["redis"]), \
+         patch.object(repositories, "close_repository", closes["repository"]), \
+         patch.object(database, "close_db", closes["db"]), \
+         patch.object(worker.logger, "error") as mock_error:
+        worker.shutdown_worker_process()
+
+    assert all(close.await_count == 1 for close in closes.values())
+    assert loop.is_closed()
+    mock_error.assert_called_once_with("Error closing the browser pool: browser crashed")
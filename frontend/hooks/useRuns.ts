@@ -24,8 +24,9 @@ export function useProjectRuns(projectId: number) {
   return useQuery<Run[]>({
     queryKey: runKeys.byProject(projectId),
     queryFn: async () => {
+      // First page of runs, newest first
       const response = await api.get(`/projects/${projectId}/runs`);
-      return response.data as Run[];
+      return response.data.runs as Run[];
     },
     enabled: !!projectId,
   });
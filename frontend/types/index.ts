@@ -39,7 +39,7 @@ export interface Result {
   id: number;
   run_id: number;
   url: string;
-  status: 'success' | 'failed';
+  status: 'success' | 'failed' | 'unchanged';
   data: Record<string, any>;
   error_message?: string;
   created_at: string;
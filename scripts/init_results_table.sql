@@ -10,15 +10,16 @@ CREATE TABLE IF NOT EXISTS public.results (
 ALTER TABLE public.results ADD COLUMN IF NOT EXISTS url TEXT NOT NULL DEFAULT '';
 ALTER TABLE public.results ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'success';
 ALTER TABLE public.results ADD COLUMN IF NOT EXISTS error_message TEXT;
+ALTER TABLE public.results ADD COLUMN IF NOT EXISTS attempt INTEGER NOT NULL DEFAULT 0;
 
--- Create index on run_id for faster lookups
-CREATE INDEX IF NOT EXISTS idx_results_run_id ON public.results(run_id);
+-- Key of a result; also serves the per-URL lookups of a run (retries, change detection)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_results_run_id_url_attempt ON public.results(run_id, url, attempt);
 
--- Create index on status for filtering failed results
-CREATE INDEX IF NOT EXISTS idx_results_status ON public.results(status);
+-- Create index for listing a run's results by id
+CREATE INDEX IF NOT EXISTS idx_results_run_id_id ON public.results(run_id, id);
 
--- Create index on url for retry operations
-CREATE INDEX IF NOT EXISTS idx_results_url ON public.results(url);
+-- Create partial index for the failed results of a run
+CREATE INDEX IF NOT EXISTS idx_results_run_id_failed ON public.results(run_id, id) WHERE status = 'failed';
 
 -- Add RLS policies
 ALTER TABLE public.results ENABLE ROW LEVEL SECURITY;